@@ -26,6 +26,10 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+def include_object(object, name, type_, reflected, compare_to):  # type: ignore[no-untyped-def]
+    # The FTS5 table and its shadow tables are managed by hand (see LOG_FTS_DDL)
+    return not (type_ == "table" and name.startswith("logs_fts"))
+
 # Override sqlalchemy.url with the one from settings
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
@@ -45,6 +49,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +74,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,36 @@
+"""Add keyset pagination indexes
+
+Revision ID: 4b8d0c2f7a91
+Revises: e6217918dc5a
+Create Date: 2026-10-17 11:40:27.305114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8d0c2f7a91'
+down_revision: Union[str, Sequence[str], None] = 'e6217918dc5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_status_created_at_id', 'tasks', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_runs_status_id', 'runs', ['status', 'id'], unique=False)
+    op.create_index('ix_runs_task_id_id', 'runs', ['task_id', 'id'], unique=False)
+    op.create_index('ix_runs_start_time_id', 'runs', ['start_time', 'id'], unique=False)
+    op.create_index('ix_runs_status_start_time_id', 'runs', ['status', 'start_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_runs_status_start_time_id', table_name='runs')
+    op.drop_index('ix_runs_start_time_id', table_name='runs')
+    op.drop_index('ix_runs_task_id_id', table_name='runs')
+    op.drop_index('ix_runs_status_id', table_name='runs')
+    op.drop_index('ix_tasks_status_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
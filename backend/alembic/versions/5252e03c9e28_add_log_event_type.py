@@ -0,0 +1,33 @@
+"""add log event type
+
+Revision ID: 5252e03c9e28
+Revises: 7d2c8e4a1b93
+Create Date: 2026-10-17 17:02:41.903518
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5252e03c9e28'
+down_revision: Union[str, Sequence[str], None] = '7d2c8e4a1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('logs', sa.Column('event_type', sa.String(), nullable=True))
+    op.create_index('ix_logs_run_id_event_type', 'logs', ['run_id', 'event_type'], unique=False)
+    op.create_index('ix_logs_run_id_level', 'logs', ['run_id', 'level'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_logs_run_id_level', table_name='logs')
+    op.drop_index('ix_logs_run_id_event_type', table_name='logs')
+    # Not batch mode: recreating the table would drop the logs_fts triggers
+    op.drop_column('logs', 'event_type')
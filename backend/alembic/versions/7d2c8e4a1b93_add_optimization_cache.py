@@ -0,0 +1,43 @@
+"""Add optimization cache
+
+Revision ID: 7d2c8e4a1b93
+Revises: c5a19e0b4f62
+Create Date: 2026-10-17 15:48:33.106274
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c8e4a1b93'
+down_revision: Union[str, Sequence[str], None] = 'c5a19e0b4f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('optimization_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('original_task', sa.Text(), nullable=False),
+    sa.Column('optimized_prompt', sa.Text(), nullable=False),
+    sa.Column('reasoning', sa.Text(), nullable=False),
+    sa.Column('estimated_tokens', sa.Integer(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_optimization_cache_expires_at'), 'optimization_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_optimization_cache_last_used_at'), 'optimization_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_optimization_cache_last_used_at'), table_name='optimization_cache')
+    op.drop_index(op.f('ix_optimization_cache_expires_at'), table_name='optimization_cache')
+    op.drop_table('optimization_cache')
@@ -0,0 +1,45 @@
+"""Add FTS5 full-text index over logs
+
+Revision ID: 9f3e51a7c2d4
+Revises: 4b8d0c2f7a91
+Create Date: 2026-10-17 13:05:51.772340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3e51a7c2d4'
+down_revision: Union[str, Sequence[str], None] = '4b8d0c2f7a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("CREATE VIRTUAL TABLE logs_fts USING fts5(message, content='logs', content_rowid='id')")
+    op.execute("""CREATE TRIGGER logs_fts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""")
+    op.execute("""CREATE TRIGGER logs_fts_delete AFTER DELETE ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""")
+    op.execute("""CREATE TRIGGER logs_fts_update AFTER UPDATE OF message ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""")
+    # Index the rows that already exist
+    op.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS logs_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS logs_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS logs_fts_insert")
+    op.execute("DROP TABLE IF EXISTS logs_fts")
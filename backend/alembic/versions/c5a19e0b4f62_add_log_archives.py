@@ -0,0 +1,53 @@
+"""Add log archives
+
+Revision ID: c5a19e0b4f62
+Revises: 9f3e51a7c2d4
+Create Date: 2026-10-17 14:22:09.481956
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a19e0b4f62'
+down_revision: Union[str, Sequence[str], None] = '9f3e51a7c2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('log_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('line_count', sa.Integer(), nullable=False),
+    sa.Column('first_log_id', sa.Integer(), nullable=True),
+    sa.Column('last_log_id', sa.Integer(), nullable=True),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('compressed_bytes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['runs.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_id')
+    )
+    op.create_index(op.f('ix_log_archives_id'), 'log_archives', ['id'], unique=False)
+    op.create_table('log_archive_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['run_id'], ['runs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_log_archive_chunks_run_id_seq', 'log_archive_chunks', ['run_id', 'seq'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_log_archive_chunks_run_id_seq', table_name='log_archive_chunks')
+    op.drop_table('log_archive_chunks')
+    op.drop_index(op.f('ix_log_archives_id'), table_name='log_archives')
+    op.drop_table('log_archives')
@@ -0,0 +1,32 @@
+"""add log id reservations
+
+Revision ID: d81f4b6a2e37
+Revises: 5252e03c9e28
+Create Date: 2026-10-17 21:14:52.307164
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6a2e37'
+down_revision: Union[str, Sequence[str], None] = '5252e03c9e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('log_id_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reserved_through', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('log_id_reservations')
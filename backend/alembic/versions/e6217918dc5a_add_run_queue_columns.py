@@ -0,0 +1,42 @@
+"""Add run queue columns
+
+Revision ID: e6217918dc5a
+Revises: 192f838d2476
+Create Date: 2026-10-17 09:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6217918dc5a'
+down_revision: Union[str, Sequence[str], None] = '192f838d2476'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('runs') as batch_op:
+        batch_op.add_column(sa.Column('prompt', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('queued_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('dispatched_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('queue_wait_ms', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('dispatch_latency_ms', sa.Float(), nullable=True))
+    op.create_index('ix_runs_status_priority_id', 'runs', ['status', sa.text('priority DESC'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_runs_status_priority_id', table_name='runs')
+    with op.batch_alter_table('runs') as batch_op:
+        batch_op.drop_column('dispatch_latency_ms')
+        batch_op.drop_column('queue_wait_ms')
+        batch_op.drop_column('dispatched_at')
+        batch_op.drop_column('queued_at')
+        batch_op.drop_column('priority')
+        batch_op.drop_column('prompt')
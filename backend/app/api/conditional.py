@@ -0,0 +1,27 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def conditional_json(request: Request, content: Any, headers: Dict[str, str] | None = None) -> Response:
+    """JSON response with an ETag of its body; 304 with no body when ``If-None-Match`` already has it.
+
+    The tag is a hash of the serialized content, so polling clients skip the transfer
+    and decode while nothing changed, without the endpoint tracking versions.
+    """
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    response_headers = {**(headers or {}), "ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(body, media_type="application/json", headers=response_headers)
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
@@ -1,51 +1,132 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Generator
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import (
+    FastAPI, APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect,
+    Depends, Query, Request, Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, AsyncGenerator, AsyncIterator
 
-from app.models.schemas import TaskRequest, OptimizedPrompt, LogEntry, RunRequest, TaskResponse
-from app.core.optimizer import optimizer
+from app.models.schemas import (
+    TaskRequest, OptimizedPrompt, BatchOptimizeRequest, BatchOptimizeResult, LogEntry,
+    RunRequest, TaskResponse, RunResponse,
+)
+from app.api.conditional import conditional_json
+from app.api.pagination import (
+    NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, cursor_datetime, cursor_int, cursor_float, as_utc,
+)
+from app.core.optimizer import optimizer, OptimizerTimeoutError
+from app.core.cache import optimization_cache
 from app.core.actor import actor
 from app.core.observer import watcher
-from app.core.websockets import manager
-from app.database import SessionLocal, Task, Optimization, Run
+from app.core.scheduler import scheduler, QueueFullError
+from app.core.ingest import log_ingestor
+from app.core.websockets import manager, Subscription
+from app.core.export import iter_run_logs, ndjson_chunks, gzip_chunks
+from app.core.search import search_logs, InvalidQueryError
+from app.core.retention import retention
+from app.core.cluster import cluster
+from app.database import AsyncSessionLocal, Task, Optimization, Run, dispose_engines
+from app.config import settings
 
 router = APIRouter()
 
 # Dependency
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-@router.on_event("startup")
-async def startup_event() -> None:
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Nothing heavy happens at import: the engine is created by the first session,
+    # and the optimizer backend (DSPy) loads in the background from here
+    optimizer.start()
     await watcher.start()
+    # Agents, scheduling, ingestion and retention run in one worker only (see Cluster)
+    await cluster.start(start_leader_services)
+    try:
+        yield
+    finally:
+        await retention.stop()
+        optimizer.shutdown()
+        await scheduler.stop()
+        await actor.stop_task()
+        await log_ingestor.stop()
+        await cluster.stop()
+        await watcher.stop()
+        await dispose_engines()
 
-@router.on_event("shutdown")
-async def shutdown_event() -> None:
-    await watcher.stop()
+async def start_leader_services() -> None:
+    await log_ingestor.start()
+    await scheduler.start()
+    await retention.start()
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket) -> None:
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, last_log_id: int | None = None) -> None:
+    client = await manager.connect(websocket)
+    replay: asyncio.Task[None] | None = None
+    if last_log_id is not None:
+        # Reconnecting client: catch up from its cursor before going live.
+        # Runs as its own task so control messages are still handled meanwhile.
+        replay = asyncio.create_task(watcher.replay(client, last_log_id))
     try:
         while True:
-            # Keep connection alive, listen for client pings if needed
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            # Client control messages, e.g.
+            # {"action": "subscribe", "run_ids": [1], "task_ids": [], "levels": ["ERROR"]}
+            # {"action": "resume", "last_log_id": 1234}
+            text = await websocket.receive_text()
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                continue  # Plain-text keepalive pings
+            if not isinstance(payload, dict):
+                continue
+
+            action = payload.get("action")
+            if action == "subscribe":
+                try:
+                    client.subscription = Subscription.from_message(payload)
+                except (TypeError, ValueError) as e:
+                    client.enqueue(json.dumps({"type": "error", "data": f"Invalid subscription: {e}"}))
+                    continue
+                client.enqueue(json.dumps({"type": "subscribed", "data": client.subscription.to_dict()}))
+            elif action == "unsubscribe":
+                client.subscription = None
+                client.enqueue(json.dumps({"type": "subscribed", "data": None}))
+            elif action == "resume":
+                if replay and not replay.done():
+                    replay.cancel()
+                try:
+                    cursor = int(payload.get("last_log_id") or 0)
+                except (TypeError, ValueError):
+                    client.enqueue(json.dumps({"type": "error", "data": "Invalid last_log_id"}))
+                    continue
+                replay = asyncio.create_task(watcher.replay(client, cursor))
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the manager already closed a slow or dead socket
+        pass
+    finally:
+        if replay and not replay.done():
+            replay.cancel()
         manager.disconnect(websocket)
 
 @router.post("/optimize", response_model=OptimizedPrompt)
-async def optimize_task(task: TaskRequest, db: Session = Depends(get_db)) -> OptimizedPrompt:
+async def optimize_task(task: TaskRequest, db: AsyncSession = Depends(get_db)) -> OptimizedPrompt:
     # Persist task
     db_task = Task(description=task.description, status="optimizing")
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
 
-    optimized = await optimizer.optimize(task)
+    try:
+        optimized = await optimizer.optimize(task)
+    except OptimizerTimeoutError as e:
+        db_task.status = "failed" # type: ignore
+        await db.commit()
+        raise HTTPException(status_code=504, detail=str(e))
     
     # Persist optimization
     db_opt = Optimization(
@@ -55,39 +136,264 @@ async def optimize_task(task: TaskRequest, db: Session = Depends(get_db)) -> Opt
         reasoning=optimized.reasoning
     )
     db.add(db_opt)
-    db.commit()
+    await db.commit()
 
     # Hack: Attach ID for the frontend to use in run
     optimized.id = db_task.id # type: ignore
     return optimized
 
+@router.post("/optimize/batch", response_model=List[BatchOptimizeResult])
+async def optimize_batch(
+    request: BatchOptimizeRequest, db: AsyncSession = Depends(get_db)
+) -> List[BatchOptimizeResult]:
+    # Identical tasks in the batch (or in flight elsewhere) are coalesced by the optimizer
+    slots = asyncio.Semaphore(settings.OPTIMIZE_BATCH_CONCURRENCY)
+
+    async def optimize_one(task: TaskRequest) -> OptimizedPrompt:
+        async with slots:
+            return await optimizer.optimize(task)
+
+    outcomes = await asyncio.gather(*(optimize_one(task) for task in request.tasks), return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException) and not isinstance(outcome, OptimizerTimeoutError):
+            raise outcome
+
+    # One transaction for the whole batch, instead of two commits per task
+    db_tasks = [
+        Task(description=task.description, status="failed" if isinstance(outcome, BaseException) else "optimizing")
+        for task, outcome in zip(request.tasks, outcomes)
+    ]
+    db.add_all(db_tasks)
+    await db.flush()
+    db.add_all([
+        Optimization(
+            task_id=db_task.id,
+            original_prompt=outcome.original_task,
+            optimized_prompt=outcome.optimized_prompt,
+            reasoning=outcome.reasoning
+        )
+        for db_task, outcome in zip(db_tasks, outcomes)
+        if isinstance(outcome, OptimizedPrompt)
+    ])
+    await db.commit()
+
+    results = []
+    for db_task, outcome in zip(db_tasks, outcomes):
+        if isinstance(outcome, OptimizedPrompt):
+            results.append(BatchOptimizeResult(
+                task_id=db_task.id, # type: ignore
+                status="optimizing",
+                result=outcome.model_copy(update={"id": db_task.id}),
+            ))
+        else:
+            results.append(BatchOptimizeResult(task_id=db_task.id, status="failed", error=str(outcome))) # type: ignore
+    return results
+
+@router.get("/optimize/cache")
+async def get_optimization_cache_stats() -> Dict[str, Any]:
+    return {**optimization_cache.snapshot(), "coalesced": optimizer.coalesced}
+
 @router.post("/run")
-async def run_agent(request: RunRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def run_agent(request: RunRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     task_id = request.task_id
     
     # Fetch optimization to get the prompt
     # We assume strict flow: Optimize -> Run
-    optimization = db.query(Optimization).filter(Optimization.task_id == task_id).first()
+    optimization = (
+        await db.execute(select(Optimization).where(Optimization.task_id == task_id).limit(1))
+    ).scalar_one_or_none()
     
     if not optimization:
         raise HTTPException(status_code=404, detail="Optimization not found for this task. Please optimize first.")
     
     try:
-        await actor.start_task(optimization.optimized_prompt, task_id) # type: ignore
-        return {"status": "started", "message": "Agent loop initiated.", "task_id": task_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        run_id = await scheduler.enqueue(optimization.optimized_prompt, task_id, request.priority) # type: ignore
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    # Start right away when a slot is free; otherwise the run waits in the queue
+    if await cluster.call("dispatch", run_id=run_id):
+        return {"status": "started", "message": "Agent loop initiated.", "task_id": task_id, "run_id": run_id}
+    return {
+        "status": "queued",
+        "message": "All agent slots are busy; run queued.",
+        "task_id": task_id,
+        "run_id": run_id,
+        "queue_depth": await scheduler.queue_depth(),
+    }
 
 @router.post("/stop")
-async def stop_agent() -> Dict[str, str]:
-    await actor.stop_task()
-    return {"status": "stopped"}
+async def stop_agent() -> Dict[str, Any]:
+    stopped = await cluster.call("stop")
+    return {"status": "stopped", "run_ids": stopped}
+
+@router.post("/stop/{run_id}")
+async def stop_run(run_id: int) -> Dict[str, Any]:
+    stopped = await cluster.call("stop", run_id=run_id)
+    if not stopped:
+        if await scheduler.cancel(run_id):
+            return {"status": "cancelled", "run_ids": [run_id]}
+        raise HTTPException(status_code=404, detail=f"Run {run_id} is not active or queued.")
+    return {"status": "stopped", "run_ids": stopped}
 
 @router.get("/status")
-async def get_status() -> Dict[str, str]:
-    return {"status": actor.status}
+async def get_status(request: Request) -> Response:
+    """Agent slots and active runs.
+
+    Carries an ETag; send it back as If-None-Match to get a 304 while nothing changed.
+    """
+    return conditional_json(request, {
+        **await cluster.call("status"),
+        "queue_depth": await scheduler.queue_depth(),
+    })
+
+@router.get("/queue")
+async def get_queue(limit: int = 100) -> List[Dict[str, Any]]:
+    return await scheduler.queued_runs(limit)
+
+@router.get("/history", response_model=List[TaskResponse])
+async def get_history(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: str | None = None,
+    status: str | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    """Tasks, newest first. Pass the X-Next-Cursor response header back as ``cursor`` for the next page.
+
+    Like /status, the page carries an ETag for conditional polling.
+    """
+    query: Any = select(Task)
+    if status is not None:
+        query = query.where(Task.status == status)
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        # Row-value comparison walks (created_at, id) straight down the composite index
+        query = query.where(
+            tuple_(Task.created_at, Task.id)
+            < tuple_(cursor_datetime(position, "created_at"), cursor_int(position, "id"))
+        )
+    query = query.order_by(desc(Task.created_at), desc(Task.id)).limit(limit + 1)
+
+    tasks = list((await db.execute(query)).scalars().all())
+    headers = {}
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(created_at=tasks[-1].created_at, id=tasks[-1].id)
+    return conditional_json(request, [TaskResponse.model_validate(t) for t in tasks], headers)
+
+@router.get("/runs")
+async def list_runs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    task_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> List[RunResponse]:
+    """Runs, newest first, filtered by status, task and start time (``since`` inclusive, ``until`` exclusive).
 
-@router.get("/history")
-async def get_history(db: Session = Depends(get_db)) -> List[TaskResponse]:
-    tasks = db.query(Task).order_by(Task.created_at.desc()).limit(20).all()
-    return [TaskResponse.model_validate(t) for t in tasks]
+    With a time window, pages are keyed on (start_time, id) so a window in the past
+    seeks straight to it instead of walking every newer run by id.
+    """
+    windowed = since is not None or until is not None
+    query: Any = select(Run)
+    if status is not None:
+        query = query.where(Run.status == status)
+    if task_id is not None:
+        query = query.where(Run.task_id == task_id)
+    if since is not None:
+        query = query.where(Run.start_time >= as_utc(since))
+    if until is not None:
+        query = query.where(Run.start_time < as_utc(until))
+    if windowed:
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Run.start_time, Run.id)
+                < tuple_(cursor_datetime(position, "start_time"), cursor_int(position, "id"))
+            )
+        query = query.order_by(desc(Run.start_time), desc(Run.id))
+    else:
+        if cursor is not None:
+            query = query.where(Run.id < cursor_int(decode_cursor(cursor), "id"))
+        query = query.order_by(desc(Run.id))
+    query = query.limit(limit + 1)
+
+    runs = list((await db.execute(query)).scalars().all())
+    if len(runs) > limit:
+        runs = runs[:limit]
+        last = runs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = (
+            encode_cursor(start_time=last.start_time, id=last.id) if windowed else encode_cursor(id=last.id)
+        )
+    return [RunResponse.model_validate(r) for r in runs]
+
+@router.get("/runs/{run_id}/logs")
+async def export_run_logs(
+    run_id: int,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    level: str | None = None,
+    event_type: str | None = None,
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Stream a run's committed logs as NDJSON in id order, optionally gzip-compressed.
+
+    ``after_id``/``before_id`` bound the log id exclusively; ``since`` (inclusive) and
+    ``until`` (exclusive) bound the timestamp. ``level`` and ``event_type`` match exactly.
+    """
+    run = await db.get(Run, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found.")
+
+    body = ndjson_chunks(iter_run_logs(
+        run_id,
+        task_id=run.task_id, # type: ignore
+        after_id=after_id,
+        before_id=before_id,
+        since=as_utc(since) if since else None,
+        until=as_utc(until) if until else None,
+        level=level.upper() if level else None,
+        event_type=event_type,
+    ))
+    headers = {"Content-Disposition": f'attachment; filename="run-{run_id}-logs.ndjson"'}
+    if gzip:
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+@router.get("/logs/search")
+async def search_run_logs(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    run_id: int | None = None,
+    task_id: int | None = None,
+    level: str | None = None,
+    event_type: str | None = None,
+    raw: bool = False,
+) -> List[Dict[str, Any]]:
+    """Full-text search over log messages, best match first, with run/task context and a snippet.
+
+    ``q`` is matched as a phrase; with ``raw=true`` it is passed through as FTS5 query syntax.
+    """
+    after = None
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        after = (cursor_float(position, "rank"), cursor_int(position, "id"))
+    try:
+        hits = await search_logs(q, limit + 1, run_id=run_id, task_id=task_id, level=level,
+                                 event_type=event_type, after=after, raw=raw)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rank=hits[-1]["rank"], id=hits[-1]["id"])
+    return hits
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(**position: Any) -> str:
+    """Opaque keyset cursor: the sort key of the last row on a page."""
+    values = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in position.items()}
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return position
+
+def cursor_datetime(position: Dict[str, Any], key: str) -> datetime:
+    try:
+        return datetime.fromisoformat(position[key])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def cursor_int(position: Dict[str, Any], key: str) -> int:
+    value = position.get(key)
+    if not isinstance(value, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return value
+
+def cursor_float(position: Dict[str, Any], key: str) -> float:
+    value = position.get(key)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return float(value)
+
+def as_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; bring aware query values onto the same clock."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
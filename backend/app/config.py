@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Literal
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./autoreflex.db"
@@ -9,6 +9,63 @@ class Settings(BaseSettings):
     # Feature Flags
     USE_REAL_OPTIMIZER: bool = False
     AUTOREFLEX_AGENT_CMD: List[str] = [] # Default to empty list (simulator)
+    SIMULATOR_ARGS: List[str] = [] # Extra simulator options for load tests, e.g. ["--lines", "0", "--rate", "5000"]
+    OPTIMIZER_MODEL: str = "gpt-4o" # LM used by the DSPy optimizer
+    OPTIMIZER_MAX_CONCURRENCY: int = 4 # DSPy/LLM calls in flight at once; further requests wait for a slot
+    OPTIMIZER_TIMEOUT: float = 60.0 # Seconds an optimization may take, including the wait for a slot, before a 504
+    OPTIMIZE_BATCH_MAX_SIZE: int = 100 # Tasks accepted by one POST /api/optimize/batch
+    OPTIMIZE_BATCH_CONCURRENCY: int = 8 # Optimizations of one batch in progress at once
+
+    # Optimization cache
+    OPTIMIZATION_CACHE_ENABLED: bool = True
+    OPTIMIZATION_CACHE_TTL: float = 7 * 24 * 3600 # Seconds a cached optimization stays valid
+    OPTIMIZATION_CACHE_MEMORY_SIZE: int = 512 # Entries in the in-process LRU tier
+    OPTIMIZATION_CACHE_MAX_ROWS: int = 10000 # Rows kept in the SQLite tier, least recently used evicted first
+
+    # Execution
+    MAX_CONCURRENT_RUNS: int = 4 # Agent subprocesses allowed to run at once
+    MAX_QUEUE_DEPTH: int = 1000 # Queued runs accepted before /api/run answers 429
+    QUEUE_POLL_INTERVAL: float = 5.0 # Seconds between queue re-checks when no event arrives
+
+    # Multi-worker mode (cli.py start --workers N)
+    WORKERS: int = 1 # uvicorn worker processes; above 1 they elect a leader that runs the agents
+    CLUSTER_SOCKET_PATH: str = "./autoreflex-cluster.sock" # Unix socket the leader listens on for the other workers
+    CLUSTER_LOCK_PATH: str = "./autoreflex-cluster.lock" # File whose flock decides the leader
+    CLUSTER_CALL_TIMEOUT: float = 10.0 # Seconds a worker waits on the leader (or for a new one) before a 503
+    CLUSTER_QUEUE_SIZE: int = 100000 # Events buffered per worker before the leader drops its connection
+
+    # Log ingestion
+    LOG_FLUSH_BATCH_SIZE: int = 500 # Lines buffered per run before a bulk insert
+    LOG_FLUSH_INTERVAL: float = 0.25 # Max seconds a buffered line waits before it is written
+    LOG_FLUSH_MAX_ATTEMPTS: int = 5 # Failed writes of a run's lines (e.g. database is locked) before they are dropped
+    LOG_PARSERS: List[str] = ["stream-json", "prefix"] # Tried in order per line of output; names or module:Class paths
+    AGENT_READ_CHUNK_SIZE: int = 256 * 1024 # Bytes read from an agent pipe at a time; also the pipe's buffer limit
+    LOG_MAX_LINE_BYTES: int = 64 * 1024 # Longer lines of agent output are split or truncated
+    LOG_LONG_LINE_MODE: Literal["split", "truncate"] = "split" # split: the rest follows as continuation records
+
+    # WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 1000 # Messages buffered per client before the slow-consumer policy applies
+    WS_SLOW_CONSUMER_POLICY: Literal["drop_oldest", "coalesce", "disconnect"] = "drop_oldest"
+    LOG_REPLAY_PAGE_SIZE: int = 500 # Rows per page when catching up a reconnecting client
+    LOG_ID_BLOCK_SIZE: int = 10000 # Log ids reserved per database write; a new leader starts after the last block
+    LOG_EXPORT_CHUNK_SIZE: int = 1000 # Rows fetched from the cursor per chunk of a log export
+
+    # Log retention (finished runs only)
+    RETENTION_INTERVAL: float = 3600.0 # Seconds between retention passes; 0 disables the background job
+    RETENTION_MAX_AGE_DAYS: float = 30.0 # Archive logs of runs that ended longer ago than this; 0 disables
+    RETENTION_KEEP_RUNS: int = 200 # Newest finished runs whose logs stay in the hot table; 0 disables
+    RETENTION_MAX_LINES_PER_RUN: int = 100000 # Keep only the first and last lines of bigger runs; 0 disables
+
+    # SQLite tuning, applied to every new connection (ignored for other databases)
+    SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL" # WAL: readers don't block
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL" # Crash-safe under WAL, fewer fsyncs
+    SQLITE_CACHE_SIZE: int = -8000 # Page cache per connection; negative values are KiB (8 MiB)
+    SQLITE_MMAP_SIZE: int = 268435456 # Bytes of the DB file read through mmap (256 MiB); 0 disables
+    SQLITE_AUTO_VACUUM: Literal["NONE", "FULL", "INCREMENTAL"] = "INCREMENTAL" # New DBs; `cli.py compact` converts old
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000 # How long a connection waits on a lock before "database is locked"
+    DB_POOL_SIZE: int = 5 # Connections kept open per engine
+    DB_MAX_OVERFLOW: int = 10 # Extra connections opened under burst load
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a free pooled connection
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -1,35 +1,89 @@
 import asyncio
 import os
 import sys
+import time
 from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+from sqlalchemy import func, select, update
 from app.core.websockets import manager
-from app.database import SessionLocal, Run, Log
-from app.core.observer import watcher
+from app.database import AsyncSessionLocal, Run, Log, LogArchive, LogIdReservation
+from app.core.events import bus
+from app.core.metrics import RUNS_ACTIVE, RUN_DURATION_SECONDS, RUN_QUEUE_WAIT_SECONDS
+from app.core.ingest import log_ingestor
+from app.core.parsers import ParserChain, default_level
+from app.core.reader import read_lines
 from app.config import settings
 
+class RunNotQueuedError(Exception):
+    """Raised when a queued run was cancelled or claimed before it could be dispatched."""
+
+class AgentRun:
+    """State of a single agent subprocess, keyed by its Run id."""
+
+    def __init__(self, run_id: int, task_id: int) -> None:
+        self.run_id = run_id
+        self.task_id = task_id
+        self.process: asyncio.subprocess.Process | None = None
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self._monitor: asyncio.Task[None] | None = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "task_id": self.task_id,
+            "status": self.status,
+            "pid": self.process.pid if self.process else None,
+            "started_at": self.started_at.isoformat(),
+        }
+
 class AgentActor:
+    """Bounded pool of concurrent agent subprocesses."""
+
     def __init__(self) -> None:
-        self.process: asyncio.subprocess.Process | None = None
-        self.status = "idle"
-        self.current_run_id: int | None = None
+        self.max_concurrent_runs = settings.MAX_CONCURRENT_RUNS
+        self.runs: Dict[int, AgentRun] = {}
+        self._release_listeners: List[Callable[[], None]] = []
+        self._last_log_id: int | None = None
+        self._reserved_log_id = 0
+        self._reserve_lock: asyncio.Lock | None = None
+        self._starting = 0
+        self.parsers = ParserChain.from_names(settings.LOG_PARSERS)
 
-    async def start_task(self, prompt: str, task_id: int) -> None:
-        if self.status == "running":
-            raise Exception("Agent is already running")
+    @property
+    def status(self) -> str:
+        return "running" if self.runs else "idle"
 
-        self.status = "running"
-        await manager.broadcast({"type": "status", "data": "running"})
-        
-        # Create Run record
-        db = SessionLocal()
+    @property
+    def available_slots(self) -> int:
+        return max(self.max_concurrent_runs - len(self.runs) - self._starting, 0)
+
+    def active_runs(self) -> List[Dict[str, Any]]:
+        return [run.to_dict() for run in self.runs.values()]
+
+    def add_release_listener(self, callback: Callable[[], None]) -> None:
+        """Register a callback invoked whenever a run finishes and frees its slot."""
+        if callback not in self._release_listeners:
+            self._release_listeners.append(callback)
+
+    async def start_task(self, prompt: str, task_id: int, run_id: int | None = None) -> int:
+        """Start an agent run. Pass ``run_id`` to dispatch a run that is already queued."""
+        if not self.available_slots:
+            raise Exception(f"All {self.max_concurrent_runs} agent slots are busy")
+
+        dispatched_at = datetime.now(timezone.utc)
+        dispatch_started = time.perf_counter()
+
+        # Hold the slot while the Run row is written so concurrent callers see it taken
+        self._starting += 1
         try:
-            run = Run(task_id=task_id, status="running")
-            db.add(run)
-            db.commit()
-            db.refresh(run)
-            self.current_run_id = run.id # type: ignore
+            await self._ensure_log_ids()
+            run_id = await self._claim_run(prompt, task_id, run_id, dispatched_at)
         finally:
-            db.close()
+            self._starting -= 1
+
+        run = AgentRun(run_id, task_id)
+        self.runs[run_id] = run
 
         # Start Subprocess
         if settings.AUTOREFLEX_AGENT_CMD:
@@ -38,92 +92,235 @@ class AgentActor:
             cmd = settings.AUTOREFLEX_AGENT_CMD + [prompt]
         else:
             # Use default simulator
-            cmd = [sys.executable, "app/core/simulator.py", "--prompt", prompt]
-        
-        self.process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        asyncio.create_task(self._monitor_process())
+            cmd = [sys.executable, "app/core/simulator.py", "--prompt", prompt, *settings.SIMULATOR_ARGS]
+
+        try:
+            run.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=settings.AGENT_READ_CHUNK_SIZE,
+            )
+        except Exception:
+            self.runs.pop(run_id, None)
+            await self._finish_run(run_id, "failed", None)
+            self._release()
+            raise
+
+        if run.status == "cancelled":
+            # Stopped while spawning, when there was no process to kill yet. The
+            # monitor still runs so the run is recorded as cancelled and its slot freed
+            run.process.terminate()
+        else:
+            # Dispatch latency: slot claimed -> subprocess spawned
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Run).where(Run.id == run_id).values(
+                    status="running",
+                    start_time=datetime.now(timezone.utc),
+                    dispatch_latency_ms=(time.perf_counter() - dispatch_started) * 1000,
+                ))
+                await db.commit()
+            await self._broadcast_status(run)
+
+        run._monitor = asyncio.create_task(self._monitor_process(run))
+        return run_id
+
+    async def _claim_run(self, prompt: str, task_id: int, run_id: int | None, dispatched_at: datetime) -> int:
+        """Create the Run row, or move a queued one to ``starting``, recording its queue wait."""
+        async with AsyncSessionLocal() as db:
+            if run_id is None:
+                db_run = Run(
+                    task_id=task_id, prompt=prompt, status="starting",
+                    queued_at=dispatched_at, dispatched_at=dispatched_at, queue_wait_ms=0.0,
+                )
+                db.add(db_run)
+                await db.commit()
+                return db_run.id # type: ignore
+
+            # Claim in one statement: a run cancelled (here or in another worker) since
+            # the scheduler selected it no longer matches and must not be started
+            claimed: Any = (await db.execute(
+                update(Run)
+                .where(Run.id == run_id, Run.status == "queued")
+                .values(status="starting", dispatched_at=dispatched_at)
+                .returning(Run.queued_at)
+            )).first()
+            if claimed is None:
+                raise RunNotQueuedError(f"Run {run_id} is no longer queued")
+            queued_at = claimed.queued_at or dispatched_at
+            if queued_at.tzinfo is None:
+                queued_at = queued_at.replace(tzinfo=timezone.utc)
+            queue_wait = (dispatched_at - queued_at).total_seconds()
+            await db.execute(update(Run).where(Run.id == run_id).values(queue_wait_ms=queue_wait * 1000))
+            await db.commit()
+            RUN_QUEUE_WAIT_SECONDS.observe(queue_wait)
+            return run_id
+
+    async def stop_task(self, run_id: int | None = None) -> List[int]:
+        """Stop one run, or every active run when no id is given. Returns the stopped ids."""
+        if run_id is None:
+            targets = list(self.runs.values())
+        elif run_id in self.runs:
+            targets = [self.runs[run_id]]
+        else:
+            return []
 
-    async def stop_task(self) -> None:
-        if self.process and self.process.returncode is None:
-            self.process.terminate()
+        await asyncio.gather(*(self._stop_run(run) for run in targets))
+        return [run.run_id for run in targets]
+
+    async def _stop_run(self, run: AgentRun) -> None:
+        # Mark first so the monitor does not record the run as completed/failed
+        run.status = "cancelled"
+        if run.process and run.process.returncode is None:
             try:
-                await self.process.wait()
+                run.process.terminate()
+                await run.process.wait()
             except ProcessLookupError:
                 pass
-        
-        self.status = "idle"
-        await manager.broadcast({"type": "status", "data": "idle"})
-        
-        # Update Run record if exists
-        if self.current_run_id:
-            db = SessionLocal()
-            try:
-                run = db.query(Run).filter(Run.id == self.current_run_id).first()
-                if run:
-                    run.status = "cancelled" # type: ignore
-                    run.end_time = datetime.now(timezone.utc) # type: ignore
-                    db.commit()
-                    
-                    # Log cancellation
-                    log = Log(run_id=run.id, level="WARN", message="Task Manually Stopped")
-                    db.add(log)
-                    db.commit()
-            finally:
-                db.close()
-
-    async def _monitor_process(self) -> None:
-        if not self.process:
+
+        if run._monitor:
+            await run._monitor
+
+    async def _monitor_process(self, run: AgentRun) -> None:
+        if not run.process:
             return
 
-        # Read stdout line by line
+        # Drain both pipes at once: an agent blocked writing to a full stderr pipe
+        # would otherwise never reach EOF on stdout
+        await asyncio.gather(
+            self._read_stream(run, run.process.stdout, "stdout"),
+            self._read_stream(run, run.process.stderr, "stderr"),
+        )
+
+        await run.process.wait()
+        exit_code = run.process.returncode
+
+        if run.status == "cancelled":
+            await self._publish_log(run, "Task Manually Stopped", level="WARN")
+        else:
+            run.status = "completed" if exit_code == 0 else "failed"
+
+        # Persist whatever is still buffered before the run is marked finished
+        await log_ingestor.flush(run.run_id)
+        await self._finish_run(run.run_id, run.status, exit_code)
+        RUN_DURATION_SECONDS.observe((datetime.now(timezone.utc) - run.started_at).total_seconds(), status=run.status)
+
+        self.runs.pop(run.run_id, None)
+        await self._broadcast_status(run)
+        self._release()
+
+    async def _read_stream(self, run: AgentRun, stream: asyncio.StreamReader | None, name: str) -> None:
+        if stream is None:
+            return
         # We catch exceptions to ensure we don't crash the loop
         try:
-            assert self.process.stdout is not None
-            async for line in self.process.stdout:
-                if line:
-                    decoded_line = line.decode().strip()
-                    if decoded_line:
-                        self._log_to_db(decoded_line)
+            lines = read_lines(
+                stream, settings.LOG_MAX_LINE_BYTES, settings.AGENT_READ_CHUNK_SIZE, settings.LOG_LONG_LINE_MODE
+            )
+            async for line in lines:
+                if line.continuation:
+                    # The tail of a split line isn't parseable on its own
+                    await self._publish_log(run, line.text, default_level(name), name, "continuation")
+                else:
+                    decoded_line = line.text.strip()
+                    if not decoded_line:
+                        continue
+                    parsed = self.parsers.parse(decoded_line, name)
+                    message = f"{parsed.message} [truncated]" if line.truncated else parsed.message
+                    await self._publish_log(run, message, parsed.level, parsed.source, parsed.event_type)
+                if log_ingestor.backlog(run.run_id) >= log_ingestor.batch_size:
+                    # Batch is full: flush before reading more (backpressure on the agent)
+                    await log_ingestor.flush(run.run_id)
         except Exception as e:
-            print(f"Error reading subprocess stdout: {e}")
+            print(f"Error reading subprocess {name}: {e}")
 
-        await self.process.wait()
-        exit_code = self.process.returncode
-        
-        # Update Run completion
-        db = SessionLocal()
-        try:
-            run = db.query(Run).filter(Run.id == self.current_run_id).first()
-            if run:
-                run.status = "completed" if exit_code == 0 else "failed" # type: ignore
-                run.end_time = datetime.now(timezone.utc) # type: ignore
-                run.exit_code = exit_code # type: ignore
-                db.commit()
-        finally:
-            db.close()
+    def _release(self) -> None:
+        for callback in self._release_listeners:
+            callback()
+
+    async def _publish_log(
+        self, run: AgentRun, message: str, level: str = "INFO", source: str = "system", event_type: str | None = None
+    ) -> None:
+        # Ids are assigned here rather than by SQLite so live subscribers see the
+        # same id the row will have once the ingestor persists it.
+        await self._ensure_log_ids()
+        bus.publish("logs", {
+            "id": self._next_log_id(),
+            "run_id": run.run_id,
+            "task_id": run.task_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "level": level,
+            "message": message,
+            "source": source,
+            "event_type": event_type,
+        })
 
-        self.status = "idle"
-        await manager.broadcast({"type": "status", "data": "idle"})
-        self.current_run_id = None
+    @property
+    def last_log_id(self) -> int | None:
+        """Highest log id this process has handed out; None before the first."""
+        return self._last_log_id
 
-    def _log_to_db(self, message: str, level: str = "INFO") -> None:
-        if not self.current_run_id:
+    async def reserve_log_id(self) -> int:
+        """A fresh log id for a line written straight to the database (e.g. a retention marker)."""
+        await self._ensure_log_ids()
+        return self._next_log_id()
+
+    def reset_log_ids(self) -> None:
+        """Seed log ids from the database again before the next one is handed out."""
+        self._last_log_id = None
+        self._reserved_log_id = 0
+
+    async def _ensure_log_ids(self) -> None:
+        """Make sure at least one reserved log id is left, reserving the next block if not."""
+        if self._last_log_id is not None and self._last_log_id < self._reserved_log_id:
             return
-        
-        db = SessionLocal()
-        try:
-            log = Log(run_id=self.current_run_id, message=message, level=level)
-            db.add(log)
-            db.commit()
-            watcher.notify()
-        except Exception as e:
-            print(f"Failed to write log to DB: {e}")
-        finally:
-            db.close()
+        if self._reserve_lock is None:
+            self._reserve_lock = asyncio.Lock()
+        async with self._reserve_lock:
+            if self._last_log_id is not None and self._last_log_id < self._reserved_log_id:
+                return
+            async with AsyncSessionLocal() as db:
+                if self._last_log_id is None:
+                    # Archived runs no longer have rows in logs, and a previous leader may have
+                    # published ids it never wrote: none of them may be reused
+                    self._last_log_id = max(
+                        (await db.execute(select(func.max(Log.id)))).scalar() or 0,
+                        (await db.execute(select(func.max(LogArchive.last_log_id)))).scalar() or 0,
+                        (await db.execute(select(func.max(LogIdReservation.reserved_through)))).scalar() or 0,
+                    )
+                reserved = self._last_log_id + settings.LOG_ID_BLOCK_SIZE
+                # Committed before any id of the block is published
+                await db.merge(LogIdReservation(id=1, reserved_through=reserved))
+                await db.commit()
+            self._reserved_log_id = reserved
+
+    def _next_log_id(self) -> int:
+        assert self._last_log_id is not None and self._last_log_id < self._reserved_log_id, (
+            "_ensure_log_ids() must run before publishing logs"
+        )
+        self._last_log_id += 1
+        return self._last_log_id
+
+    async def _broadcast_status(self, run: AgentRun) -> None:
+        # "data" keeps the aggregate pool status for clients that only track one agent
+        message = {
+            "type": "status",
+            "data": self.status,
+            "run_id": run.run_id,
+            "task_id": run.task_id,
+            "run_status": run.status,
+        }
+        bus.publish("status", message)
+        await manager.broadcast(message, coalesce_key=f"status:{run.run_id}")
+
+    async def _finish_run(self, run_id: int, status: str, exit_code: int | None) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Run).where(Run.id == run_id).values(
+                status=status,
+                end_time=datetime.now(timezone.utc),
+                exit_code=exit_code,
+            ))
+            await db.commit()
 
-actor = AgentActor()
\ No newline at end of file
+actor = AgentActor()
+RUNS_ACTIVE.set_function(lambda: len(actor.runs))
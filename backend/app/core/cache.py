@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import ColumnElement, Select, delete, desc, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.core.metrics import OPTIMIZATION_CACHE_EVENTS
+from app.database import AsyncSessionLocal, OptimizationCacheEntry
+from app.models.schemas import OptimizedPrompt, TaskRequest
+
+PRUNE_EVERY = 100 # Stores between sweeps of expired and overflowing rows
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(value: str | None) -> str | None:
+    """Collapse whitespace so cosmetic edits to a templated task still hit the cache."""
+    if value is None:
+        return None
+    value = re.sub(r"\s+", " ", value).strip()
+    return value or None
+
+def cache_key(task: TaskRequest, optimizer_config: Dict[str, Any]) -> str:
+    """Content address of an optimization: the normalized request plus the optimizer that served it."""
+    canonical = {
+        "description": normalize_text(task.description),
+        "context_files": sorted({path.strip() for path in task.context_files if path.strip()}),
+        "constraints": normalize_text(task.constraints),
+        "optimizer": optimizer_config,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+class OptimizationCache:
+    """Two-tier cache of optimizer results.
+
+    An in-process LRU (``OPTIMIZATION_CACHE_MEMORY_SIZE`` entries) sits in front of
+    the ``optimization_cache`` table, which survives restarts and is capped at
+    ``OPTIMIZATION_CACHE_MAX_ROWS`` least recently used rows. Both tiers expire
+    entries after ``OPTIMIZATION_CACHE_TTL`` seconds.
+
+    Callers always get their own copy of a cached prompt, so changing it (e.g.
+    setting its ``id``) never alters the cache. The cache is an optimization only:
+    a database error makes a lookup a miss and skips a store.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = settings.OPTIMIZATION_CACHE_ENABLED
+        self.ttl = settings.OPTIMIZATION_CACHE_TTL
+        self.memory_size = settings.OPTIMIZATION_CACHE_MEMORY_SIZE
+        self.max_rows = settings.OPTIMIZATION_CACHE_MAX_ROWS
+        # key -> (expires_at as a time.time() value, cached prompt)
+        self._memory: "OrderedDict[str, Tuple[float, OptimizedPrompt]]" = OrderedDict()
+        self._stores_since_prune = 0
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "db_evictions": 0,
+            "expirations": 0,
+            "errors": 0,
+        }
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["db_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "hit_rate": round(self.hit_rate, 4),
+            "memory_entries": len(self._memory),
+            "enabled": self.enabled,
+        }
+
+    async def get(self, key: str) -> OptimizedPrompt | None:
+        if not self.enabled:
+            return None
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, prompt = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return prompt.model_copy()
+            del self._memory[key]
+            self.stats["expirations"] += 1
+
+        now = datetime.now(timezone.utc)
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(OptimizationCacheEntry, key)
+                if row is None or _as_aware(row.expires_at) <= now: # type: ignore
+                    self.stats["misses"] += 1
+                    return None
+                await db.execute(
+                    update(OptimizationCacheEntry)
+                    .where(OptimizationCacheEntry.key == key)
+                    .values(last_used_at=now, hits=OptimizationCacheEntry.hits + 1)
+                )
+                await db.commit()
+        except SQLAlchemyError as e:
+            logger.warning(f"Optimization cache lookup failed, treating it as a miss: {e}")
+            self.stats["errors"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        prompt = OptimizedPrompt(
+            original_task=row.original_task, # type: ignore
+            optimized_prompt=row.optimized_prompt, # type: ignore
+            reasoning=row.reasoning, # type: ignore
+            estimated_tokens=row.estimated_tokens, # type: ignore
+        )
+        self._remember(key, _as_aware(row.expires_at).timestamp(), prompt) # type: ignore
+        self.stats["db_hits"] += 1
+        return prompt.model_copy()
+
+    async def put(self, key: str, prompt: OptimizedPrompt) -> None:
+        if not self.enabled:
+            return
+
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.ttl)
+        # A copy: the caller goes on to use (and may change) the one it passed in
+        self._remember(key, expires_at.timestamp(), prompt.model_copy())
+        values = {
+            "original_task": prompt.original_task,
+            "optimized_prompt": prompt.optimized_prompt,
+            "reasoning": prompt.reasoning,
+            "estimated_tokens": prompt.estimated_tokens,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": expires_at,
+        }
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(OptimizationCacheEntry, key)
+                if row is None:
+                    db.add(OptimizationCacheEntry(key=key, hits=0, **values))
+                else:
+                    for name, value in values.items():
+                        setattr(row, name, value)
+                await db.commit()
+            self.stats["stores"] += 1
+
+            # Pruning scans the table, so do it every so often rather than on every store
+            self._stores_since_prune += 1
+            if self._stores_since_prune >= PRUNE_EVERY:
+                await self.prune()
+        except SQLAlchemyError as e:
+            logger.warning(f"Optimization cache store failed, skipping it: {e}")
+            self.stats["errors"] += 1
+
+    async def prune(self) -> int:
+        """Drop expired rows and the least recently used rows beyond ``max_rows``."""
+        self._stores_since_prune = 0
+        # Annotated so the legacy Column attributes (typed Never) yield typed expressions
+        key: ColumnElement[str] = OptimizationCacheEntry.key
+        expires_at: ColumnElement[datetime] = OptimizationCacheEntry.expires_at
+        async with AsyncSessionLocal() as db:
+            expired = (await db.execute(
+                delete(OptimizationCacheEntry).where(expires_at <= datetime.now(timezone.utc))
+            )).rowcount or 0 # type: ignore[attr-defined]
+            overflow: Select[Any] = (
+                select(OptimizationCacheEntry.key)
+                .order_by(desc(OptimizationCacheEntry.last_used_at))
+                .offset(self.max_rows)
+            )
+            evicted = (await db.execute(
+                delete(OptimizationCacheEntry).where(key.in_(overflow))
+            )).rowcount or 0 # type: ignore[attr-defined]
+            await db.commit()
+        self.stats["expirations"] += expired
+        self.stats["db_evictions"] += evicted
+        return expired + evicted
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def _remember(self, key: str, expires_at: float, prompt: OptimizedPrompt) -> None:
+        self._memory[key] = (expires_at, prompt)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+def _as_aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they were written as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+optimization_cache = OptimizationCache()
+OPTIMIZATION_CACHE_EVENTS.set_function(lambda: {(event,): count for event, count in optimization_cache.stats.items()})
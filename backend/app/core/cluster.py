@@ -0,0 +1,334 @@
+import asyncio
+import itertools
+import json
+import os
+from typing import IO, Any, Awaitable, Callable, Dict, List, Set
+
+from app.config import settings
+from app.core.actor import actor
+from app.core.events import bus
+from app.core.ingest import log_ingestor
+from app.core.scheduler import scheduler
+from app.core.websockets import manager
+
+FRAME_LIMIT = 2 ** 24 # Longest frame a follower reads; frames carry whole log lines, so far above LOG_MAX_LINE_BYTES
+PENDING_PAGE_BYTES = FRAME_LIMIT // 2 # Encoded entries per pending_logs reply, leaving room for the envelope
+
+
+class ClusterUnavailableError(Exception):
+    """The leader could not be reached in time (e.g. while a new one takes over)."""
+
+class ClusterCallError(Exception):
+    """The leader ran a call and it raised."""
+
+class Cluster:
+    """Coordinates uvicorn worker processes (``WORKERS`` > 1).
+
+    One worker holds an exclusive ``flock`` on ``CLUSTER_LOCK_PATH`` and is the
+    leader: it alone runs agents, the scheduler, log ingestion and retention, and
+    listens on a Unix socket at ``CLUSTER_SOCKET_PATH``. The others connect to it as
+    followers. Each log entry and run status the leader publishes is forwarded to
+    every follower, which publishes it on its own event bus, so WebSocket clients
+    see every run whichever worker they are on. Requests that touch run state
+    (``call``) are answered by the leader. When the leader exits its lock is
+    released and a follower takes over.
+
+    Frames are newline-delimited JSON: ``{"topic", "data"}`` events to followers,
+    ``{"id", "method", "params"}`` calls to the leader, ``{"id", "result"|"error"}``
+    replies. With a single worker nothing is opened and every call runs in-process.
+    """
+
+    def __init__(self) -> None:
+        self.workers = settings.WORKERS
+        self.socket_path = settings.CLUSTER_SOCKET_PATH
+        self.lock_path = settings.CLUSTER_LOCK_PATH
+        self.call_timeout = settings.CLUSTER_CALL_TIMEOUT
+        self.is_leader = False
+        self._on_lead: Callable[[], Awaitable[None]] | None = None
+        self._lock_file: IO[str] | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._followers: Set["FollowerLink"] = set()
+        self._tasks: List[asyncio.Task[None]] = []
+        self._writer: asyncio.StreamWriter | None = None
+        self._connected: asyncio.Event | None = None
+        self._calls: Dict[int, asyncio.Future[Any]] = {}
+        self._call_ids = itertools.count(1)
+        self._methods: Dict[str, Callable[..., Awaitable[Any]]] = {
+            "status": self._status,
+            "dispatch": self._dispatch,
+            "stop": self._stop,
+            "pending_logs": self._pending_logs,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    async def start(self, on_lead: Callable[[], Awaitable[None]]) -> None:
+        """Become leader (and run ``on_lead``) or follow the current one."""
+        self._on_lead = on_lead
+        self._connected = asyncio.Event()
+        if not self.enabled or self._try_lock():
+            await self._lead()
+        else:
+            self._tasks.append(asyncio.create_task(self._follow()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._server is not None:
+            self._server.close()
+            for link in list(self._followers):
+                link.close()
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._fail_calls(ClusterUnavailableError("Worker is shutting down"))
+        if self._lock_file is not None:
+            # Closing the file releases the flock: a follower takes over
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_leader = False
+
+    async def call(self, method: str, **params: Any) -> Any:
+        """Run ``method`` on the leader: in-process here, or over the socket from a follower."""
+        if self.is_leader or not self.enabled:
+            return await self._methods[method](**params)
+        assert self._connected is not None, "Cluster.start() must run before call()"
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=self.call_timeout)
+        except asyncio.TimeoutError:
+            raise ClusterUnavailableError("No cluster leader is reachable")
+        if self._writer is None:
+            # Promoted to leader while waiting
+            return await self._methods[method](**params)
+
+        call_id = next(self._call_ids)
+        reply: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._calls[call_id] = reply
+        try:
+            self._writer.write(_frame({"id": call_id, "method": method, "params": params}))
+            return await asyncio.wait_for(reply, timeout=self.call_timeout)
+        except asyncio.TimeoutError:
+            raise ClusterUnavailableError(f"Cluster leader did not answer {method} in time")
+        finally:
+            self._calls.pop(call_id, None)
+
+    # Leader
+
+    def _try_lock(self) -> bool:
+        import fcntl
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _lead(self) -> None:
+        self.is_leader = True
+        # A previous leader may have published ids past what is in the database:
+        # start after its last reserved block
+        actor.reset_log_ids()
+        if self.enabled:
+            # We hold the lock, so a socket file left here belongs to a dead leader
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            self._server = await asyncio.start_unix_server(self._accept, path=self.socket_path)
+            for topic in ("logs", "status"):
+                self._tasks.append(asyncio.create_task(self._forward(topic)))
+            print(f"Cluster leader (pid {os.getpid()}) listening on {self.socket_path}")
+        assert self._connected is not None and self._on_lead is not None
+        self._connected.set()
+        await self._on_lead()
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        link = FollowerLink(writer, settings.CLUSTER_QUEUE_SIZE, self._followers.discard)
+        self._followers.add(link)
+        link.start()
+        try:
+            async for line in reader:
+                message = json.loads(line)
+                asyncio.create_task(self._answer(link, message))
+        except (ConnectionError, ValueError) as e:
+            print(f"Cluster follower connection error: {e}")
+        finally:
+            link.close()
+
+    async def _answer(self, link: "FollowerLink", message: Dict[str, Any]) -> None:
+        try:
+            result = await self._methods[message["method"]](**message.get("params", {}))
+            reply = {"id": message["id"], "result": result}
+        except Exception as e:
+            reply = {"id": message["id"], "error": f"{type(e).__name__}: {e}"}
+        link.send(_frame(reply))
+
+    async def _forward(self, topic: str) -> None:
+        queue = bus.subscribe(topic)
+        try:
+            while True:
+                message = await queue.get()
+                if not self._followers:
+                    continue
+                # Encode once for every follower
+                frame = _frame({"topic": topic, "data": message})
+                for link in list(self._followers):
+                    link.send(frame)
+        finally:
+            bus.unsubscribe(topic, queue)
+
+    async def _status(self) -> Dict[str, Any]:
+        return {
+            "status": actor.status,
+            "max_concurrent_runs": actor.max_concurrent_runs,
+            "available_slots": actor.available_slots,
+            "runs": actor.active_runs(),
+        }
+
+    async def _dispatch(self, run_id: int) -> bool:
+        """Start queued runs while slots are free. True if ``run_id`` is now running."""
+        await scheduler.dispatch_pending()
+        return run_id in actor.runs
+
+    async def _stop(self, run_id: int | None = None) -> List[int]:
+        return await actor.stop_task(run_id)
+
+    async def _pending_logs(self, after_id: int = 0, limit: int = 500) -> Dict[str, Any]:
+        """One page of uncommitted entries above ``after_id``, small enough for one frame.
+
+        ``more`` is true when entries were left out; ask again from the last id.
+        ``published_through`` is the highest id handed out when the page was taken
+        (None if none was): every id up to it is either in the page or committed.
+        """
+        published_through = actor.last_log_id
+        entries = log_ingestor.pending(after_id, limit + 1)
+        page: List[Dict[str, Any]] = []
+        size = 0
+        for entry in entries[:limit]:
+            size += len(json.dumps(entry, separators=(",", ":")))
+            if page and size > PENDING_PAGE_BYTES:
+                break
+            page.append(entry)
+        return {"entries": page, "more": len(page) < len(entries), "published_through": published_through}
+
+    # Follower
+
+    async def _follow(self) -> None:
+        assert self._connected is not None
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=FRAME_LIMIT)
+            except OSError:
+                # No leader listening (yet): take over if the lock is free, else retry
+                if self._try_lock():
+                    await self._lead()
+                    return
+                await asyncio.sleep(0.2)
+                continue
+
+            self._writer = writer
+            self._connected.set()
+            try:
+                async for line in reader:
+                    self._receive(json.loads(line))
+            except (ConnectionError, ValueError) as e:
+                print(f"Cluster leader connection error: {e}")
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+                self._fail_calls(ClusterUnavailableError("Lost the connection to the cluster leader"))
+                # Entries sent while we were away are lost to our clients; make them
+                # reconnect with their last log id so replay fills the gap
+                for websocket in list(manager.active_connections):
+                    manager.disconnect(websocket)
+
+    def _receive(self, message: Dict[str, Any]) -> None:
+        topic = message.get("topic")
+        if topic == "logs":
+            bus.publish("logs", message["data"])
+        elif topic == "status":
+            status = message["data"]
+            asyncio.create_task(manager.broadcast(status, coalesce_key=f"status:{status.get('run_id')}"))
+        elif "id" in message:
+            reply = self._calls.get(message["id"])
+            if reply is None or reply.done():
+                return
+            if "error" in message:
+                reply.set_exception(ClusterCallError(message["error"]))
+            else:
+                reply.set_result(message.get("result"))
+
+    def _fail_calls(self, error: Exception) -> None:
+        for reply in self._calls.values():
+            if not reply.done():
+                reply.set_exception(error)
+        self._calls.clear()
+
+class FollowerLink:
+    """The leader's side of one follower connection.
+
+    Frames are queued and written by a single task, several per write, so a slow
+    follower never blocks the others. A follower that falls ``max_queue`` frames
+    behind is disconnected; it reconnects and its clients catch up through replay.
+    """
+
+    def __init__(
+        self, writer: asyncio.StreamWriter, max_queue: int, on_close: Callable[["FollowerLink"], None]
+    ) -> None:
+        self.writer = writer
+        self.max_queue = max_queue
+        self.closed = False
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue()
+        self._task: asyncio.Task[None] | None = None
+        self._on_close = on_close
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: bytes) -> None:
+        if self.closed:
+            return
+        if self._queue.qsize() >= self.max_queue:
+            print(f"Cluster follower fell {self.max_queue} frames behind; disconnecting it")
+            self.close()
+            return
+        self._queue.put_nowait(frame)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self.writer.close()
+        self._on_close(self)
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                frames = [await self._queue.get()]
+                while not self._queue.empty():
+                    frames.append(self._queue.get_nowait())
+                self.writer.write(b"".join(frames))
+                await self.writer.drain()
+        except ConnectionError:
+            self.close()
+
+def _frame(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+# Default cluster instance
+cluster = Cluster()
@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Dict, List
+
+
+class EventBus:
+    """In-process pub/sub. Every subscriber gets its own queue per topic, so a slow
+    consumer (e.g. DB persistence) never delays a fast one (e.g. WebSocket fan-out)."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[asyncio.Queue[Any]]] = {}
+
+    def subscribe(self, topic: str) -> asyncio.Queue[Any]:
+        queue: asyncio.Queue[Any] = asyncio.Queue()
+        self._subscribers.setdefault(topic, []).append(queue)
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue[Any]) -> None:
+        subscribers = self._subscribers.get(topic, [])
+        if queue in subscribers:
+            subscribers.remove(queue)
+
+    def publish(self, topic: str, message: Any) -> None:
+        for queue in self._subscribers.get(topic, []):
+            queue.put_nowait(message)
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, []))
+
+bus = EventBus()
@@ -0,0 +1,121 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, Log, LogArchiveChunk
+
+ARCHIVE_INFLATE_SIZE = 1024 * 1024 # Most decompressed bytes produced per step when reading an archive
+
+# Columns only: rows come back as tuples, never as Log ORM objects
+LOG_COLUMNS = (Log.id, Log.run_id, Log.timestamp, Log.level, Log.message, Log.source, Log.event_type)
+
+async def iter_run_logs(
+    run_id: int,
+    task_id: int | None = None,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    level: str | None = None,
+    event_type: str | None = None,
+    chunk_size: int | None = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Committed log entries of one run in id order, ``chunk_size`` rows at a time.
+
+    Rows are read through a server-side cursor (``AsyncSession.stream``), so memory
+    stays flat no matter how many lines the run produced. Logs that retention moved
+    into an archive are streamed chunk by chunk, decompressed on the fly, and come first.
+    """
+    chunk_size = chunk_size or settings.LOG_EXPORT_CHUNK_SIZE
+    async with AsyncSessionLocal() as db:
+        archived: Any = await db.stream(
+            select(LogArchiveChunk.data).where(LogArchiveChunk.run_id == run_id).order_by(LogArchiveChunk.seq)
+        )
+        chunk: List[Dict[str, Any]] = []
+        async for entry in iter_archive(archived.scalars()):
+            if after_id is not None and entry["id"] <= after_id:
+                continue
+            if before_id is not None and entry["id"] >= before_id:
+                break
+            timestamp = datetime.fromisoformat(entry["timestamp"])
+            if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+                continue
+            # Archives written before logs had an event type lack the key
+            entry.setdefault("event_type", None)
+            if level is not None and entry["level"] != level:
+                continue
+            if event_type is not None and entry["event_type"] != event_type:
+                continue
+            chunk.append({**entry, "task_id": task_id})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    query: Any = select(*LOG_COLUMNS).where(Log.run_id == run_id)
+    if after_id is not None:
+        query = query.where(Log.id > after_id)
+    if before_id is not None:
+        query = query.where(Log.id < before_id)
+    if since is not None:
+        query = query.where(Log.timestamp >= since)
+    if until is not None:
+        query = query.where(Log.timestamp < until)
+    if level is not None:
+        query = query.where(Log.level == level)
+    if event_type is not None:
+        query = query.where(Log.event_type == event_type)
+    query = query.order_by(Log.id)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions(chunk_size):
+            yield [
+                {
+                    "id": log_id,
+                    "run_id": log_run_id,
+                    "task_id": task_id,
+                    "timestamp": timestamp.isoformat(),
+                    "level": row_level,
+                    "message": message,
+                    "source": source,
+                    "event_type": row_event_type,
+                }
+                for log_id, log_run_id, timestamp, row_level, message, source, row_event_type in rows
+            ]
+
+async def iter_archive(chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Entries of a gzip NDJSON archive stored as consecutive chunks, decompressed incrementally."""
+    decompressor = zlib.decompressobj(wbits=31)
+    pending = b""
+    async for data in chunks:
+        while data:
+            # Cap the output per step: repetitive logs inflate by orders of magnitude
+            pending += decompressor.decompress(data, ARCHIVE_INFLATE_SIZE)
+            data = decompressor.unconsumed_tail
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield json.loads(line)
+    pending += decompressor.flush()
+    if pending.strip():
+        yield json.loads(pending)
+
+async def ndjson_chunks(entries: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """One JSON document per line; each chunk of entries becomes one write."""
+    async for chunk in entries:
+        if chunk:
+            yield "".join(json.dumps(entry) + "\n" for entry in chunk).encode()
+
+async def gzip_chunks(data: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a byte stream on the fly into a single gzip member."""
+    compressor = zlib.compressobj(wbits=31)  # 16 + MAX_WBITS: gzip header and trailer
+    async for chunk in data:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
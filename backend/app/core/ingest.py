@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.core.events import bus
+from app.core.metrics import LOG_FLUSH_SECONDS, LOG_INGEST_BACKLOG, LOG_LINES_INGESTED
+from app.database import AsyncSessionLocal, Log
+
+logger = logging.getLogger(__name__)
+
+class LogIngestor:
+    """Persists log entries published on the event bus, in bulk.
+
+    Entries are buffered per run and flushed when a run's buffer reaches
+    ``LOG_FLUSH_BATCH_SIZE`` lines or every ``LOG_FLUSH_INTERVAL`` seconds. Inserts
+    go through the async engine so SQLite commits never block the event loop.
+    """
+
+    def __init__(self) -> None:
+        self.is_running = False
+        self.batch_size = settings.LOG_FLUSH_BATCH_SIZE
+        self.flush_interval = settings.LOG_FLUSH_INTERVAL
+        self.max_attempts = settings.LOG_FLUSH_MAX_ATTEMPTS
+        self._failures: Dict[int, int] = {}
+        self._buffers: Dict[int, List[Dict[str, Any]]] = {}
+        self._inflight: List[List[Dict[str, Any]]] = []
+        self._queue: asyncio.Queue[Dict[str, Any]] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._event: asyncio.Event | None = None
+        self._write_lock: asyncio.Lock | None = None
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+
+        self.is_running = True
+        self._event = asyncio.Event()
+        self._queue = bus.subscribe("logs")
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        self.is_running = False
+        if self._event:
+            self._event.set()
+        if self._task:
+            await self._task
+            self._task = None
+        self._event = None
+        # Failed writes go back into the buffers; retry them before shutting down
+        for _ in range(self.max_attempts):
+            await self.flush()
+            if not self._buffers:
+                break
+        if self._queue is not None:
+            bus.unsubscribe("logs", self._queue)
+            self._queue = None
+
+    def backlog(self, run_id: int) -> int:
+        """Number of entries for a run that are published but not yet written."""
+        self._drain()
+        return len(self._buffers.get(run_id, []))
+
+    def pending(self, after_id: int = 0, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Entries published but not yet committed (buffered or mid-write), with an id above ``after_id``.
+
+        At most ``limit`` of them, lowest ids first.
+        """
+        self._drain()
+        buffers = list(self._buffers.values()) + self._inflight
+        entries = (entry for buffer in buffers for entry in buffer if entry["id"] > after_id)
+        if limit is None:
+            return sorted(entries, key=lambda entry: entry["id"])
+        return heapq.nsmallest(limit, entries, key=lambda entry: entry["id"])
+
+    async def flush(self, run_id: int | None = None) -> int:
+        """Write buffered entries for one run (or all runs). Returns the number of rows written."""
+        self._drain()
+        if run_id is None:
+            entries = [entry for buffer in self._buffers.values() for entry in buffer]
+            self._buffers.clear()
+        else:
+            entries = self._buffers.pop(run_id, [])
+        if not entries:
+            return 0
+
+        # Serialize writes so rows keep their arrival order across flushes
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        # Stay visible to pending() until committed, so catch-up never sees a gap
+        self._inflight.append(entries)
+        try:
+            async with self._write_lock:
+                started = time.perf_counter()
+                await self._write(entries)
+                LOG_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        except Exception as e:
+            self._requeue(entries, e)
+            return 0
+        finally:
+            self._inflight = [batch for batch in self._inflight if batch is not entries]
+        for written in {entry["run_id"] for entry in entries}:
+            self._failures.pop(written, None)
+        LOG_LINES_INGESTED.inc(len(entries))
+        return len(entries)
+
+    def _requeue(self, entries: List[Dict[str, Any]], error: Exception) -> None:
+        """Put a batch that failed to write back at the front of its runs' buffers.
+
+        Live clients have already seen these ids, so dropping them would leave a
+        permanent gap; a run whose writes keep failing is given up on after
+        ``max_attempts``.
+        """
+        by_run: Dict[int, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_run.setdefault(entry["run_id"], []).append(entry)
+        for run_id, failed in by_run.items():
+            attempts = self._failures.get(run_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self._failures.pop(run_id, None)
+                logger.error(
+                    f"Dropping {len(failed)} log line(s) of run {run_id} after {attempts} failed writes: {error}"
+                )
+                continue
+            self._failures[run_id] = attempts
+            self._buffers[run_id] = failed + self._buffers.get(run_id, [])
+            logger.warning(
+                f"Failed to write {len(failed)} log line(s) of run {run_id} "
+                f"(attempt {attempts} of {self.max_attempts}), will retry: {error}"
+            )
+
+    def buffered(self) -> int:
+        """Entries published but not yet written, across all runs."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + sum(len(buffer) for buffer in self._buffers.values())
+
+    def _drain(self) -> None:
+        if self._queue is None:
+            return
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self._buffers.setdefault(entry["run_id"], []).append(entry)
+
+    async def _write(self, entries: List[Dict[str, Any]]) -> None:
+        rows = [
+            {
+                "id": entry["id"],
+                "run_id": entry["run_id"],
+                "timestamp": datetime.fromisoformat(entry["timestamp"]),
+                "level": entry["level"],
+                "message": entry["message"],
+                "source": entry["source"],
+                "event_type": entry.get("event_type"),
+            }
+            for entry in entries
+        ]
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(Log), rows)
+            await db.commit()
+
+    async def _flush_loop(self) -> None:
+        while self.is_running and self._event:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+            self._event.clear()
+            await self.flush()
+
+log_ingestor = LogIngestor()
+LOG_INGEST_BACKLOG.set_function(log_ingestor.buffered)
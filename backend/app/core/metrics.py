@@ -0,0 +1,191 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+# Scrape-time source of samples: a plain value, or one value per label tuple
+Collector = Callable[[], float | Dict[LabelValues, float]]
+
+# Seconds; spans sub-millisecond fan-outs up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds; agent runs and queue waits take minutes rather than milliseconds
+LONG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+class Metric:
+    """A named metric family, optionally split by labels.
+
+    Updates are a dict lookup and an addition with no locking: everything that
+    records metrics runs on the event loop.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._collect: Collector | None = None
+        registry.register(self)
+
+    def set_function(self, collect: Collector) -> None:
+        """Read the value(s) at scrape time instead, for state that is already tracked elsewhere."""
+        self._collect = collect
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if not labels and not self.labelnames:
+            return ()
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _values(self) -> Dict[LabelValues, float]:
+        if self._collect is None:
+            return {}
+        values = self._collect()
+        return values if isinstance(values, dict) else {(): values}
+
+    def samples(self) -> List[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        """(name suffix, label values, extra label pair, value) rows for the exposition."""
+        return [("", key, (), value) for key, value in sorted(self._values().items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            pairs = [f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, key)]
+            if extra:
+                pairs.append(f'{extra[0]}="{extra[1]}"')
+            labels = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}{suffix}{labels} {_format(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._counts: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._counts[key] = self._counts.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values().get(self._key(labels), 0.0)
+
+    def _values(self) -> Dict[LabelValues, float]:
+        return self._counts if self._collect is None else super()._values()
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._counts[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, the last one for +Inf; [sum, count])
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+        counts, totals = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[1][1]) if series else 0
+
+    def samples(self) -> List[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        rows: List[Tuple[str, LabelValues, Tuple[str, ...], float]] = []
+        for key, (counts, (total, count)) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                rows.append(("_bucket", key, ("le", _format(bound)), cumulative))
+            rows.append(("_sum", key, (), total))
+            rows.append(("_count", key, (), count))
+        return rows
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines += metric.render()
+            except Exception as e:
+                # A broken collector must not take the whole scrape down
+                print(f"Failed to collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+registry = MetricsRegistry()
+
+# Log pipeline
+LOG_LINES_INGESTED = Counter("autoreflex_log_lines_ingested_total", "Log lines written to the database")
+LOG_FLUSH_SECONDS = Histogram("autoreflex_log_flush_seconds", "Time to insert and commit one batch of log lines")
+LOG_INGEST_BACKLOG = Gauge("autoreflex_log_ingest_backlog", "Log lines published but not yet written")
+OBSERVER_QUERY_SECONDS = Histogram(
+    "autoreflex_observer_query_seconds", "Time of one catch-up query for a reconnecting client"
+)
+OBSERVER_LAG = Gauge("autoreflex_observer_lag", "Log entries published but not yet forwarded to WebSocket clients")
+
+# WebSockets
+WS_BROADCAST_SECONDS = Histogram("autoreflex_ws_broadcast_seconds", "Time to fan one message out to every client queue")
+WS_CLIENTS = Gauge("autoreflex_ws_clients", "Connected WebSocket clients")
+WS_QUEUE_DEPTH = Gauge("autoreflex_ws_send_queue_depth", "Messages waiting in a client's send queue", ["client"])
+WS_DROPPED = Counter("autoreflex_ws_dropped_messages_total", "Messages dropped by the slow-consumer policy")
+
+# Optimizer
+OPTIMIZE_SECONDS = Histogram("autoreflex_optimize_seconds", "Time to answer one optimization", ["result"])
+OPTIMIZATION_CACHE_EVENTS = Counter("autoreflex_optimization_cache_events_total",
+                                    "Optimization cache lookups, stores and evictions", ["event"])
+
+# Runs
+RUNS_ACTIVE = Gauge("autoreflex_runs_active", "Agent runs currently executing")
+RUN_DURATION_SECONDS = Histogram(
+    "autoreflex_run_duration_seconds", "Wall time of finished runs", ["status"], buckets=LONG_BUCKETS
+)
+RUN_QUEUE_WAIT_SECONDS = Histogram(
+    "autoreflex_run_queue_wait_seconds", "Time from queued to dispatched", buckets=LONG_BUCKETS
+)
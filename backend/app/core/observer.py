@@ -1,78 +1,145 @@
 import asyncio
-from sqlalchemy import func
-from app.database import SessionLocal, Log
-from app.core.websockets import manager
+import json
+from typing import Any, Dict, List
+from sqlalchemy import select
+from app.database import AsyncSessionLocal, Log, Run
+from app.core.events import bus
+from app.core.metrics import OBSERVER_LAG, OBSERVER_QUERY_SECONDS
+from app.core.cluster import cluster
+from app.core.websockets import manager, ClientConnection
+from app.config import settings
 
 class LogWatcher:
+    """Streams log entries from the event bus to WebSocket clients.
+
+    Live entries are pushed straight from the bus; the DB is only read to catch
+    up clients that reconnect with the last log id they saw (see ``replay``).
+    """
+
     def __init__(self) -> None:
         self.is_running = False
         self.last_log_id: int = 0
         self._task: asyncio.Task[None] | None = None
-        self._event: asyncio.Event | None = None
+        self._queue: asyncio.Queue[Dict[str, Any] | None] | None = None
+        self.replay_page_size = settings.LOG_REPLAY_PAGE_SIZE
 
     async def start(self) -> None:
         if self.is_running:
             return
 
         self.is_running = True
-        self._event = asyncio.Event()
-        
-        # Initialize last_log_id to avoid replaying old logs on restart
-        db = SessionLocal()
-        try:
-            max_id = db.query(func.max(Log.id)).scalar()
-            self.last_log_id = max_id if max_id else 0
-        finally:
-            db.close()
-
-        print(f"Observer started. Watching for logs > {self.last_log_id}")
-        self._task = asyncio.create_task(self._poll_loop())
+        self._queue = bus.subscribe("logs")
+        print("Observer started. Streaming live logs from the event bus")
+        self._task = asyncio.create_task(self._forward_loop())
 
     async def stop(self) -> None:
         self.is_running = False
-        if self._event:
-            self._event.set()
+        if self._queue is not None:
+            self._queue.put_nowait(None)
         if self._task:
             await self._task
             self._task = None
-        self._event = None
-
-    def notify(self) -> None:
-        """Notify the observer that new logs might be available."""
-        if self._event:
-            self._event.set()
-
-    async def _poll_loop(self) -> None:
-        while self.is_running and self._event:
-            # Check logs immediately upon start or wake up
-            await self._check_logs()
-            
-            # Wait for notification
-            self._event.clear()
+        if self._queue is not None:
+            bus.unsubscribe("logs", self._queue)
+            self._queue = None
+
+    async def replay(self, client: ClientConnection, last_log_id: int) -> None:
+        """Catch a reconnecting client up from ``last_log_id``, then switch it to live delivery.
+
+        Live entries are held on the client while pages are read from the indexed
+        logs table through the async engine. Entries that are published but not yet
+        committed are taken from the ingestor and merged in by id: runs are flushed
+        separately, so committed rows can overtake lower, still buffered ids. The
+        client sees every id exactly once, in order.
+        """
+        client.begin_replay(last_log_id)
+        cursor = last_log_id
+        try:
+            while not client.closed:
+                # Snapshot uncommitted entries *before* querying: anything published by
+                # then and missing from the snapshot was committed and shows up in the query.
+                # In multi-worker mode only the leader's ingestor holds them
+                pending = await cluster.call("pending_logs", after_id=cursor, limit=self.replay_page_size)
+                page = await self.fetch_since(cursor, self.replay_page_size)
+
+                # Only ids both sources are complete for are safe to send: later ones
+                # arrive live (held on the client) or on the next pass
+                bound = pending["published_through"]
+                truncated = False
+                if pending["more"]:
+                    bound = pending["entries"][-1]["id"]
+                    truncated = True
+                if len(page) >= self.replay_page_size and (bound is None or page[-1]["id"] < bound):
+                    bound = page[-1]["id"]
+                    truncated = True
+                merged = {entry["id"]: entry for entry in pending["entries"] + page}
+                entries = [merged[log_id] for log_id in sorted(merged) if bound is None or log_id <= bound]
+                cursor = await self._send_replay(client, entries, cursor)
+                if truncated:
+                    continue
+                if client.finish_replay(cursor):
+                    break
+        except Exception as e:
+            # A client we cannot catch up reliably reconnects and tries again
+            print(f"Replay from log {last_log_id} failed: {e}")
+            client.close()
+            return
+
+        client.enqueue(json.dumps({"type": "replay_complete", "data": {"last_log_id": client.last_log_id}}))
+
+    async def _send_replay(self, client: ClientConnection, entries: List[Dict[str, Any]], cursor: int) -> int:
+        for entry in entries:
+            message = {"type": "log", "data": entry}
+            if client.wants(message):
+                await client.put(json.dumps(message))
+            cursor = entry["id"]
+        return cursor
+
+    async def fetch_since(self, last_log_id: int, limit: int | None = None) -> List[Dict[str, Any]]:
+        query: Any = (
+            select(Log, Run.task_id)
+            .outerjoin(Run, Run.id == Log.run_id)
+            .where(Log.id > last_log_id)
+            .order_by(Log.id)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        with OBSERVER_QUERY_SECONDS.time():
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(query)).all()
+        return [
+            {
+                "id": log.id,
+                "run_id": log.run_id,
+                "task_id": task_id,
+                "timestamp": log.timestamp.isoformat(),
+                "level": log.level,
+                "message": log.message,
+                "source": log.source,
+                "event_type": log.event_type,
+            }
+            for log, task_id in rows
+        ]
+
+    def lag(self) -> int:
+        """Entries published on the bus that have not been forwarded to clients yet."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _forward_loop(self) -> None:
+        while self.is_running and self._queue is not None:
             try:
-                await self._event.wait()
+                entry = await self._queue.get()
             except asyncio.CancelledError:
                 break
+            if entry is None:
+                break
 
-    async def _check_logs(self) -> None:
-        db = SessionLocal()
-        try:
-            # Fetch new logs
-            logs = db.query(Log).filter(Log.id > self.last_log_id).order_by(Log.id).all()
-            
-            for log in logs:
-                entry = {
-                    "timestamp": log.timestamp.isoformat(),
-                    "level": log.level,
-                    "message": log.message,
-                    "source": log.source
-                }
+            try:
                 await manager.broadcast({"type": "log", "data": entry})
-                self.last_log_id = log.id # type: ignore
-        except Exception as e:
-            print(f"Observer error: {e}")
-        finally:
-            db.close()
+                self.last_log_id = entry["id"]
+            except Exception as e:
+                print(f"Observer error: {e}")
 
 # Default watcher instance
-watcher = LogWatcher()
\ No newline at end of file
+watcher = LogWatcher()
+OBSERVER_LAG.set_function(watcher.lag)
@@ -1,36 +1,178 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
 from app.models.schemas import TaskRequest, OptimizedPrompt
+from app.core.cache import optimization_cache, cache_key
+from app.core.metrics import OPTIMIZE_SECONDS
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+class OptimizerTimeoutError(Exception):
+    """Raised when an optimization does not finish within ``OPTIMIZER_TIMEOUT``."""
+
+# Bump when the prompt template or signature changes, so cached results are not reused
+OPTIMIZER_VERSION = 1
+
 class PromptOptimizer:
     def __init__(self) -> None:
         self.dspy_available = False
+        self.max_concurrency = settings.OPTIMIZER_MAX_CONCURRENCY
+        self.timeout = settings.OPTIMIZER_TIMEOUT
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        # cache key -> task computing it, shared by every caller asking for that key
+        self._inflight: Dict[str, asyncio.Task[OptimizedPrompt]] = {}
+        self.coalesced = 0
+        self._loaded = False
+        self._loading: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Begin loading the optimizer backend in the background, so the first
+        optimization doesn't pay for it and startup doesn't wait for it."""
+        if not self._loaded and self._loading is None:
+            self._loading = asyncio.create_task(self._load())
+
+    async def load(self) -> None:
+        """Wait until the backend is loaded, loading it now if nothing has started it."""
+        if self._loaded:
+            return
+        self.start()
+        assert self._loading is not None
+        await asyncio.shield(self._loading)
+
+    async def _load(self) -> None:
         if settings.USE_REAL_OPTIMIZER:
-            try:
-                import dspy
-                # Assume env vars OPENAI_API_KEY or similar are set for DSPy providers
-                # Default to OpenAI for now as a standard example, user can configure dspy settings globally
-                dspy.settings.configure(lm=dspy.OpenAI(model='gpt-4o'))
-                self.dspy_available = True
-                logger.info("Real DSPy optimizer enabled.")
-            except ImportError:
-                logger.warning("USE_REAL_OPTIMIZER is True but dspy is not installed. Falling back to mock.")
-            except Exception as e:
-                logger.warning(f"Failed to initialize DSPy: {e}. Falling back to mock.")
+            # Importing dspy takes seconds; keep it off the event loop
+            await asyncio.to_thread(self._configure_dspy)
+        self._loaded = True
+
+    def _configure_dspy(self) -> None:
+        try:
+            import dspy
+            # Assume env vars OPENAI_API_KEY or similar are set for DSPy providers
+            # Default to OpenAI for now as a standard example, user can configure dspy settings globally
+            dspy.settings.configure(lm=dspy.OpenAI(model=settings.OPTIMIZER_MODEL))
+            self.dspy_available = True
+            logger.info("Real DSPy optimizer enabled.")
+        except ImportError:
+            logger.warning("USE_REAL_OPTIMIZER is True but dspy is not installed. Falling back to mock.")
+        except Exception as e:
+            logger.warning(f"Failed to initialize DSPy: {e}. Falling back to mock.")
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Everything besides the request that shapes the result; part of the cache key."""
+        if self.dspy_available:
+            return {"engine": "dspy", "model": settings.OPTIMIZER_MODEL, "version": OPTIMIZER_VERSION}
+        return {"engine": "mock", "version": OPTIMIZER_VERSION}
 
     async def optimize(self, task: TaskRequest) -> OptimizedPrompt:
         """
         Takes a raw task request and returns a structured, optimized prompt.
+        Identical requests (after normalization) are served from the optimization cache,
+        and identical requests arriving while one is still computing share its result.
         """
-        
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result, outcome = await self._optimize_shared(task)
+            return result
+        except OptimizerTimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            OPTIMIZE_SECONDS.observe(time.perf_counter() - started, result=outcome)
+
+    async def _optimize_shared(self, task: TaskRequest) -> Tuple[OptimizedPrompt, str]:
+        await self.load()  # Decides the engine, which is part of the cache key
+        key = cache_key(task, self.config)
+        shared = self._inflight.get(key)
+        owner = shared is None
+        if shared is None:
+            # Its own task, so it outlives whichever caller happened to start it
+            shared = asyncio.create_task(self._optimize_uncoalesced(key, task))
+            self._inflight[key] = shared
+            shared.add_done_callback(lambda done: self._finish_shared(key, done))
+        else:
+            self.coalesced += 1
+
+        # Shielded: a caller that goes away (e.g. its client disconnected) leaves
+        # the computation running for everyone else waiting on it
+        result = await asyncio.shield(shared)
+        # Every caller gets its own copy: the endpoints go on to set its id
+        if owner:
+            return result.model_copy(), "cache_hit" if result.cache_hit else "optimized"
+        return result.model_copy(update={"original_task": task.description}), "coalesced"
+
+    def _finish_shared(self, key: str, done: asyncio.Task[OptimizedPrompt]) -> None:
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+        # Mark the exception retrieved, in case every caller gave up before it finished
+        if not done.cancelled():
+            done.exception()
+
+    async def _optimize_uncoalesced(self, key: str, task: TaskRequest) -> OptimizedPrompt:
+        cached = await optimization_cache.get(key)
+        if cached is not None:
+            cached.original_task = task.description
+            cached.cache_hit = True
+            return cached
+
         if self.dspy_available:
-            return await self._optimize_with_dspy(task)
-        
-        return self._optimize_mock(task)
+            result = await self._optimize_with_dspy(task)
+        else:
+            result = self._optimize_mock(task)
+        await optimization_cache.put(key, result)
+        return result
+
+    def shutdown(self) -> None:
+        if self._loading is not None and not self._loading.done():
+            self._loading.cancel()
+        self._loading = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
 
     async def _optimize_with_dspy(self, task: TaskRequest) -> OptimizedPrompt:
+        """Run the blocking DSPy call in the optimizer thread pool.
+
+        A slot is held until the worker thread actually returns, even when the caller
+        times out or disconnects, so ``OPTIMIZER_MAX_CONCURRENCY`` bounds real LLM calls.
+        """
+        try:
+            return await asyncio.wait_for(self._run_in_pool(task), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise OptimizerTimeoutError(f"Optimization did not finish within {self.timeout:g}s")
+
+    async def _run_in_pool(self, task: TaskRequest) -> OptimizedPrompt:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="optimizer")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        slots = self._slots
+        loop = asyncio.get_running_loop()
+
+        await slots.acquire()
+        try:
+            future = self._executor.submit(self._predict, task)
+        except BaseException:
+            slots.release()
+            raise
+        # Released from the worker thread's completion, not from the (cancellable) awaiter
+        future.add_done_callback(lambda _: self._release_slot(loop, slots))
+        return await asyncio.wrap_future(future)
+
+    def _release_slot(self, loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore) -> None:
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            pass  # Loop already closed (shutdown); nobody is waiting for the slot
+
+    def _predict(self, task: TaskRequest) -> OptimizedPrompt:
         import dspy
         
         class OptimizePrompt(dspy.Signature):
@@ -0,0 +1,175 @@
+import importlib
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+
+class ParsedLine(NamedTuple):
+    message: str
+    level: str
+    source: str
+    event_type: str | None = None
+
+class LineParser(ABC):
+    """Turns one line of agent output into a log entry's typed fields.
+
+    ``parse`` returns None for lines it does not recognise, so the next parser in
+    the chain gets a go.
+    """
+    name = "base"
+
+    @abstractmethod
+    def parse(self, line: str, stream: str) -> ParsedLine | None:
+        ...
+
+# Aliases agents commonly print, mapped onto the levels stored in logs.level
+LEVELS = {
+    "TRACE": "DEBUG",
+    "DEBUG": "DEBUG",
+    "INFO": "INFO",
+    "NOTICE": "INFO",
+    "WARN": "WARN",
+    "WARNING": "WARN",
+    "ERROR": "ERROR",
+    "ERR": "ERROR",
+    "CRITICAL": "ERROR",
+    "FATAL": "ERROR",
+}
+
+# Level of a line that no parser classified
+STREAM_LEVELS = {"stdout": "INFO", "stderr": "WARN"}
+
+def default_level(stream: str) -> str:
+    return STREAM_LEVELS.get(stream, "INFO")
+
+class PrefixParser(LineParser):
+    """``[ERROR] ...``, ``WARNING: ...`` and ``[THINKING] ...`` style prefixes.
+
+    A prefix naming a level sets the level; any other bracketed tag (the
+    simulator's ``[ACTION]``, ``[SUCCESS]``) becomes the event type.
+    """
+    name = "prefix"
+    pattern = re.compile(r"^\s*(?:\[(?P<tag>[A-Za-z_]{2,20})\]|(?P<word>[A-Za-z]{4,8}):)\s*(?P<rest>.*)$", re.DOTALL)
+
+    def parse(self, line: str, stream: str) -> ParsedLine | None:
+        match = self.pattern.match(line)
+        if match is None:
+            return None
+        tag = (match.group("tag") or match.group("word")).upper()
+        if tag in LEVELS:
+            return ParsedLine(match.group("rest"), LEVELS[tag], stream)
+        if match.group("tag") is None:
+            return None  # "Note: ..." is prose, not a tag
+        return ParsedLine(line.strip(), "ERROR" if tag in ("FAILED", "FAILURE") else default_level(stream), stream,
+                          tag.lower())
+
+class StreamJsonParser(LineParser):
+    """Claude CLI ``--output-format stream-json``: one JSON event per line."""
+    name = "stream-json"
+
+    def parse(self, line: str, stream: str) -> ParsedLine | None:
+        if not line.startswith("{"):
+            return None
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(event, dict) or not isinstance(event.get("type"), str):
+            return None
+
+        kind = event["type"]
+        if kind == "system":
+            details = ", ".join(f"{key}={event[key]}" for key in ("model", "session_id") if event.get(key))
+            return ParsedLine(f"{event.get('subtype', 'system')}: {details}".rstrip(": "), "INFO", "claude", "system")
+        if kind == "result":
+            failed = bool(event.get("is_error")) or str(event.get("subtype", "")).startswith("error")
+            text = event.get("result") or event.get("subtype") or ""
+            return ParsedLine(str(text), "ERROR" if failed else "INFO", "claude", "result")
+        if kind in ("assistant", "user"):
+            return self._message(event)
+        return ParsedLine(line, default_level(stream), "claude", kind)
+
+    def _message(self, event: Dict[str, Any]) -> ParsedLine:
+        content = (event.get("message") or {}).get("content")
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        parts: List[str] = []
+        event_type = "text" if event["type"] == "assistant" else "user"
+        level = "INFO"
+        for block in content or []:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "text":
+                parts.append(str(block.get("text", "")))
+            elif block.get("type") == "thinking":
+                parts.append(str(block.get("thinking", "")))
+                event_type = "thinking" if event_type == "text" else event_type
+            elif block.get("type") == "tool_use":
+                parts.append(f"{block.get('name')} {json.dumps(block.get('input', {}), separators=(',', ':'))}")
+                event_type = "tool_use"
+            elif block.get("type") == "tool_result":
+                parts.append(_text_of(block.get("content")))
+                event_type = "tool_result"
+                if block.get("is_error"):
+                    level = "ERROR"
+        return ParsedLine("\n".join(part for part in parts if part), level, "claude", event_type)
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, list):
+        return "\n".join(str(item.get("text", "")) for item in content if isinstance(item, dict))
+    return "" if content is None else str(content)
+
+PARSERS: Dict[str, Callable[[], LineParser]] = {
+    StreamJsonParser.name: StreamJsonParser,
+    PrefixParser.name: PrefixParser,
+}
+
+def build_parser(factory: Callable[[], LineParser], name: str) -> LineParser:
+    """Instantiate a parser, rejecting factories that don't produce a complete ``LineParser``."""
+    try:
+        parser = factory()
+    except TypeError as e:  # Abstract ``parse`` or a factory that needs arguments
+        raise TypeError(f"Log parser {name} cannot be instantiated: {e}") from e
+    if not isinstance(parser, LineParser):
+        raise TypeError(f"Log parser {name} is not a LineParser: {type(parser).__name__}")
+    return parser
+
+def register_parser(name: str, factory: Callable[[], LineParser]) -> None:
+    """Make a parser selectable by name in ``LOG_PARSERS``.
+
+    The factory is tried once here, so a misregistered parser fails now rather
+    than on the first log line.
+    """
+    build_parser(factory, name)
+    PARSERS[name] = factory
+
+class ParserChain:
+    """Tries each parser in order; unrecognised lines keep the stream's default level."""
+
+    def __init__(self, parsers: Sequence[LineParser]) -> None:
+        self.parsers = list(parsers)
+
+    @classmethod
+    def from_names(cls, names: Sequence[str]) -> "ParserChain":
+        """Build a chain from registered names or ``package.module:Class`` paths."""
+        parsers: List[LineParser] = []
+        for name in names:
+            if name in PARSERS:
+                parsers.append(build_parser(PARSERS[name], name))
+            elif ":" in name:
+                module, attribute = name.split(":", 1)
+                parsers.append(build_parser(getattr(importlib.import_module(module), attribute), name))
+            else:
+                raise ValueError(f"Unknown log parser: {name}")
+        return cls(parsers)
+
+    def parse(self, line: str, stream: str) -> ParsedLine:
+        for parser in self.parsers:
+            try:
+                parsed = parser.parse(line, stream)
+            except Exception:
+                continue  # A buggy parser must not cost us the line
+            if parsed is not None:
+                return parsed
+        return ParsedLine(line, default_level(stream), stream)
@@ -0,0 +1,74 @@
+import asyncio
+from typing import AsyncIterator, NamedTuple
+
+
+class OutputLine(NamedTuple):
+    text: str
+    continuation: bool = False  # Follows the previous record: an over-long line was split here
+    truncated: bool = False  # The rest of the line was discarded
+
+async def read_lines(
+    stream: asyncio.StreamReader,
+    max_line_bytes: int,
+    chunk_size: int,
+    mode: str = "split",
+) -> AsyncIterator[OutputLine]:
+    """Lines of a subprocess pipe, read ``chunk_size`` bytes at a time.
+
+    Unlike ``StreamReader.readline`` (and ``async for line in stream``), a line longer
+    than the reader's limit does not raise: past ``max_line_bytes`` it is cut into
+    continuation records (``mode="split"``) or cut once and the rest skipped
+    (``mode="truncate"``). At most ``max_line_bytes`` of a partial line is held.
+    Invalid UTF-8 is replaced rather than raised on, and cuts never split a character.
+    """
+    if mode not in ("split", "truncate"):
+        raise ValueError(f"Unknown long line mode: {mode}")
+    pending = bytearray()
+    continuing = False  # The next record continues a split line
+    skipping = False  # Discarding the rest of a truncated line
+
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        pieces = chunk.split(b"\n")
+        last = len(pieces) - 1  # The piece after the final newline is incomplete
+        for index, piece in enumerate(pieces):
+            complete = index < last
+            if complete and not pending and not skipping and len(piece) <= max_line_bytes:
+                # Common case: a whole line inside this chunk
+                yield OutputLine(_decode(piece))
+                continue
+            if skipping:
+                skipping = not complete
+                continue
+            pending += piece
+            if len(pending) > max_line_bytes and mode == "truncate":
+                cut = _char_boundary(pending, max_line_bytes)
+                yield OutputLine(_decode(pending[:cut]), truncated=True)
+                pending.clear()
+                skipping = not complete
+                continue
+            while len(pending) > max_line_bytes:
+                cut = _char_boundary(pending, max_line_bytes)
+                yield OutputLine(_decode(pending[:cut]), continuing)
+                del pending[:cut]
+                continuing = True
+            if complete:
+                yield OutputLine(_decode(pending), continuing)
+                pending.clear()
+                continuing = False
+
+    if pending:
+        yield OutputLine(_decode(pending), continuing)
+
+def _char_boundary(data: bytearray, limit: int) -> int:
+    """Largest cut at or below ``limit`` that doesn't split a UTF-8 sequence."""
+    cut = limit
+    # Step back over continuation bytes (0b10xxxxxx), at most the 3 a character can have
+    while cut > limit - 3 and cut > 0 and (data[cut] & 0xC0) == 0x80:
+        cut -= 1
+    return cut if cut > 0 else limit
+
+def _decode(data: bytes | bytearray) -> str:
+    return bytes(data).decode("utf-8", errors="replace").rstrip("\r")
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import ColumnElement, delete, desc, func, insert, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.actor import actor
+from app.database import AsyncSessionLocal, Log, LogArchive, LogArchiveChunk, Run, dispose_engines, get_async_engine
+
+# Runs in these states produce no more log lines, so their logs can be compacted
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+ARCHIVE_CHUNK_SIZE = 256 * 1024 # Compressed bytes stored per log_archive_chunks row
+
+class RetentionWorker:
+    """Keeps the hot ``logs`` table small.
+
+    Each pass, for finished runs only:
+
+    * caps runs above ``RETENTION_MAX_LINES_PER_RUN`` lines to their first and last
+      lines, replacing the middle with a single marker line at the end of the run;
+    * moves the logs of runs older than ``RETENTION_MAX_AGE_DAYS``, or outside the
+      newest ``RETENTION_KEEP_RUNS``, into one gzip-compressed NDJSON stream per run,
+      stored in chunks in ``log_archive_chunks`` (read back transparently, chunk by
+      chunk, by the run-logs export);
+    * merges the full-text index and returns the freed pages to the filesystem
+      with ``PRAGMA incremental_vacuum``.
+    """
+
+    def __init__(self) -> None:
+        self.is_running = False
+        self.interval = settings.RETENTION_INTERVAL
+        self.max_age_days = settings.RETENTION_MAX_AGE_DAYS
+        self.keep_runs = settings.RETENTION_KEEP_RUNS
+        self.max_lines_per_run = settings.RETENTION_MAX_LINES_PER_RUN
+        self.chunk_size = settings.LOG_EXPORT_CHUNK_SIZE
+        self.last_result: Dict[str, int] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._event: asyncio.Event | None = None
+        self._warned_auto_vacuum = False
+
+    async def start(self) -> None:
+        if self.is_running or self.interval <= 0:
+            return
+
+        self.is_running = True
+        self._event = asyncio.Event()
+        self._task = asyncio.create_task(self._retention_loop())
+
+    async def stop(self) -> None:
+        self.is_running = False
+        if self._event:
+            self._event.set()
+        if self._task:
+            await self._task
+            self._task = None
+        self._event = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """One retention pass. Returns what it did, for logs and the status endpoint."""
+        result = {"capped_runs": 0, "dropped_lines": 0, "archived_runs": 0, "archived_lines": 0, "freed_pages": 0}
+        if self.max_lines_per_run > 0:
+            for run_id in await self._runs_over_cap():
+                result["dropped_lines"] += await self.cap_run(run_id)
+                result["capped_runs"] += 1
+        for run_id in await self._runs_to_archive():
+            result["archived_lines"] += await self.archive_run(run_id)
+            result["archived_runs"] += 1
+        if result["dropped_lines"] or result["archived_runs"]:
+            await self._optimize_search_index()
+            result["freed_pages"] = await self._incremental_vacuum()
+        self.last_result = result
+        return result
+
+    async def cap_run(self, run_id: int) -> int:
+        """Keep the first and last lines of a run up to the cap. Returns the number of lines dropped."""
+        head = max(self.max_lines_per_run // 2, 1)
+        tail = max(self.max_lines_per_run - head - 1, 1)  # One line is the truncation marker
+        # A fresh id: the freed ones were already published as real lines, and a client
+        # resuming from one of them would skip or misread a marker reusing it
+        marker_id = await actor.reserve_log_id()
+        async with AsyncSessionLocal() as db:
+            ids: Any = select(Log.id).where(Log.run_id == run_id)
+            head_last = (await db.execute(ids.order_by(Log.id).offset(head - 1).limit(1))).scalar()
+            tail_first = (await db.execute(ids.order_by(desc(Log.id)).offset(tail - 1).limit(1))).scalar()
+            if head_last is None or tail_first is None or tail_first <= head_last + 1:
+                return 0
+
+            dropped = (await db.execute(
+                delete(Log).where(Log.run_id == run_id, Log.id > head_last, Log.id < tail_first)
+            )).rowcount or 0 # type: ignore[attr-defined]
+            await db.execute(insert(Log).values(
+                id=marker_id,
+                run_id=run_id,
+                timestamp=datetime.now(timezone.utc),
+                level="WARN",
+                message=(
+                    f"[retention] {dropped} line(s) between log {head_last} and {tail_first} dropped "
+                    f"to keep this run under {self.max_lines_per_run} lines"
+                ),
+                source="system",
+            ))
+            await db.commit()
+        return dropped
+
+    async def archive_run(self, run_id: int) -> int:
+        """Move a run's logs into a compressed archive. Returns the number of lines archived.
+
+        Logs are read, compressed and written ``ARCHIVE_CHUNK_SIZE`` bytes at a time,
+        so memory stays flat however long the run is.
+        """
+        compressor = zlib.compressobj(wbits=31)
+        parts: List[bytes] = []
+        buffered = seq = line_count = raw_bytes = compressed_bytes = 0
+        first_id: int | None = None
+        last_id: int | None = None
+
+        async with AsyncSessionLocal() as db:
+            result: Any = await db.stream(
+                select(Log.id, Log.timestamp, Log.level, Log.message, Log.source, Log.event_type)
+                .where(Log.run_id == run_id)
+                .order_by(Log.id)
+            )
+            async for rows in result.partitions(self.chunk_size):
+                data = "".join(
+                    json.dumps({
+                        "id": log_id,
+                        "run_id": run_id,
+                        "timestamp": timestamp.isoformat(),
+                        "level": level,
+                        "message": message,
+                        "source": source,
+                        "event_type": event_type,
+                    }) + "\n"
+                    for log_id, timestamp, level, message, source, event_type in rows
+                ).encode()
+                raw_bytes += len(data)
+                line_count += len(rows)
+                first_id = rows[0][0] if first_id is None else first_id
+                last_id = rows[-1][0]
+                parts.append(compressor.compress(data))
+                buffered += len(parts[-1])
+                if buffered >= ARCHIVE_CHUNK_SIZE:
+                    compressed_bytes += await self._write_chunk(db, run_id, seq, parts)
+                    parts, buffered, seq = [], 0, seq + 1
+            parts.append(compressor.flush())
+            compressed_bytes += await self._write_chunk(db, run_id, seq, parts)
+
+            await db.execute(insert(LogArchive).values(
+                run_id=run_id,
+                line_count=line_count,
+                first_log_id=first_id,
+                last_log_id=last_id,
+                raw_bytes=raw_bytes,
+                compressed_bytes=compressed_bytes,
+            ))
+            await db.execute(delete(Log).where(Log.run_id == run_id))
+            await db.commit()
+        return line_count
+
+    async def _write_chunk(self, db: AsyncSession, run_id: int, seq: int, parts: List[bytes]) -> int:
+        data = b"".join(parts)
+        await db.execute(insert(LogArchiveChunk).values(run_id=run_id, seq=seq, data=data))
+        return len(data)
+
+    async def _runs_over_cap(self) -> List[int]:
+        # Annotated so the legacy Column attribute (typed Never) yields typed expressions
+        status: ColumnElement[str] = Run.status
+        async with AsyncSessionLocal() as db:
+            rows: Any = await db.execute(
+                select(Log.run_id)
+                .join(Run, Run.id == Log.run_id)
+                .where(status.in_(FINISHED_STATUSES))
+                .group_by(Log.run_id)
+                .having(func.count(Log.id) > self.max_lines_per_run)
+            )
+            return [run_id for (run_id,) in rows]
+
+    async def _runs_to_archive(self) -> List[int]:
+        status: ColumnElement[str] = Run.status
+        archive_id: ColumnElement[int] = LogArchive.id
+        policies: List[Any] = []
+        if self.max_age_days > 0:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+            policies.append(func.coalesce(Run.end_time, Run.start_time, Run.queued_at) < cutoff)
+        async with AsyncSessionLocal() as db:
+            if self.keep_runs > 0:
+                newest: Any = select(Run.id).where(status.in_(FINISHED_STATUSES)).order_by(desc(Run.id))
+                boundary = (await db.execute(newest.offset(self.keep_runs - 1).limit(1))).scalar()
+                if boundary is not None:
+                    policies.append(Run.id < boundary)
+            if not policies:
+                return []
+            # Runs without log rows (e.g. cancelled while queued) have nothing to archive
+            has_logs = select(Log.id).where(Log.run_id == Run.id).exists()
+            rows: Any = await db.execute(
+                select(Run.id)
+                .outerjoin(LogArchive, LogArchive.run_id == Run.id)
+                .where(status.in_(FINISHED_STATUSES), archive_id.is_(None), has_logs, or_(*policies))
+                .order_by(Run.id)
+            )
+            return [run_id for (run_id,) in rows]
+
+    async def _optimize_search_index(self) -> None:
+        # Deleting rows only adds tombstones to the FTS5 index; merging drops them
+        async with AsyncSessionLocal() as db:
+            if db.get_bind().dialect.name != "sqlite":
+                return
+            await db.execute(text("INSERT INTO logs_fts(logs_fts) VALUES ('optimize')"))
+            await db.commit()
+
+    async def _incremental_vacuum(self) -> int:
+        async with AsyncSessionLocal() as db:
+            if not await self._auto_vacuum_enabled(db):
+                return 0
+            before = (await db.execute(text("PRAGMA freelist_count"))).scalar() or 0
+            # execute() steps the pragma once, freeing a single page; executescript()
+            # runs it to completion
+            raw = await (await db.connection()).get_raw_connection()
+            await raw.driver_connection.executescript("PRAGMA incremental_vacuum;") # type: ignore[union-attr]
+            after = (await db.execute(text("PRAGMA freelist_count"))).scalar() or 0
+        return int(before - after)
+
+    async def _auto_vacuum_enabled(self, db: AsyncSession) -> bool:
+        if db.get_bind().dialect.name != "sqlite":
+            return False
+        mode = (await db.execute(text("PRAGMA auto_vacuum"))).scalar()
+        if mode == 2:  # INCREMENTAL
+            return True
+        if not self._warned_auto_vacuum:
+            self._warned_auto_vacuum = True
+            print("Retention: auto_vacuum is not INCREMENTAL on this database; "
+                  "run `python cli.py compact` once to enable it and reclaim space")
+        return False
+
+    async def _retention_loop(self) -> None:
+        # First pass after one interval, so retention never competes with startup
+        while self.is_running and self._event:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=self.interval)
+                break  # Only stop() sets the event
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+            try:
+                result = await self.run_once()
+                if result["capped_runs"] or result["archived_runs"]:
+                    print(f"Retention: {result}")
+            except Exception as e:
+                print(f"Retention pass failed: {e}")
+
+async def compact() -> Dict[str, int]:
+    """One retention pass followed by a full VACUUM, which also switches an existing
+    database to incremental auto_vacuum. Holds an exclusive lock while it runs."""
+    result = await retention.run_once()
+    async with get_async_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.dialect.name == "sqlite":
+            await conn.execute(text(f"PRAGMA auto_vacuum = {settings.SQLITE_AUTO_VACUUM}"))
+            await conn.execute(text("VACUUM"))
+    await dispose_engines()
+    return result
+
+retention = RetentionWorker()
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(compact())))
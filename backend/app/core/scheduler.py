@@ -0,0 +1,182 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import ColumnElement, Select, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.actor import RunNotQueuedError, actor
+from app.database import AsyncSessionLocal, Run
+
+
+class QueueFullError(Exception):
+    """Raised when admission control rejects a new run."""
+
+class RunScheduler:
+    """Durable priority queue of pending runs, stored as ``queued`` rows in the runs table.
+
+    Runs are dispatched highest priority first and FIFO (by id) within a priority,
+    whenever the actor has a free slot.
+    """
+
+    def __init__(self) -> None:
+        self.is_running = False
+        self.max_queue_depth = settings.MAX_QUEUE_DEPTH
+        self._task: asyncio.Task[None] | None = None
+        self._event: asyncio.Event | None = None
+        self._dispatch_lock: asyncio.Lock | None = None
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+
+        self.is_running = True
+        self._event = asyncio.Event()
+        self._dispatch_lock = asyncio.Lock()
+        actor.add_release_listener(self.notify)
+        await self._recover()
+
+        print(f"Scheduler started. {await self.queue_depth()} queued run(s) pending")
+        self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        self.is_running = False
+        if self._event:
+            self._event.set()
+        if self._task:
+            await self._task
+            self._task = None
+        self._event = None
+
+    def notify(self) -> None:
+        """Wake the dispatcher: a run was queued or a slot was freed."""
+        if self._event:
+            self._event.set()
+
+    async def enqueue(self, prompt: str, task_id: int, priority: int = 0) -> int:
+        async with AsyncSessionLocal() as db:
+            depth = await self._count_queued(db)
+            if depth >= self.max_queue_depth:
+                raise QueueFullError(f"Run queue is full ({depth} pending)")
+
+            run = Run(
+                task_id=task_id,
+                prompt=prompt,
+                priority=priority,
+                status="queued",
+                queued_at=datetime.now(timezone.utc),
+                start_time=None,
+            )
+            db.add(run)
+            await db.commit()
+            run_id: int = run.id # type: ignore
+
+        self.notify()
+        return run_id
+
+    async def cancel(self, run_id: int) -> bool:
+        """Cancel a run that is still waiting in the queue."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Run)
+                .where(Run.id == run_id, Run.status == "queued")
+                .values(status="cancelled", end_time=datetime.now(timezone.utc))
+            )
+            await db.commit()
+            return bool(result.rowcount) # type: ignore[attr-defined]
+
+    async def queue_depth(self) -> int:
+        async with AsyncSessionLocal() as db:
+            return await self._count_queued(db)
+
+    async def queued_runs(self, limit: int = 100) -> List[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            runs = (await db.execute(self._queued().limit(limit))).scalars().all()
+            return [
+                {
+                    "run_id": run.id,
+                    "task_id": run.task_id,
+                    "priority": run.priority,
+                    "position": position,
+                    "queued_at": run.queued_at.isoformat() if run.queued_at else None,
+                }
+                for position, run in enumerate(runs, start=1)
+            ]
+
+    async def dispatch_pending(self) -> List[int]:
+        """Start queued runs until the queue is empty or the actor is saturated."""
+        dispatched: List[int] = []
+        if self._dispatch_lock is None:
+            self._dispatch_lock = asyncio.Lock()
+        async with self._dispatch_lock:
+            while actor.available_slots:
+                async with AsyncSessionLocal() as db:
+                    run = (await db.execute(self._queued().limit(1))).scalar_one_or_none()
+                if run is None:
+                    break
+                run_id: int = run.id # type: ignore
+                task_id: int = run.task_id # type: ignore
+                prompt: str = run.prompt or "" # type: ignore
+
+                try:
+                    await actor.start_task(prompt, task_id, run_id=run_id)
+                    dispatched.append(run_id)
+                except RunNotQueuedError:
+                    # Cancelled between the select and the claim: nothing to start
+                    continue
+                except Exception as e:
+                    print(f"Failed to dispatch run {run_id}: {e}")
+                    await self._mark(run_id, "failed")
+        return dispatched
+
+    async def _count_queued(self, db: AsyncSession) -> int:
+        return (await db.execute(select(func.count(Run.id)).where(Run.status == "queued"))).scalar() or 0
+
+    def _queued(self) -> Select[Any]:
+        return (
+            select(Run)
+            .where(Run.status == "queued")
+            .order_by(Run.priority.desc(), Run.id.asc())
+        )
+
+    async def _mark(self, run_id: int, status: str) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Run).where(Run.id == run_id).values(status=status, end_time=datetime.now(timezone.utc))
+            )
+            await db.commit()
+
+    async def _recover(self) -> None:
+        # Runs that were starting/running when a previous backend process died have no
+        # subprocess anymore; queued runs are left untouched and get dispatched.
+        # Annotated so the legacy Column attributes (typed Never) yield typed expressions
+        status: ColumnElement[str] = Run.status
+        run_id: ColumnElement[int] = Run.id
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Run)
+                .where(status.in_(["starting", "running"]), run_id.notin_(list(actor.runs)))
+                .values(status="interrupted", end_time=datetime.now(timezone.utc))
+            )
+            await db.commit()
+            orphaned: int = result.rowcount # type: ignore[attr-defined]
+            if orphaned:
+                print(f"Scheduler marked {orphaned} orphaned run(s) as interrupted")
+
+    async def _dispatch_loop(self) -> None:
+        while self.is_running and self._event:
+            self._event.clear()
+            try:
+                await self.dispatch_pending()
+            except Exception as e:
+                print(f"Scheduler error: {e}")
+
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=settings.QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+
+scheduler = RunScheduler()
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import DateTime, Float, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import AsyncSessionLocal
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_TOKENS = 16 # Tokens of context around the best match in each snippet
+
+class InvalidQueryError(ValueError):
+    pass
+
+def phrase_query(query: str) -> str:
+    """Quote free text as one FTS5 phrase, so error strings like ``KeyError: 'id'`` match literally."""
+    return '"' + query.replace('"', '""') + '"'
+
+async def search_logs(
+    query: str,
+    limit: int,
+    run_id: int | None = None,
+    task_id: int | None = None,
+    level: str | None = None,
+    event_type: str | None = None,
+    after: Tuple[float, int] | None = None,
+    raw: bool = False,
+) -> List[Dict[str, Any]]:
+    """Log lines matching ``query`` through the ``logs_fts`` index, best bm25 match first.
+
+    ``after`` is the (rank, id) of the last hit of the previous page. ``raw`` passes
+    the query through as FTS5 syntax (``timeout NOT retry``, ``conn*``) instead of
+    matching it as a phrase.
+    """
+    params: Dict[str, Any] = {
+        "match": query if raw else phrase_query(query),
+        "open": SNIPPET_OPEN,
+        "close": SNIPPET_CLOSE,
+        "tokens": SNIPPET_TOKENS,
+        "limit": limit,
+    }
+    filters = ""
+    if run_id is not None:
+        filters += " AND logs.run_id = :run_id"
+        params["run_id"] = run_id
+    if task_id is not None:
+        filters += " AND runs.task_id = :task_id"
+        params["task_id"] = task_id
+    if level is not None:
+        filters += " AND logs.level = :level"
+        params["level"] = level.upper()
+    if event_type is not None:
+        filters += " AND logs.event_type = :event_type"
+        params["event_type"] = event_type
+    if after is not None:
+        # Keyset on (rank, id); bm25 scores are negative, lower is better
+        filters += " AND (bm25(logs_fts) > :after_rank OR (bm25(logs_fts) = :after_rank AND logs.id > :after_id))"
+        params["after_rank"], params["after_id"] = after
+
+    statement = text(f"""
+        SELECT logs.id, logs.run_id, runs.task_id, logs.timestamp, logs.level, logs.source, logs.event_type,
+               snippet(logs_fts, 0, :open, :close, '…', :tokens) AS snippet,
+               bm25(logs_fts) AS rank
+        FROM logs_fts
+        JOIN logs ON logs.id = logs_fts.rowid
+        LEFT JOIN runs ON runs.id = logs.run_id
+        WHERE logs_fts MATCH :match{filters}
+        ORDER BY rank, logs.id
+        LIMIT :limit
+    """).columns(timestamp=DateTime, rank=Float)
+
+    async with AsyncSessionLocal() as db:
+        try:
+            rows = (await db.execute(statement, params)).mappings().all()
+        except OperationalError as e:
+            # Malformed FTS5 syntax (only reachable with raw=True or stray operators)
+            raise InvalidQueryError(str(e.orig)) from e
+    return [
+        {
+            "id": row["id"],
+            "run_id": row["run_id"],
+            "task_id": row["task_id"],
+            "timestamp": row["timestamp"].isoformat() if row["timestamp"] else None,
+            "level": row["level"],
+            "source": row["source"],
+            "event_type": row["event_type"],
+            "snippet": row["snippet"],
+            "rank": row["rank"],
+        }
+        for row in rows
+    ]
@@ -1,25 +1,158 @@
+"""Stand-in agent, and a load generator for the actor/ingest/WebSocket pipeline.
+
+With no options it prints a short scripted run, one line a second. The options
+turn it into a parametric source of agent output, e.g. (via SIMULATOR_ARGS):
+
+    --lines 0 --duration 30 --rate 5000 --burst-every 5 --burst-lines 20000
+    --format mixed --stderr-ratio 0.2 --long-line-every 1000 --invalid-utf8-every 500
+    --exit-code 1
+"""
 import time
 import sys
 import argparse
+import json
+import random
+from typing import BinaryIO, List
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
+STEPS = [
+    "[THINKING] Analyzing context...",
+    "[THINKING] Identifying resources...",
+    "[ACTION] creating file...",
+    "[ACTION] writing code...",
+]
+TOOLS = ["Read", "Edit", "Bash", "Grep"]
+INVALID_UTF8 = b" \xff\xfe bad bytes \xe2\x82"  # Stray bytes and a cut-off multibyte sequence
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument("--prompt", help="The task prompt", default="Unknown Task")
-    args = parser.parse_args()
-
-    steps = [
-        f"[START] Processing: {args.prompt[:30]}...",
-        "[THINKING] Analyzing context...",
-        "[THINKING] Identifying resources...",
-        "[ACTION] creating file...",
-        "[ACTION] writing code...",
-        "[SUCCESS] Task execution finished."
-    ]
-
-    for step in steps:
-        print(step)
+    parser.add_argument("--lines", type=int, default=6, help="Lines to write; 0 for no limit (use --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop after this many seconds; 0 for no limit")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Lines per second; 0 writes as fast as the pipe takes them")
+    parser.add_argument("--line-bytes", type=int, default=0,
+                        help="Mean line size; 0 leaves lines at their natural length")
+    parser.add_argument("--size-dist", choices=["fixed", "uniform", "exponential"], default="fixed",
+                        help="Distribution of line sizes around --line-bytes")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="Seconds between bursts; 0 for none")
+    parser.add_argument("--burst-lines", type=int, default=0, help="Lines written at once in each burst")
+    parser.add_argument("--stderr-ratio", type=float, default=0.0, help="Fraction of lines sent to stderr")
+    parser.add_argument("--format", choices=["text", "stream-json", "mixed"], default="text",
+                        help="Prefixed text lines, Claude stream-json events, or both interleaved")
+    parser.add_argument("--long-line-every", type=int, default=0, help="Make every Nth line --long-line-bytes long")
+    parser.add_argument("--long-line-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--invalid-utf8-every", type=int, default=0, help="Put invalid UTF-8 in every Nth line")
+    parser.add_argument("--exit-code", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible runs")
+    return parser.parse_args(argv)
+
+class Simulator:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.written = 0
+        # Paced output is flushed line by line so it arrives in real time
+        self.flush_each = args.rate > 0
+
+    def target_size(self, index: int) -> int:
+        args = self.args
+        if args.long_line_every and index % args.long_line_every == args.long_line_every - 1:
+            return int(args.long_line_bytes)
+        if args.line_bytes <= 0:
+            return 0
+        if args.size_dist == "uniform":
+            return self.random.randint(1, 2 * args.line_bytes)
+        if args.size_dist == "exponential":
+            return max(1, int(self.random.expovariate(1 / args.line_bytes)))
+        return int(args.line_bytes)
+
+    def text(self, index: int, size: int) -> str:
+        text = STEPS[(index - 1) % len(STEPS)]
+        if index == 0:
+            text = f"[START] Processing: {self.args.prompt[:30]}..."
+        if self.args.lines and index == self.args.lines - 1:
+            succeeded = self.args.exit_code == 0
+            text = "[SUCCESS] Task execution finished." if succeeded else "[ERROR] Task execution failed."
+        return text + " " + "x" * (size - len(text) - 1) if size > len(text) + 1 else text
+
+    def event(self, index: int, size: int) -> str:
+        """A stream-json event: assistant text, a tool call or a tool result, in turn."""
+        def build(text: str) -> str:
+            if index % 3 == 0:
+                event = {"type": "assistant", "message": {"content": [{"type": "text", "text": text}]}}
+            elif index % 3 == 1:
+                tool_use = {"type": "tool_use", "name": TOOLS[index % len(TOOLS)], "input": {"note": text}}
+                event = {"type": "assistant", "message": {"content": [tool_use]}}
+            else:
+                event = {"type": "user", "message": {"content": [{"type": "tool_result", "content": text}]}}
+            return json.dumps(event, separators=(",", ":"))
+
+        text = f"step {index}"
+        line = build(text)
+        if size > len(line) + 1:
+            line = build(text + " " + "x" * (size - len(line) - 1))
+        return line
+
+    def line(self, index: int) -> bytes:
+        size = self.target_size(index)
+        structured = self.args.format == "stream-json" or (self.args.format == "mixed" and index % 2)
+        data = (self.event(index, size) if structured else self.text(index, size)).encode()
+        if self.args.invalid_utf8_every and index % self.args.invalid_utf8_every == self.args.invalid_utf8_every - 1:
+            data += INVALID_UTF8
+        return data + b"\n"
+
+    def write(self, count: int) -> None:
+        for _ in range(count):
+            if self.args.lines and self.written >= self.args.lines:
+                return
+            stream: BinaryIO = sys.stdout.buffer
+            if self.args.stderr_ratio and self.random.random() < self.args.stderr_ratio:
+                stream = sys.stderr.buffer
+            stream.write(self.line(self.written))
+            self.written += 1
+        if self.flush_each:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+    def finished(self, elapsed: float) -> bool:
+        args = self.args
+        return bool((args.lines and self.written >= args.lines) or (args.duration and elapsed >= args.duration))
+
+    def run(self) -> int:
+        args = self.args
+        if not args.lines and not args.duration:
+            raise SystemExit("simulator: set --lines or --duration, or it would never finish")
+        started = time.perf_counter()
+        paced = 0  # Lines written on the --rate schedule; bursts come on top
+        next_burst = args.burst_every
+        while True:
+            elapsed = time.perf_counter() - started
+            if self.finished(elapsed):
+                break
+            if args.burst_every and args.burst_lines and elapsed >= next_burst:
+                self.write(args.burst_lines)
+                next_burst += args.burst_every
+                continue
+            if args.rate <= 0:
+                self.write(64)
+                continue
+            wake = started + paced / args.rate
+            if args.burst_every:
+                wake = min(wake, started + next_burst)
+            if args.duration:
+                wake = min(wake, started + args.duration)
+            delay = wake - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+            self.write(1)
+            paced += 1
         sys.stdout.flush()
-        time.sleep(1)
+        sys.stderr.flush()
+        return int(args.exit_code)
+
+def main() -> None:
+    sys.exit(Simulator(parse_args()).run())
 
 if __name__ == "__main__":
     main()
@@ -1,24 +1,265 @@
 from fastapi import WebSocket
-from typing import List, Dict, Any
+from typing import Any, Callable, Deque, Dict, List, Set, Tuple
+from collections import deque
+import asyncio
+import itertools
 import json
+import time
+from app.core.metrics import WS_BROADCAST_SECONDS, WS_CLIENTS, WS_DROPPED, WS_QUEUE_DEPTH
+from app.config import settings
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+_client_ids = itertools.count(1) # Labels per-client metrics
+
+class Subscription:
+    """Server-side message filter for one client.
+
+    Every non-empty dimension must match. Run and task ids apply to both log and
+    status messages; levels only apply to log entries.
+    """
+
+    def __init__(
+        self,
+        run_ids: Set[int] | None = None,
+        task_ids: Set[int] | None = None,
+        levels: Set[str] | None = None,
+    ) -> None:
+        self.run_ids = run_ids or set()
+        self.task_ids = task_ids or set()
+        self.levels = {level.upper() for level in levels or set()}
+
+    @classmethod
+    def from_message(cls, payload: Dict[str, Any]) -> "Subscription":
+        return cls(
+            run_ids={int(run_id) for run_id in payload.get("run_ids") or []},
+            task_ids={int(task_id) for task_id in payload.get("task_ids") or []},
+            levels={str(level) for level in payload.get("levels") or []},
+        )
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        return {
+            "run_ids": sorted(self.run_ids),
+            "task_ids": sorted(self.task_ids),
+            "levels": sorted(self.levels),
+        }
+
+    def matches(self, message: Dict[str, Any]) -> bool:
+        fields = message.get("data") if message.get("type") == "log" else message
+        if not isinstance(fields, dict):
+            fields = {}
+        if self.run_ids and fields.get("run_id") not in self.run_ids:
+            return False
+        if self.task_ids and fields.get("task_id") not in self.task_ids:
+            return False
+        if self.levels and message.get("type") == "log" and str(fields.get("level", "")).upper() not in self.levels:
+            return False
+        return True
+
+class ClientConnection:
+    """A WebSocket with its own bounded send queue drained by a dedicated writer task.
+
+    When the queue is full the slow-consumer policy decides what happens:
+    ``drop_oldest`` discards the oldest queued message, ``coalesce`` replaces a queued
+    message carrying the same coalesce key (falling back to dropping the oldest), and
+    ``disconnect`` closes the socket.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Callable[["ClientConnection"], None],
+        max_queue: int | None = None,
+        policy: str | None = None,
+    ) -> None:
+        max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.id = next(_client_ids)
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self.subscription: Subscription | None = None
+        # Highest log id queued for this client; live entries at or below it are duplicates
+        self.last_log_id = 0
+        # While replaying, live log entries are held back here until catch-up completes
+        self._held: List[Tuple[int, str]] | None = None
+        self._held_overflow = False
+        # Entries are [coalesce_key, text] so coalescing can swap the text in place
+        self._queue: Deque[List[Any]] = deque()
+        self._keyed: Dict[str, List[Any]] = {}
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._on_close = on_close
+        self._writer: asyncio.Task[None] | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def wants(self, message: Dict[str, Any]) -> bool:
+        return self.subscription is None or self.subscription.matches(message)
+
+    @property
+    def replaying(self) -> bool:
+        return self._held is not None
+
+    def begin_replay(self, last_log_id: int) -> None:
+        """Hold live log entries back while the client is caught up from ``last_log_id``."""
+        self.last_log_id = last_log_id
+        self._held = []
+        self._held_overflow = False
+
+    def finish_replay(self, cursor: int) -> bool:
+        """Release held live entries newer than ``cursor`` (the last replayed id).
+
+        Returns False if held entries had to be discarded, in which case the caller
+        must replay again from ``cursor`` before switching to live delivery.
+        """
+        if self._held is None:
+            return True
+        if self._held_overflow:
+            self._held_overflow = False
+            return False
+
+        for log_id, text in self._held:
+            if log_id > cursor:
+                self._push([None, text])
+                cursor = log_id
+        self.last_log_id = cursor
+        self._held = None
+        return True
+
+    def enqueue(self, text: str, coalesce_key: str | None = None, log_id: int | None = None) -> bool:
+        """Queue an encoded message without waiting. Returns False if the client was dropped."""
+        if self.closed:
+            return False
+
+        if log_id is not None:
+            if self._held is not None:
+                if len(self._held) >= self.max_queue:
+                    # Too far behind to buffer: forget and fetch these from the DB instead
+                    self._held.clear()
+                    self._held_overflow = True
+                self._held.append((log_id, text))
+                return True
+            if log_id <= self.last_log_id:
+                return True
+            self.last_log_id = log_id
+
+        if coalesce_key is not None and self.policy == "coalesce":
+            queued = self._keyed.get(coalesce_key)
+            if queued is not None:
+                queued[1] = text
+                return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                self.close()
+                return False
+            self._pop_oldest()
+            self.dropped += 1
+            WS_DROPPED.inc()
+
+        self._push([coalesce_key, text])
+        return True
+
+    async def put(self, text: str) -> None:
+        """Queue a message, waiting for room instead of applying the slow-consumer policy."""
+        while not self.closed and len(self._queue) >= self.max_queue:
+            self._space.clear()
+            await self._space.wait()
+        if not self.closed:
+            self._push([None, text])
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._ready.set()
+        self._space.set()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        asyncio.create_task(self._close_socket())
+        self._on_close(self)
+
+    def _push(self, entry: List[Any]) -> None:
+        self._queue.append(entry)
+        if entry[0] is not None:
+            self._keyed[entry[0]] = entry
+        self._ready.set()
+
+    def _pop_oldest(self) -> List[Any]:
+        entry = self._queue.popleft()
+        if entry[0] is not None and self._keyed.get(entry[0]) is entry:
+            del self._keyed[entry[0]]
+        self._space.set()
+        return entry
+
+    async def _close_socket(self) -> None:
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, text = self._pop_oldest()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Dead socket: stop writing and let the manager forget about it
+            self.close()
 
 class ConnectionManager:
     def __init__(self) -> None:
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
 
-    async def connect(self, websocket: WebSocket) -> None:
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, on_close=self._forget)
+        self.active_connections[websocket] = client
+        client.start()
+        return client
 
     def disconnect(self, websocket: WebSocket) -> None:
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            client.close()
+
+    async def broadcast(self, message: Dict[str, Any], coalesce_key: str | None = None) -> None:
+        """Queue a message for every subscribed client. Never waits on a slow socket."""
+        started = time.perf_counter()
+        text: str | None = None
+        log_id = message["data"].get("id") if message.get("type") == "log" else None
+        for client in list(self.active_connections.values()):
+            if not client.wants(message):
+                continue
+            # Encode once, not once per recipient, and only if someone wants it
+            if text is None:
+                text = json.dumps(message)
+            client.enqueue(text, coalesce_key, log_id)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - started)
+
+    def queue_depths(self) -> Dict[Tuple[str, ...], float]:
+        return {(str(client.id),): client.queue_depth for client in self.active_connections.values()}
 
-    async def broadcast(self, message: Dict[str, Any]) -> None:
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                # Handle disconnected clients gracefully
-                pass
+    def _forget(self, client: ClientConnection) -> None:
+        if self.active_connections.get(client.websocket) is client:
+            del self.active_connections[client.websocket]
 
 manager = ConnectionManager()
+WS_CLIENTS.set_function(lambda: len(manager.active_connections))
+WS_QUEUE_DEPTH.set_function(manager.queue_depths)
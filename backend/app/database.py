@@ -1,14 +1,111 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy import (
+    create_engine, event, DDL, Column, Integer, Float, String, Text, DateTime, ForeignKey, Boolean, Index, LargeBinary,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, relationship, declarative_base
 from datetime import datetime, timezone
-from typing import Any
-from app.config import settings
+from typing import Any, Dict, List
+from app.config import Settings, settings
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (sqlite -> aiosqlite)."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+def sqlite_pragmas(config: Settings = settings) -> List[str]:
+    """The SQLITE_* tuning profile, as PRAGMA statements."""
+    return [
+        # First, so switching the journal mode can wait out a concurrent writer
+        f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)}",
+        # Only honoured before the first table exists; existing files need a VACUUM
+        f"PRAGMA auto_vacuum = {config.SQLITE_AUTO_VACUUM}",
+        f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = {int(config.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}",
+    ]
+
+def apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool sizing for file-backed databases; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+
+def get_engine() -> Engine:
+    """Sync engine: Alembic, scripts and benchmarks. The application itself uses the async engine."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+            **engine_options(settings.DATABASE_URL)
+        )
+        if settings.DATABASE_URL.startswith("sqlite"):
+            event.listen(_engine, "connect", apply_sqlite_pragmas)
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    """The application's engine, created on first use rather than at import."""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.DATABASE_URL
+        _async_engine = create_async_engine(to_async_url(url), **engine_options(url))
+        if settings.DATABASE_URL.startswith("sqlite"):
+            event.listen(_async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return _async_engine
+
+async def dispose_engines() -> None:
+    """Close pooled connections of whichever engines were created."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+class LazyAsyncSessionmaker(async_sessionmaker[AsyncSession]):
+    """Binds to ``get_async_engine()`` when the first session is opened, so importing
+    the models (tests, Alembic, the CLI) never builds an engine."""
+
+    def __call__(self, **local_kw: Any) -> AsyncSession:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+class LazySessionmaker(sessionmaker[Session]):
+    def __call__(self, **local_kw: Any) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+SessionLocal = LazySessionmaker(autocommit=False, autoflush=False)
+# expire_on_commit=False: ORM objects stay readable after commit without an implicit (blocking) refresh
+AsyncSessionLocal = LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+def __getattr__(name: str) -> Any:
+    # `engine` and `async_engine` used to be module globals; keep them importable
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 Base: Any = declarative_base()
 
@@ -23,6 +120,12 @@ class Task(Base):
     status = Column(String, default="pending")  # pending, optimizing, running, completed, failed
     created_at = Column(DateTime, default=utc_now)
     updated_at = Column(DateTime, default=utc_now, onupdate=utc_now)
+
+    # Keyset pagination for /api/history, newest first, optionally per status
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at_id", "status", "created_at", "id"),
+    )
     
     # One-to-One
     optimization = relationship("Optimization", back_populates="task", uselist=False)
@@ -46,10 +149,30 @@ class Run(Base):
     task_id = Column(Integer, ForeignKey("tasks.id"), index=True)
     start_time = Column(DateTime, default=utc_now)
     end_time = Column(DateTime, nullable=True)
-    status = Column(String, default="running")
+    status = Column(String, default="running")  # queued, starting, running, completed, failed, cancelled, interrupted
     exit_code = Column(Integer, nullable=True)
+
+    # Scheduling
+    prompt = Column(Text, nullable=True)
+    priority = Column(Integer, default=0, nullable=False)
+    queued_at = Column(DateTime, nullable=True)
+    dispatched_at = Column(DateTime, nullable=True)
+    queue_wait_ms = Column(Float, nullable=True)
+    dispatch_latency_ms = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # Matches the dispatch order (priority DESC, id ASC), so no sort step is needed
+        Index("ix_runs_status_priority_id", status, priority.desc(), id),
+        # Keyset pagination for /api/runs
+        Index("ix_runs_status_id", "status", "id"),
+        Index("ix_runs_task_id_id", "task_id", "id"),
+        # Keyset pagination within a start-time window
+        Index("ix_runs_start_time_id", "start_time", "id"),
+        Index("ix_runs_status_start_time_id", "status", "start_time", "id"),
+    )
     
     logs = relationship("Log", back_populates="run")
+    archive = relationship("LogArchive", back_populates="run", uselist=False)
     task = relationship("Task", back_populates="runs")
 
 class Log(Base):
@@ -60,6 +183,87 @@ class Log(Base):
     timestamp = Column(DateTime, default=utc_now)
     level = Column(String, default="INFO")
     message = Column(Text)
-    source = Column(String, default="system")
+    source = Column(String, default="system")  # system, stdout, stderr, or the agent (e.g. claude)
+    event_type = Column(String, nullable=True)  # Parsed from the line: tool_use, result, thinking, ...
+
+    # Per-run filtering by level or event type, in id order
+    __table_args__ = (
+        Index("ix_logs_run_id_level", "run_id", "level"),
+        Index("ix_logs_run_id_event_type", "run_id", "event_type"),
+    )
 
     run = relationship("Run", back_populates="logs")
+
+class OptimizationCacheEntry(Base):
+    """Persistent tier of the optimization cache, keyed by the request's content hash."""
+    __tablename__ = "optimization_cache"
+
+    key = Column(String(64), primary_key=True)
+    original_task = Column(Text, nullable=False)
+    optimized_prompt = Column(Text, nullable=False)
+    reasoning = Column(Text, nullable=False)
+    estimated_tokens = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=utc_now)
+    last_used_at = Column(DateTime, default=utc_now, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class LogArchive(Base):
+    """Cold storage for a finished run's logs: one gzip-compressed NDJSON stream per
+    run, stored in ``log_archive_chunks`` so it can be written and read piece by piece."""
+    __tablename__ = "log_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("runs.id"), unique=True, nullable=False)
+    line_count = Column(Integer, nullable=False, default=0)
+    first_log_id = Column(Integer, nullable=True)
+    last_log_id = Column(Integer, nullable=True)
+    raw_bytes = Column(Integer, nullable=False, default=0)
+    compressed_bytes = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=utc_now)
+
+    run = relationship("Run", back_populates="archive")
+
+class LogArchiveChunk(Base):
+    """One piece of a run's archive stream; concatenated in ``seq`` order they form one gzip member."""
+    __tablename__ = "log_archive_chunks"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("runs.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_log_archive_chunks_run_id_seq", "run_id", "seq", unique=True),
+    )
+
+class LogIdReservation(Base):
+    """High-water mark of log ids handed out. The actor reserves ids in blocks and
+    records the block here before publishing any of them, so a new leader never
+    reuses an id a previous one published but did not get to write."""
+    __tablename__ = "log_id_reservations"
+
+    id = Column(Integer, primary_key=True)
+    reserved_through = Column(Integer, nullable=False)
+
+# Full-text index over logs.message: an FTS5 external-content table (the text
+# lives only in ``logs``) kept in sync by triggers, so every write path,
+# including bulk inserts from the ingestor, is indexed at write time.
+LOG_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(message, content='logs', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_update AFTER UPDATE OF message ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+]
+
+# Alembic creates these in a migration; the events cover create_all/drop_all (tests, benchmarks)
+for statement in LOG_FTS_DDL:
+    event.listen(Log.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Log.__table__, "before_drop", DDL("DROP TABLE IF EXISTS logs_fts").execute_if(dialect="sqlite"))
@@ -2,8 +2,10 @@ import logging
 from typing import Dict
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from app.api.endpoints import router as api_router
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.endpoints import router as api_router, lifespan
+from app.core.cluster import ClusterUnavailableError
+from app.core.metrics import registry
 from app.config import settings
 
 # Configure Logging
@@ -13,7 +15,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AutoReflex OODA Engine", version="0.1.0")
+app = FastAPI(title="AutoReflex OODA Engine", version="0.1.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -22,6 +24,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Global Exception Handler
@@ -33,6 +36,11 @@ async def global_exception_handler(request: Request, exc: Exception) -> JSONResp
         content={"detail": "Internal Server Error. Please check server logs."},
     )
 
+@app.exception_handler(ClusterUnavailableError)
+async def cluster_unavailable_handler(request: Request, exc: ClusterUnavailableError) -> JSONResponse:
+    # The leader worker is restarting or overloaded; the client can retry
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 app.include_router(api_router, prefix="/api")
 
 @app.get("/")
@@ -42,3 +50,8 @@ async def root() -> Dict[str, str]:
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
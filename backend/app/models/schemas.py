@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Dict
 from datetime import datetime
+from app.config import settings
 
 class TaskRequest(BaseModel):
     description: str = Field(..., description="The natural language description of the coding task")
@@ -13,17 +14,32 @@ class OptimizedPrompt(BaseModel):
     optimized_prompt: str
     reasoning: str
     estimated_tokens: int
+    cache_hit: bool = False
     
     model_config = ConfigDict(from_attributes=True)
 
+class BatchOptimizeRequest(BaseModel):
+    tasks: List[TaskRequest] = Field(..., min_length=1, max_length=settings.OPTIMIZE_BATCH_MAX_SIZE)
+
+class BatchOptimizeResult(BaseModel):
+    task_id: int
+    status: str # optimizing | failed, as recorded on the task
+    result: Optional[OptimizedPrompt] = None
+    error: Optional[str] = None
+
 class RunRequest(BaseModel):
     task_id: int = Field(..., description="The ID of the task to run")
+    priority: int = Field(0, description="Higher priority runs are dispatched first")
 
 class LogEntry(BaseModel):
+    id: Optional[int] = None
+    run_id: Optional[int] = None
+    task_id: Optional[int] = None
     timestamp: datetime
     level: str
     message: str
     source: str = "claude-cli"
+    event_type: Optional[str] = None
 
 class TaskResponse(BaseModel):
     id: int
@@ -32,4 +48,19 @@ class TaskResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class RunResponse(BaseModel):
+    id: int
+    task_id: int
+    status: str
+    priority: int
+    exit_code: Optional[int] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    queued_at: Optional[datetime] = None
+    dispatched_at: Optional[datetime] = None
+    queue_wait_ms: Optional[float] = None
+    dispatch_latency_ms: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,125 @@
+"""Benchmark suite: run the scenarios, write JSON results and compare with a baseline.
+
+Scenarios (each also runs on its own as ``python -m benchmarks.<module>``):
+
+* ``optimize``: POST /api/optimize throughput, cold and cached (optimize_throughput)
+* ``ingest``: log lines/s from unpaced simulator runs into SQLite (ingest_rate)
+* ``fanout``: one run's log stream to N WebSocket clients (ws_fanout)
+* ``history``: keyset pagination on a large seeded database (history_latency)
+
+Throughput (``rps``, ``lines_per_s``, ``msgs_per_s``) that drops, or latency
+(``p50``/``p95``/``p99``) that grows, by more than ``--tolerance`` against the
+baseline is reported as a regression and the exit status is 1. Baselines are
+machine specific: record one with ``--save-baseline`` on the machine you compare on.
+
+    python -m benchmarks --quick
+    python -m benchmarks --scenario ingest --scenario fanout --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks import history_latency, ingest_rate, optimize_throughput, ws_fanout
+from benchmarks.common import BACKEND_DIR
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# name -> (runner, full parameters, --quick parameters)
+SCENARIOS: Dict[str, Tuple[Callable[..., Dict[str, Any]], Dict[str, Any], Dict[str, Any]]] = {
+    "optimize": (optimize_throughput.run, {"duration": 10.0, "clients": 16}, {"duration": 2.0, "clients": 8}),
+    "ingest": (ingest_rate.run, {"runs": 4, "lines": 20000}, {"runs": 2, "lines": 5000}),
+    "fanout": (ws_fanout.run, {"clients": 50, "lines": 5000}, {"clients": 10, "lines": 1000}),
+    "history": (history_latency.run, {"tasks": 100000, "pages": 100}, {"tasks": 20000, "pages": 20}),
+}
+
+HIGHER_IS_BETTER = ("rps", "lines_per_s", "msgs_per_s")
+LOWER_IS_BETTER = ("p50", "p95", "p99")
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Comparable metrics as ``scenario.path.metric`` -> value."""
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif key in HIGHER_IS_BETTER + LOWER_IS_BETTER and isinstance(value, (int, float)):
+            flat[path] = float(value)
+    return flat
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Every metric present in both runs, with its change and whether it regressed."""
+    current, previous = flatten(results), flatten(baseline)
+    rows = []
+    for path in sorted(current.keys() & previous.keys()):
+        new, old = current[path], previous[path]
+        change = (new - old) / old if old else 0.0
+        higher_is_better = path.rsplit(".", 1)[1] in HIGHER_IS_BETTER
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        rows.append({"metric": path, "baseline": old, "current": new, "change": round(change, 3),
+                     "regressed": regressed})
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Repeatable; default all")
+    parser.add_argument("--quick", action="store_true", help="Smaller parameters for a fast smoke run")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before a regression")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    parameters: Dict[str, Any] = {}
+    for name in args.scenario or list(SCENARIOS):
+        runner, full, quick = SCENARIOS[name]
+        parameters[name] = quick if args.quick else full
+        print(f"Running {name} {parameters[name]}...", file=sys.stderr)
+        results[name] = runner(**parameters[name])
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "parameters": parameters,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        recorded = baseline["meta"].get("parameters", {})
+        for name in parameters:
+            if name in recorded and recorded[name] != parameters[name]:
+                print(f"Baseline {name} ran with {recorded[name]}; the comparison is not like for like",
+                      file=sys.stderr)
+        rows = compare(results, baseline["results"], args.tolerance)
+        regressions = [row for row in rows if row["regressed"]]
+        for row in rows:
+            marker = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{marker:>9}  {row['metric']}: {row['baseline']} -> {row['current']} ({row['change']:+.1%})",
+                  file=sys.stderr)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Shared helpers for the backend benchmarks (run from the backend/ directory)."""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import httpx
+from sqlalchemy import create_engine, event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of latency samples, in milliseconds."""
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+def create_schema(database_url: str) -> None:
+    from app.database import Base, apply_sqlite_pragmas
+    engine = create_engine(database_url)
+    # Same profile as the app, so e.g. auto_vacuum is set before the first table exists
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+@contextmanager
+def temp_database() -> Iterator[str]:
+    with tempfile.TemporaryDirectory(prefix="autoreflex-bench-") as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        create_schema(url)
+        yield url
+
+@contextmanager
+def running_server(
+    database_url: str, extra_env: Dict[str, str] | None = None, args: List[str] | None = None
+) -> Iterator[Tuple[str, subprocess.Popen[bytes]]]:
+    """Start uvicorn on a free port against ``database_url`` and yield its base URL."""
+    port = free_port()
+    env = os.environ.copy()
+    env["DATABASE_URL"] = database_url
+    env["LOG_LEVEL"] = "WARNING"
+    env.update(extra_env or {})
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", *(args or [])]
+    # A file rather than a pipe: nobody reads a pipe while the benchmark runs, and a
+    # full one would block the server on its next log write
+    server_log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=server_log)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        try:
+            wait_for_health(base_url)
+        except RuntimeError as e:
+            server_log.seek(0)
+            raise RuntimeError(f"{e}; server output:\n{server_log.read()[-4000:].decode(errors='replace')}") from e
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        server_log.close()
+
+def wait_for_health(base_url: str, timeout: float = 20.0) -> float:
+    """Poll /health until it answers 200. Returns the seconds waited."""
+    started = time.perf_counter()
+    while True:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        if time.perf_counter() - started > timeout:
+            raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
+        time.sleep(0.01)
+
+def metric_value(exposition: str, name: str) -> float:
+    """Sum of every sample of ``name`` in a /metrics response (all label sets)."""
+    total = 0.0
+    for line in exposition.splitlines():
+        if line.startswith(name) and line[len(name):len(name) + 1] in (" ", "{"):
+            total += float(line.rsplit(" ", 1)[1])
+    return total
@@ -0,0 +1,67 @@
+"""Request latency under concurrent mixed read/write load.
+
+Writers hammer POST /api/optimize (two commits each) while readers poll
+/api/history and /api/status. When DB calls block the event loop, every
+request queues behind the commits and the read p99 climbs.
+
+    python -m benchmarks.db_latency --duration 10 --writers 8 --readers 8
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import percentiles, running_server, temp_database
+
+
+async def _worker(client: httpx.AsyncClient, method: str, path: str, deadline: float,
+                  samples: List[float], errors: List[str], payload: Dict[str, object] | None = None) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            # Failed/timed-out requests still count towards the latency distribution
+            errors.append(type(e).__name__)
+        samples.append(time.perf_counter() - started)
+
+async def run_load(
+    base_url: str, duration: float, writers: int, readers: int, timeout: float = 10.0
+) -> Dict[str, Dict[str, float]]:
+    samples: Dict[str, List[float]] = {"POST /api/optimize": [], "GET /api/history": [], "GET /api/status": []}
+    errors: Dict[str, List[str]] = {name: [] for name in samples}
+    payload: Dict[str, object] = {
+        "description": "Benchmark task", "context_files": ["a.py", "b.py"], "constraints": None,
+    }
+    limits = httpx.Limits(max_connections=writers + 2 * readers)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+        jobs = []
+        endpoints = (("POST /api/optimize", writers), ("GET /api/history", readers), ("GET /api/status", readers))
+        for name, count in endpoints:
+            method, path = name.split(" ")
+            body = payload if method == "POST" else None
+            jobs += [_worker(client, method, path, deadline, samples[name], errors[name], body) for _ in range(count)]
+        await asyncio.gather(*jobs)
+    return {
+        name: {**percentiles(values), "rps": round(len(values) / duration, 1), "errors": len(errors[name])}
+        for name, values in samples.items()
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    with temp_database() as url, running_server(url) as (base_url, _):
+        results = asyncio.run(run_load(base_url, args.duration, args.writers, args.readers))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
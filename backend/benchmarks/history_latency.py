@@ -0,0 +1,86 @@
+"""History and run-list pagination latency on a large pre-seeded database.
+
+Seeds ``--tasks`` tasks with one run each, then walks /api/history (all and
+filtered by status) and /api/runs page by page with the X-Next-Cursor cursors,
+``--concurrency`` walkers at a time. Keyset pages should cost the same at any
+depth, so the p99 stays close to the p50.
+
+    python -m benchmarks.history_latency --tasks 200000 --pages 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from benchmarks.common import percentiles, running_server, temp_database
+
+STATUSES = ("completed", "failed", "pending")
+
+def seed(database_url: str, tasks: int, batch_size: int = 10000) -> None:
+    from app.database import Run, Task
+    engine = create_engine(database_url)
+    base = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, tasks, batch_size):
+            ids = range(offset + 1, min(offset + batch_size, tasks) + 1)
+            conn.execute(insert(Task), [
+                {"id": i, "description": f"Seeded task {i}", "status": STATUSES[i % len(STATUSES)],
+                 "created_at": base + timedelta(seconds=i), "updated_at": base + timedelta(seconds=i)}
+                for i in ids
+            ])
+            conn.execute(insert(Run), [
+                {"id": i, "task_id": i, "status": STATUSES[i % 2], "priority": 0,
+                 "start_time": base + timedelta(seconds=i), "end_time": base + timedelta(seconds=i + 5)}
+                for i in ids
+            ])
+    engine.dispose()
+
+async def _walk(client: httpx.AsyncClient, path: str, params: Dict[str, Any], pages: int, samples: List[float]) -> None:
+    cursor = None
+    for _ in range(pages):
+        started = time.perf_counter()
+        response = await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+async def run_pagination(base_url: str, pages: int, page_size: int, concurrency: int) -> Dict[str, Any]:
+    walks: Dict[str, Tuple[str, Dict[str, Any]]] = {
+        "GET /api/history": ("/api/history", {"limit": page_size}),
+        "GET /api/history?status": ("/api/history", {"limit": page_size, "status": "failed"}),
+        "GET /api/runs": ("/api/runs", {"limit": page_size}),
+    }
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        for name, (path, params) in walks.items():
+            samples: List[float] = []
+            started = time.perf_counter()
+            await asyncio.gather(*(_walk(client, path, params, pages, samples) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            results[name] = {**percentiles(samples), "rps": round(len(samples) / elapsed, 1)}
+    return results
+
+def run(tasks: int = 100000, pages: int = 100, page_size: int = 50, concurrency: int = 4) -> Dict[str, Any]:
+    with temp_database() as url:
+        seed(url, tasks)
+        with running_server(url) as (base_url, _):
+            return asyncio.run(run_pagination(base_url, pages, page_size, concurrency))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=100, help="Pages walked by each walker")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tasks, args.pages, args.page_size, args.concurrency), indent=2))
+
+if __name__ == "__main__":
+    main()
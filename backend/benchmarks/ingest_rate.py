@@ -0,0 +1,95 @@
+"""Log ingestion rate: agent output read, parsed, published and written to SQLite.
+
+Starts ``--runs`` runs of the simulator writing as fast as it can
+(``MAX_CONCURRENT_RUNS`` of them at once) and times from the first POST /api/run until every run has finished
+and its lines are in the database.
+
+    python -m benchmarks.ingest_rate --runs 4 --lines 20000 --line-bytes 120 --format mixed
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import metric_value, percentiles, running_server, temp_database
+
+FINISHED = ("completed", "failed", "cancelled")
+
+def agent_env(lines: int, line_bytes: int, concurrency: int, stderr_ratio: float = 0.0,
+              output_format: str = "text") -> Dict[str, str]:
+    """Server environment whose simulator writes ``lines`` lines per run, unpaced."""
+    simulator_args = ["--lines", str(lines), "--rate", "0", "--line-bytes", str(line_bytes),
+                      "--stderr-ratio", str(stderr_ratio), "--format", output_format]
+    return {"SIMULATOR_ARGS": json.dumps(simulator_args), "MAX_CONCURRENT_RUNS": str(concurrency)}
+
+async def create_tasks(client: httpx.AsyncClient, count: int) -> List[int]:
+    """Optimized tasks ready to run (POST /api/run needs an optimization)."""
+    task_ids = []
+    for i in range(count):
+        response = await client.post("/api/optimize", json={"description": f"Benchmark run {i} {time.time_ns()}"})
+        response.raise_for_status()
+        task_ids.append(response.json()["id"])
+    return task_ids
+
+async def wait_for_runs(client: httpx.AsyncClient, run_ids: List[int], timeout: float) -> Dict[int, Dict[str, Any]]:
+    deadline = time.perf_counter() + timeout
+    while True:
+        runs = {run["id"]: run for run in (await client.get("/api/runs", params={"limit": 500})).json()}
+        if all(runs.get(run_id, {}).get("status") in FINISHED for run_id in run_ids):
+            return {run_id: runs[run_id] for run_id in run_ids}
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Runs did not finish within {timeout}s")
+        await asyncio.sleep(0.05)
+
+async def run_ingest(base_url: str, runs: int, lines: int, timeout: float) -> Dict[str, Any]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        task_ids = await create_tasks(client, runs)
+        before = metric_value((await client.get("/metrics")).text, "autoreflex_log_lines_ingested_total")
+        started = time.perf_counter()
+        run_ids = []
+        for task_id in task_ids:
+            response = await client.post("/api/run", json={"task_id": task_id})
+            response.raise_for_status()
+            run_ids.append(response.json()["run_id"])
+        finished = await wait_for_runs(client, run_ids, timeout)
+        elapsed = time.perf_counter() - started
+        ingested = metric_value((await client.get("/metrics")).text, "autoreflex_log_lines_ingested_total") - before
+
+    durations = [
+        (datetime.fromisoformat(run["end_time"]) - datetime.fromisoformat(run["start_time"])).total_seconds()
+        for run in finished.values() if run.get("start_time") and run.get("end_time")
+    ]
+    return {
+        "runs": runs,
+        "lines": int(ingested),
+        "expected_lines": runs * lines,
+        "failed_runs": sum(run["status"] != "completed" for run in finished.values()),
+        "seconds": round(elapsed, 3),
+        "lines_per_s": round(ingested / elapsed, 1),
+        "run_ms": percentiles(durations),
+    }
+
+def run(runs: int = 4, lines: int = 20000, line_bytes: int = 120, concurrency: int = 4,
+        stderr_ratio: float = 0.0, output_format: str = "text", timeout: float = 300.0) -> Dict[str, Any]:
+    env = agent_env(lines, line_bytes, concurrency, stderr_ratio, output_format)
+    with temp_database() as url, running_server(url, env) as (base_url, _):
+        return asyncio.run(run_ingest(base_url, runs, lines, timeout))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=20000, help="Lines written by each run")
+    parser.add_argument("--line-bytes", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=4, help="MAX_CONCURRENT_RUNS for the server")
+    parser.add_argument("--stderr-ratio", type=float, default=0.0, help="Fraction of lines written to stderr")
+    parser.add_argument("--format", choices=["text", "stream-json", "mixed"], default="text")
+    args = parser.parse_args()
+    results = run(args.runs, args.lines, args.line_bytes, args.concurrency, args.stderr_ratio, args.format)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
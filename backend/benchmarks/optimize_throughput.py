@@ -0,0 +1,58 @@
+"""POST /api/optimize throughput, cold and cached.
+
+``cold`` sends a new description every request, so each one goes through the
+optimizer; ``cached`` repeats a few descriptions, so after the first round every
+answer comes from the optimization cache. Both persist a task and an optimization.
+
+    python -m benchmarks.optimize_throughput --duration 10 --clients 16
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+import httpx
+
+from benchmarks.common import percentiles, running_server, temp_database
+
+
+async def _client(client: httpx.AsyncClient, descriptions: Iterator[Any], deadline: float,
+                  samples: List[float], errors: List[str]) -> None:
+    while time.perf_counter() < deadline:
+        description = f"Benchmark task {next(descriptions)}"
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/optimize", json={"description": description, "context_files": ["a.py"]})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        samples.append(time.perf_counter() - started)
+
+async def run_optimize(base_url: str, duration: float, clients: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    modes: Dict[str, Iterator[Any]] = {"cold": itertools.count(), "cached": itertools.cycle(["a", "b", "c", "d"])}
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        for mode, descriptions in modes.items():
+            samples: List[float] = []
+            errors: List[str] = []
+            deadline = time.perf_counter() + duration
+            await asyncio.gather(*(_client(client, descriptions, deadline, samples, errors) for _ in range(clients)))
+            results[mode] = {**percentiles(samples), "rps": round(len(samples) / duration, 1), "errors": len(errors)}
+    return results
+
+def run(duration: float = 10.0, clients: int = 16) -> Dict[str, Any]:
+    with temp_database() as url, running_server(url) as (base_url, _):
+        return asyncio.run(run_optimize(base_url, duration, clients))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run(args.duration, args.clients), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Read/write concurrency under the legacy and the tuned SQLite profile.
+
+Two scenarios, each run once per profile:
+
+* ``engine``: writer threads commit batches of log rows (what the ingestor does)
+  while reader threads run the history query. Under the rollback journal a
+  commit locks readers out; under WAL they keep reading the last snapshot.
+* ``server``: the mixed HTTP load from ``benchmarks.db_latency`` against a
+  uvicorn process started with the profile's SQLITE_* environment.
+
+    python -m benchmarks.sqlite_concurrency --duration 5 --scenario both
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event, insert, select, text
+
+from benchmarks.common import percentiles, running_server, temp_database
+from benchmarks.db_latency import run_load
+
+# SQLITE_* settings per profile. "legacy" is what create_engine gave us before the profile existed.
+PROFILES: Dict[str, Dict[str, str]] = {
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "SQLITE_MMAP_SIZE": "0",
+    },
+    "tuned": {},  # Settings defaults
+}
+
+def run_engine(database_url: str, profile: Dict[str, str], duration: float, writers: int, readers: int,
+               batch_size: int) -> Dict[str, Dict[str, float]]:
+    from app.config import Settings
+    from app.database import Log, Task, sqlite_pragmas
+
+    engine = create_engine(database_url, connect_args={"check_same_thread": False}, pool_size=writers + readers)
+    pragmas = sqlite_pragmas(Settings(**profile))  # type: ignore[arg-type]
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [{"description": f"task {i}", "status": "completed"} for i in range(200)])
+
+    samples: Dict[str, List[float]] = {"write batch": [], "history read": []}
+    errors: Dict[str, int] = {name: 0 for name in samples}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def record(name: str, started: float, failed: bool = False) -> None:
+        with lock:
+            samples[name].append(time.perf_counter() - started)
+            errors[name] += int(failed)
+
+    def writer() -> None:
+        rows = [{"run_id": None, "timestamp": datetime.now(timezone.utc), "level": "INFO",
+                 "message": "x" * 120, "source": "stdout"} for _ in range(batch_size)]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Log), rows)
+            except Exception:
+                record("write batch", started, failed=True)
+                continue
+            record("write batch", started)
+
+    def reader() -> None:
+        query = select(Task).order_by(Task.created_at.desc()).limit(20)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).all()
+                    conn.execute(text("SELECT count(*) FROM logs")).scalar()
+            except Exception:
+                record("history read", started, failed=True)
+                continue
+            record("history read", started)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        name: {**percentiles(values), "ops": round(len(values) / duration, 1), "errors": errors[name]}
+        for name, values in samples.items()
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--scenario", choices=["engine", "server", "both"], default="both")
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=20) # Rows per commit; the ingestor flushes small batches
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, profile in PROFILES.items():
+        if args.scenario in ("engine", "both"):
+            with temp_database() as url:
+                results.setdefault("engine", {})[name] = run_engine(
+                    url, profile, args.duration, args.writers, args.readers, args.batch_size)
+        if args.scenario in ("server", "both"):
+            with temp_database() as url, running_server(url, extra_env=profile) as (base_url, _):
+                results.setdefault("server", {})[name] = asyncio.run(
+                    run_load(base_url, args.duration, writers=8, readers=args.readers))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
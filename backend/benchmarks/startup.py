@@ -0,0 +1,74 @@
+"""Backend cold start: time to import ``app.main`` and time until ``/health`` first answers 200.
+
+Each sample is a fresh interpreter, as with uvicorn startup, every ``--reload``
+cycle and pytest collection. ``--real-optimizer`` sets USE_REAL_OPTIMIZER so the
+DSPy path is measured too; it should not move either number, since DSPy loads in
+the background after startup.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import BACKEND_DIR, percentiles, running_server, temp_database
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+def _env(database_url: str, extra_env: Dict[str, str]) -> Dict[str, str]:
+    env = os.environ.copy()
+    env["DATABASE_URL"] = database_url
+    env.update(extra_env)
+    return env
+
+def import_time(database_url: str, extra_env: Dict[str, str]) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=_env(database_url, extra_env), capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def slowest_imports(database_url: str, extra_env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """Packages by total import time (``python -X importtime`` self times), in milliseconds."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_env(database_url, extra_env), capture_output=True, text=True, check=True,
+    ).stderr
+    totals: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(own) / 1000
+    return sorted(((name, round(ms, 1)) for name, ms in totals.items()), key=lambda item: -item[1])[:top]
+
+def time_to_first_200(database_url: str, extra_env: Dict[str, str]) -> float:
+    started = time.perf_counter()
+    with running_server(database_url, extra_env):
+        return time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list")
+    parser.add_argument("--real-optimizer", action="store_true")
+    args = parser.parse_args()
+
+    extra_env = {"USE_REAL_OPTIMIZER": "true"} if args.real_optimizer else {}
+    with temp_database() as url:
+        imports = [import_time(url, extra_env) for _ in range(args.repeat)]
+        first_200 = [time_to_first_200(url, extra_env) for _ in range(args.repeat)]
+        slowest = slowest_imports(url, extra_env, args.top)
+    print(json.dumps({
+        "import app.main": percentiles(imports),
+        "first 200 on /health": percentiles(first_200),
+        "slowest imports (ms)": dict(slowest),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""WebSocket fan-out: one simulator run's log stream delivered to N clients.
+
+Each client counts the log messages it receives and the delivery latency from
+the entry's server timestamp to arrival. Messages dropped by the slow-consumer
+policy show up as ``missing``.
+
+    python -m benchmarks.ws_fanout --clients 50 --lines 5000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.common import metric_value, percentiles, running_server, temp_database
+from benchmarks.ingest_rate import agent_env, create_tasks, wait_for_runs
+
+
+async def _client(url: str, connected: asyncio.Event, expected: int, latencies: List[float],
+                  counts: List[int], stop: asyncio.Event) -> None:
+    received = 0
+    async with websockets.connect(url, max_queue=None) as websocket:
+        connected.set()
+        while received < expected and not stop.is_set():
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            message = json.loads(raw)
+            if message.get("type") != "log":
+                continue
+            received += 1
+            sent = datetime.fromisoformat(message["data"]["timestamp"])
+            latencies.append((datetime.now(timezone.utc) - sent).total_seconds())
+    counts.append(received)
+
+async def run_fanout(base_url: str, clients: int, lines: int, timeout: float) -> Dict[str, Any]:
+    ws_url = base_url.replace("http://", "ws://") + "/api/ws"
+    latencies: List[float] = []
+    counts: List[int] = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        (task_id,) = await create_tasks(client, 1)
+        connected = [asyncio.Event() for _ in range(clients)]
+        receivers = [
+            asyncio.create_task(_client(ws_url, ready, lines, latencies, counts, stop)) for ready in connected
+        ]
+        await asyncio.wait_for(asyncio.gather(*(ready.wait() for ready in connected)), timeout=30)
+
+        started = time.perf_counter()
+        response = await client.post("/api/run", json={"task_id": task_id})
+        response.raise_for_status()
+        await wait_for_runs(client, [response.json()["run_id"]], timeout)
+        # Give the last messages time to arrive, then stop clients that lost some
+        await asyncio.wait(receivers, timeout=10)
+        stop.set()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        dropped = metric_value((await client.get("/metrics")).text, "autoreflex_ws_dropped_messages_total")
+
+    delivered = sum(counts)
+    return {
+        "clients": clients,
+        "lines": lines,
+        "delivered": delivered,
+        "missing": clients * lines - delivered,
+        "dropped": int(dropped),
+        "seconds": round(elapsed, 3),
+        "msgs_per_s": round(delivered / elapsed, 1),
+        "latency_ms": percentiles(latencies),
+    }
+
+def run(clients: int = 50, lines: int = 5000, line_bytes: int = 120, timeout: float = 300.0) -> Dict[str, Any]:
+    with temp_database() as url, running_server(url, agent_env(lines, line_bytes, 1)) as (base_url, _):
+        return asyncio.run(run_fanout(base_url, clients, lines, timeout))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--line-bytes", type=int, default=120)
+    args = parser.parse_args()
+    print(json.dumps(run(args.clients, args.lines, args.line_bytes), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,82 @@
+import asyncio
+import os
+import tempfile
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from app.database import Base
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from app import database
+from app.config import settings
+from app.database import AsyncSessionLocal, Base, apply_sqlite_pragmas
+from app.api import endpoints
 from app.api.endpoints import get_db
 from app.main import app
 
-# Use in-memory SQLite with StaticPool to ensure single connection/state
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# A throwaway file rather than :memory:, so the app's background services get their
+# own connections (and SQLite's locking) instead of sharing one mid-transaction
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="autoreflex-tests-"), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# NullPool: every test (and TestClient) runs its own event loop, so no connection
+# may outlive the loop that opened it
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+# Point the whole app at the test database, not just get_db: the lifespan starts the
+# scheduler, actor, ingestor, cache and retention, which open their own sessions
+settings.DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
+database._async_engine = engine
+AsyncSessionLocal.configure(bind=engine)
+
+async def _create_tables() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def _drop_tables() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
 
 @pytest.fixture(scope="function")
 def db():
     # Create tables
-    Base.metadata.create_all(bind=engine)
-    session = TestingSessionLocal()
+    asyncio.run(_create_tables())
     try:
-        yield session
+        yield TestingSessionLocal
     finally:
-        session.close()
-        Base.metadata.drop_all(bind=engine)
+        asyncio.run(_drop_tables())
+
+@pytest.fixture(scope="function")
+def seed(db):
+    """Insert ORM rows given as a list of batches; each batch is flushed before the next,
+    so rows can reference ids assigned in earlier batches."""
+    def insert(batches):
+        async def run():
+            async with db() as session:
+                for batch in batches:
+                    session.add_all(batch)
+                    await session.flush()
+                await session.commit()
+        asyncio.run(run())
+    return insert
+
+@pytest.fixture(scope="function")
+def fresh_cache(db, monkeypatch):
+    """An empty optimization cache backed by the test database, in place of the shared one."""
+    from app.core import cache, optimizer
+    monkeypatch.setattr(cache, "AsyncSessionLocal", db)
+    fresh = cache.OptimizationCache()
+    monkeypatch.setattr(optimizer, "optimization_cache", fresh)
+    monkeypatch.setattr(endpoints, "optimization_cache", fresh)
+    return fresh
 
 @pytest.fixture(scope="function")
 def client(db):
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass 
-    
+    async def override_get_db():
+        async with db() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
     from fastapi.testclient import TestClient
     # Use context manager to trigger startup/shutdown events
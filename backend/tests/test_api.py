@@ -13,4 +13,19 @@ def test_optimize_endpoint(client):
     assert response.status_code == 200
     data = response.json()
     assert "optimized_prompt" in data
-    assert "original_task" in data
\ No newline at end of file
+    assert "original_task" in data
+
+
+def test_status_and_history_answer_conditional_gets(client):
+    for path in ("/api/status", "/api/history"):
+        first = client.get(path)
+        etag = first.headers["ETag"]
+        unchanged = client.get(path, headers={"If-None-Match": etag})
+        assert unchanged.status_code == 304 and unchanged.content == b""
+        assert unchanged.headers["ETag"] == etag
+
+    etag = client.get("/api/history").headers["ETag"]
+    client.post("/api/optimize", json={"description": "Bump the history"})
+    changed = client.get("/api/history", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()[0]["description"] == "Bump the history"
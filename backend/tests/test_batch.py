@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import select
+
+from app.core.optimizer import optimizer
+from app.database import Optimization
+from app.models.schemas import OptimizedPrompt, TaskRequest
+
+
+def _counting_predict(calls, delay=0.2, slow=()):
+    lock = threading.Lock()
+
+    def predict(task):
+        with lock:
+            calls.append(task.description)
+        time.sleep(1.0 if task.description in slow else delay)
+        return OptimizedPrompt(original_task=task.description, optimized_prompt=f"p {task.description}",
+                               reasoning="r", estimated_tokens=1)
+    return predict
+
+def _use_dspy(monkeypatch, calls, **predict_options):
+    monkeypatch.setattr(optimizer, "dspy_available", True)
+    monkeypatch.setattr(optimizer, "coalesced", 0)
+    monkeypatch.setattr(optimizer, "_predict", _counting_predict(calls, **predict_options))
+    optimizer.shutdown()
+
+def test_batch_coalesces_identical_tasks_into_one_llm_call(client, db, monkeypatch, fresh_cache):
+    calls = []
+    _use_dspy(monkeypatch, calls)
+    tasks = [
+        {"description": "Add a login form"},
+        {"description": "Write tests"},
+        {"description": " Add a  login form "},  # Same key after normalization
+        {"description": "Add a login form"},
+        {"description": "Fix the build"},
+    ]
+    response = client.post("/api/optimize/batch", json={"tasks": tasks})
+    assert response.status_code == 200
+    results = response.json()
+
+    assert sorted(calls) == ["Add a login form", "Fix the build", "Write tests"]
+    assert client.get("/api/optimize/cache").json()["coalesced"] == 2
+    assert [item["status"] for item in results] == ["optimizing"] * 5
+    assert len({item["task_id"] for item in results}) == 5
+    for task, item in zip(tasks, results):
+        assert item["result"]["id"] == item["task_id"]
+        assert item["result"]["original_task"] == task["description"]
+    assert results[2]["result"]["optimized_prompt"] == "p Add a login form"
+
+    # Every task gets its optimization, ready for POST /api/run
+    async def optimizations():
+        async with db() as session:
+            return dict((await session.execute(select(Optimization.task_id, Optimization.optimized_prompt))).all())
+    assert asyncio.run(optimizations()) == {item["task_id"]: item["result"]["optimized_prompt"] for item in results}
+
+def test_batch_records_timed_out_tasks_as_failed(client, monkeypatch, fresh_cache):
+    calls = []
+    _use_dspy(monkeypatch, calls, delay=0.0, slow={"slow"})
+    monkeypatch.setattr(optimizer, "timeout", 0.3)
+
+    tasks = [{"description": "fast"}, {"description": "slow"}]
+    results = client.post("/api/optimize/batch", json={"tasks": tasks}).json()
+    assert [item["status"] for item in results] == ["optimizing", "failed"]
+    assert results[1]["result"] is None and "0.3s" in results[1]["error"]
+
+    history = {task["id"]: task["status"] for task in client.get("/api/history").json()}
+    assert history == {results[0]["task_id"]: "optimizing", results[1]["task_id"]: "failed"}
+
+    assert client.post("/api/optimize/batch", json={"tasks": []}).status_code == 422
+
+def test_coalesced_callers_survive_the_first_caller_being_cancelled(monkeypatch, fresh_cache):
+    calls = []
+    _use_dspy(monkeypatch, calls, delay=0.3)
+
+    async def scenario():
+        first = asyncio.create_task(optimizer.optimize(TaskRequest(description="shared")))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(optimizer.optimize(TaskRequest(description="shared")))
+        await asyncio.sleep(0.05)
+        first.cancel()  # e.g. its client disconnected
+        result = await second
+        return first.cancelled(), result
+
+    first_cancelled, result = asyncio.run(scenario())
+    assert first_cancelled
+    assert result.optimized_prompt == "p shared"
+    assert calls == ["shared"] and optimizer.coalesced == 1
+    assert optimizer._inflight == {}
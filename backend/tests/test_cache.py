@@ -0,0 +1,78 @@
+import asyncio
+
+from sqlalchemy.exc import OperationalError
+
+from app.core import cache
+from app.core.cache import cache_key
+from app.models.schemas import OptimizedPrompt, TaskRequest
+
+
+def test_repeated_optimize_is_served_from_cache(client, fresh_cache):
+    payload = {"description": "Add  a login form", "context_files": ["b.py", "a.py"], "constraints": "Use React"}
+    first = client.post("/api/optimize", json=payload).json()
+    assert first["cache_hit"] is False
+
+    # Whitespace and context-file order do not change the key
+    again = {"description": " Add a login\nform ", "context_files": ["a.py", "b.py"], "constraints": "Use React"}
+    second = client.post("/api/optimize", json=again).json()
+    assert second["cache_hit"] is True
+    assert second["optimized_prompt"] == first["optimized_prompt"]
+    assert second["original_task"] == again["description"]
+    assert second["id"] != first["id"]  # Still recorded as its own task
+
+    # Persistent tier survives a cold memory tier
+    fresh_cache.clear_memory()
+    assert client.post("/api/optimize", json=payload).json()["cache_hit"] is True
+
+    other = client.post("/api/optimize", json={**payload, "constraints": "Use Vue"}).json()
+    assert other["cache_hit"] is False
+
+    stats = client.get("/api/optimize/cache").json()
+    assert (stats["memory_hits"], stats["db_hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["hit_rate"] == 0.5
+
+def test_cache_ttl_and_size_eviction(fresh_cache):
+    fresh_cache.memory_size, fresh_cache.max_rows = 2, 2
+    prompt = OptimizedPrompt(original_task="t", optimized_prompt="p", reasoning="r", estimated_tokens=1)
+    keys = [cache_key(TaskRequest(description=f"task {i}"), {"engine": "mock"}) for i in range(3)]
+
+    async def scenario():
+        for key in keys:
+            await fresh_cache.put(key, prompt)
+        assert fresh_cache.stats["memory_evictions"] == 1
+        assert await fresh_cache.prune() == 1  # Oldest row beyond max_rows
+        fresh_cache.clear_memory()
+        assert await fresh_cache.get(keys[0]) is None
+        assert await fresh_cache.get(keys[2]) is not None
+
+        fresh_cache.ttl = -1  # Already expired when written
+        await fresh_cache.put(keys[1], prompt)
+        assert await fresh_cache.get(keys[1]) is None
+        assert fresh_cache.stats["expirations"] == 1
+
+    asyncio.run(scenario())
+
+def test_cached_prompts_are_copies_and_db_errors_are_misses(fresh_cache, monkeypatch):
+    prompt = OptimizedPrompt(original_task="t", optimized_prompt="p", reasoning="r", estimated_tokens=1)
+    key = cache_key(TaskRequest(description="t"), {"engine": "mock"})
+
+    async def scenario():
+        await fresh_cache.put(key, prompt)
+        prompt.id = 1  # The caller's object is not the cached one
+        hit = await fresh_cache.get(key)
+        hit.id = 2
+        assert (await fresh_cache.get(key)).id is None
+
+        class BrokenSession:
+            async def __aenter__(self):
+                raise OperationalError("SELECT", {}, Exception("database is locked"))
+
+            async def __aexit__(self, *exc):
+                return False
+        monkeypatch.setattr(cache, "AsyncSessionLocal", BrokenSession)
+        other = cache_key(TaskRequest(description="other"), {"engine": "mock"})
+        assert await fresh_cache.get(other) is None
+        await fresh_cache.put(other, prompt)  # Kept in memory, not stored
+        assert fresh_cache.stats["errors"] == 2 and fresh_cache.stats["stores"] == 1
+
+    asyncio.run(scenario())
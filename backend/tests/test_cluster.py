@@ -0,0 +1,191 @@
+import asyncio
+import fcntl
+import json
+import socket
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.endpoints import get_db
+from app.core import actor as actor_module
+from app.core import cluster as cluster_module
+from app.core.actor import AgentActor
+from app.core.cluster import Cluster, cluster
+from app.core.events import bus
+from app.core.observer import watcher
+from app.database import LogIdReservation
+from app.main import app
+
+
+def make_cluster(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.core.cluster.settings.WORKERS", 2)
+    monkeypatch.setattr("app.core.cluster.settings.CLUSTER_SOCKET_PATH", str(tmp_path / "cluster.sock"))
+    monkeypatch.setattr("app.core.cluster.settings.CLUSTER_LOCK_PATH", str(tmp_path / "cluster.lock"))
+    monkeypatch.setattr("app.core.cluster.settings.CLUSTER_CALL_TIMEOUT", 2.0)
+    return Cluster()
+
+def test_leader_forwards_events_and_answers_calls(tmp_path, monkeypatch):
+    async def scenario():
+        leader = make_cluster(tmp_path, monkeypatch)
+        started = []
+
+        async def on_lead():
+            started.append(True)
+        await leader.start(on_lead)
+        try:
+            reader, writer = await asyncio.open_unix_connection(leader.socket_path)
+            await asyncio.sleep(0.05)
+            bus.publish("logs", {"id": 1, "run_id": 7, "message": "hello"})
+            event = json.loads(await asyncio.wait_for(reader.readline(), timeout=2))
+
+            writer.write(json.dumps({"id": 1, "method": "status", "params": {}}).encode() + b"\n")
+            reply = json.loads(await asyncio.wait_for(reader.readline(), timeout=2))
+            writer.write(json.dumps({"id": 2, "method": "missing"}).encode() + b"\n")
+            error = json.loads(await asyncio.wait_for(reader.readline(), timeout=2))
+            writer.close()
+        finally:
+            await leader.stop()
+        return leader, started, event, reply, error
+
+    leader, started, event, reply, error = asyncio.run(scenario())
+    assert leader.is_leader is False and started == [True]
+    assert event == {"topic": "logs", "data": {"id": 1, "run_id": 7, "message": "hello"}}
+    assert reply["id"] == 1 and reply["result"]["status"] == "idle" and reply["result"]["runs"] == []
+    assert error["id"] == 2 and "KeyError" in error["error"]
+
+def test_follower_calls_leader_and_takes_over(tmp_path, monkeypatch):
+    async def scenario():
+        leader = make_cluster(tmp_path, monkeypatch)
+        follower = make_cluster(tmp_path, monkeypatch)
+        led = []
+
+        async def on_lead():
+            led.append(len(led))
+        await leader.start(on_lead)
+        await follower.start(on_lead)
+        try:
+            remote_status = await follower.call("status")
+            was_leader = follower.is_leader
+            await leader.stop()
+            # The follower notices the closed socket, takes the lock and leads
+            for _ in range(50):
+                if follower.is_leader:
+                    break
+                await asyncio.sleep(0.05)
+            local_status = await follower.call("status")
+        finally:
+            await follower.stop()
+        return led, remote_status, was_leader, local_status
+
+    led, remote_status, was_leader, local_status = asyncio.run(scenario())
+    assert led == [0, 1]
+    assert was_leader is False
+    assert remote_status["status"] == local_status["status"] == "idle"
+
+def test_new_leader_never_reuses_published_log_ids(db, monkeypatch):
+    monkeypatch.setattr(actor_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr("app.core.actor.settings.LOG_ID_BLOCK_SIZE", 3)
+
+    async def scenario():
+        old_leader = AgentActor()
+        published = []
+        for _ in range(4):  # Crosses into a second block
+            await old_leader._ensure_log_ids()
+            published.append(old_leader._next_log_id())
+        # The old leader dies before its ingestor writes any of them; the new one
+        # only has the database to go on
+        new_leader = AgentActor()
+        new_leader.reset_log_ids()
+        await new_leader._ensure_log_ids()
+        async with db() as session:
+            mark = (await session.execute(select(LogIdReservation.reserved_through))).scalar()
+        return published, new_leader._next_log_id(), mark
+
+    published, next_id, mark = asyncio.run(scenario())
+    assert published == [1, 2, 3, 4]
+    assert next_id == 7 and mark == 9
+
+class FakeLeader(threading.Thread):
+    """The leader's end of the socket, in a thread: forwards log frames on demand and
+    answers ``pending_logs`` through the real ``Cluster._pending_logs``."""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        self.connected = threading.Event()
+        self.calls = []
+        self._send_lock = threading.Lock()
+
+    def run(self):
+        self.conn, _ = self.server.accept()
+        self.connected.set()
+        for line in self.conn.makefile("rb"):
+            message = json.loads(line)
+            self.calls.append(message["params"])
+            result = asyncio.run(Cluster()._methods[message["method"]](**message["params"]))
+            self.send({"id": message["id"], "result": result})
+
+    def send(self, message):
+        with self._send_lock:
+            self.conn.sendall(json.dumps(message).encode() + b"\n")
+
+class Backlog:
+    """Stands in for the leader's ingestor: entries published but not yet written."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def pending(self, after_id=0, limit=None):
+        return [entry for entry in self.entries if entry["id"] > after_id][:limit]
+
+def test_follower_clients_get_forwarded_logs_and_replay_through_the_leader(tmp_path, monkeypatch, db):
+    def entry(log_id):
+        return {"id": log_id, "run_id": 1, "task_id": 1, "message": f"line {log_id} " + "x" * 100}
+    # The leader holds the lock, so the app's worker follows it
+    lock = open(tmp_path / "cluster.lock", "a+")
+    fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    monkeypatch.setattr(cluster, "workers", 2)
+    monkeypatch.setattr(cluster, "socket_path", str(tmp_path / "cluster.sock"))
+    monkeypatch.setattr(cluster, "lock_path", lock.name)
+    monkeypatch.setattr(cluster, "call_timeout", 2.0)
+    # Nothing committed yet: replay has to come from the leader's backlog, a few entries per frame
+    monkeypatch.setattr("app.core.observer.AsyncSessionLocal", db)
+    monkeypatch.setattr(cluster_module, "log_ingestor", Backlog([entry(log_id) for log_id in range(4, 10)]))
+    monkeypatch.setattr(cluster_module, "PENDING_PAGE_BYTES", 400)
+    monkeypatch.setattr(cluster_module.actor, "_last_log_id", 9)
+    monkeypatch.setattr(watcher, "replay_page_size", 4)
+    leader = FakeLeader(cluster.socket_path)
+    leader.start()
+
+    async def override_get_db():
+        async with db() as session:
+            yield session
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            assert leader.connected.wait(timeout=2) and not cluster.is_leader
+            with client.websocket_connect("/api/ws") as websocket:
+                websocket.send_text(json.dumps({"action": "subscribe", "run_ids": [1]}))
+                assert websocket.receive_json()["type"] == "subscribed"
+                for log_id in (1, 2, 3):
+                    leader.send({"topic": "logs", "data": entry(log_id)})
+                live = [websocket.receive_json()["data"]["id"] for _ in range(3)]
+
+            with client.websocket_connect("/api/ws?last_log_id=3") as websocket:
+                replayed = []
+                message = websocket.receive_json()
+                while message["type"] != "replay_complete":
+                    replayed.append(message["data"]["id"])
+                    message = websocket.receive_json()
+    finally:
+        app.dependency_overrides = {}
+        lock.close()
+    leader.join(timeout=2)
+
+    assert live == [1, 2, 3]
+    assert replayed == [4, 5, 6, 7, 8, 9] and message["data"]["last_log_id"] == 9
+    # Two entries fit in a frame, so the backlog came over in three pages
+    assert leader.calls == [{"after_id": 3, "limit": 4}, {"after_id": 5, "limit": 4}, {"after_id": 7, "limit": 4}]
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, event, text
+
+from app.config import Settings
+from app.database import apply_sqlite_pragmas, sqlite_pragmas
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_sqlite_profile_applied_on_connect(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() == 268435456
+    engine.dispose()
+
+def test_sqlite_profile_follows_settings():
+    pragmas = sqlite_pragmas(Settings(SQLITE_JOURNAL_MODE="DELETE", SQLITE_SYNCHRONOUS="FULL"))
+    assert "PRAGMA journal_mode = DELETE" in pragmas
+    assert "PRAGMA synchronous = FULL" in pragmas
+    assert pragmas[0].startswith("PRAGMA busy_timeout")
+
+def test_importing_the_app_builds_no_engine_and_skips_dspy(tmp_path):
+    # Fresh interpreter: this process has long since imported everything
+    check = (
+        "import sys, app.main; from app import database; "
+        "assert database._engine is None and database._async_engine is None; "
+        "assert 'dspy' not in sys.modules"
+    )
+    env = {**os.environ, "USE_REAL_OPTIMIZER": "true", "DATABASE_URL": f"sqlite:///{tmp_path / 'lazy.db'}"}
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
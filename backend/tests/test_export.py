@@ -0,0 +1,42 @@
+import json
+from datetime import datetime, timedelta
+
+from app.core import export
+from app.database import Log, Run, Task
+
+
+def test_run_logs_stream_as_ndjson(client, db, monkeypatch, seed):
+    monkeypatch.setattr(export, "AsyncSessionLocal", db)
+    monkeypatch.setattr(export.settings, "LOG_EXPORT_CHUNK_SIZE", 3)
+    base = datetime(2026, 1, 1)
+    seed([
+        [Task(id=1, description="export")],
+        [Run(id=1, task_id=1, status="completed"), Run(id=2, task_id=1, status="completed")],
+        [Log(run_id=1 + i % 2, timestamp=base + timedelta(seconds=i), message=f"line {i}",
+             level="ERROR" if i % 6 == 0 else "INFO", event_type="tool_use" if i % 4 == 0 else None)
+         for i in range(20)],
+    ])
+
+    response = client.get("/api/runs/1/logs")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    entries = [json.loads(line) for line in response.text.splitlines()]
+    assert [entry["message"] for entry in entries] == [f"line {i}" for i in range(0, 20, 2)]
+    assert all(entry["run_id"] == 1 and entry["task_id"] == 1 for entry in entries)
+
+    ids = [entry["id"] for entry in entries]
+    ranged = client.get("/api/runs/1/logs", params={"after_id": ids[1], "before_id": ids[5]})
+    assert [json.loads(line)["id"] for line in ranged.text.splitlines()] == ids[2:5]
+    windowed = client.get("/api/runs/1/logs", params={"since": "2026-01-01T00:00:04", "until": "2026-01-01T00:00:10Z"})
+    assert [json.loads(line)["message"] for line in windowed.text.splitlines()] == ["line 4", "line 6", "line 8"]
+
+    errors = client.get("/api/runs/1/logs", params={"level": "error"})
+    assert [json.loads(line)["message"] for line in errors.text.splitlines()] == [f"line {i}" for i in (0, 6, 12, 18)]
+    tools = client.get("/api/runs/1/logs", params={"event_type": "tool_use"})
+    assert [json.loads(line)["message"] for line in tools.text.splitlines()] == [f"line {i}" for i in range(0, 20, 4)]
+
+    compressed = client.get("/api/runs/1/logs", params={"gzip": True})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.text == response.text  # httpx decodes the gzip stream
+
+    assert client.get("/api/runs/99/logs").status_code == 404
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.core import ingest
+from app.core.events import EventBus
+from app.core.ingest import LogIngestor
+from app.database import Log
+
+
+def make_entry(log_id, run_id, message):
+    return {
+        "id": log_id,
+        "run_id": run_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "level": "INFO",
+        "message": message,
+        "source": "system",
+    }
+
+
+async def stored(session_factory):
+    async with session_factory() as session:
+        rows = (await session.execute(select(Log).order_by(Log.id))).scalars().all()
+        return [(row.id, row.run_id, row.message) for row in rows]
+
+
+def test_published_entries_are_buffered_and_flushed_in_bulk(db, monkeypatch):
+    monkeypatch.setattr(ingest, "AsyncSessionLocal", db)
+    monkeypatch.setattr(ingest, "bus", EventBus())
+
+    async def scenario():
+        ingestor = LogIngestor()
+        ingestor.flush_interval = 60
+        await ingestor.start()
+
+        ingest.bus.publish("logs", make_entry(1, 1, "first"))
+        ingest.bus.publish("logs", make_entry(2, 2, "other run"))
+        ingest.bus.publish("logs", make_entry(3, 1, "second"))
+        assert ingestor.backlog(1) == 2
+        assert [entry["id"] for entry in ingestor.pending(after_id=1)] == [2, 3]
+        assert [entry["id"] for entry in ingestor.pending(after_id=1, limit=1)] == [2]
+        assert await stored(db) == []
+
+        assert await ingestor.flush(1) == 2
+        assert await stored(db) == [(1, 1, "first"), (3, 1, "second")]
+
+        # Stopping drains every remaining buffer
+        await ingestor.stop()
+        assert await stored(db) == [(1, 1, "first"), (2, 2, "other run"), (3, 1, "second")]
+
+    asyncio.run(scenario())
+
+
+def test_failed_writes_are_retried_then_dropped(db, monkeypatch):
+    monkeypatch.setattr(ingest, "AsyncSessionLocal", db)
+    monkeypatch.setattr(ingest, "bus", EventBus())
+
+    async def scenario():
+        ingestor = LogIngestor()
+        ingestor.flush_interval = 60
+        ingestor.max_attempts = 3
+        await ingestor.start()
+        write = ingestor._write
+        failures = {"left": 2}
+
+        async def flaky_write(entries):
+            if failures["left"]:
+                failures["left"] -= 1
+                raise RuntimeError("database is locked")
+            await write(entries)
+        ingestor._write = flaky_write
+
+        ingest.bus.publish("logs", make_entry(1, 1, "first"))
+        assert await ingestor.flush(1) == 0
+        # Still buffered, ahead of later lines, and still visible to replay
+        ingest.bus.publish("logs", make_entry(2, 1, "second"))
+        assert [entry["id"] for entry in ingestor.pending()] == [1, 2]
+        assert await ingestor.flush(1) == 0
+        assert await ingestor.flush(1) == 2
+        assert await stored(db) == [(1, 1, "first"), (2, 1, "second")]
+
+        # A run whose writes keep failing is given up on after max_attempts
+        failures["left"] = 3
+        ingest.bus.publish("logs", make_entry(3, 1, "lost"))
+        for _ in range(3):
+            assert await ingestor.flush(1) == 0
+        assert ingestor.backlog(1) == 0
+        await ingestor.stop()
+        assert await stored(db) == [(1, 1, "first"), (2, 1, "second")]
+
+    asyncio.run(scenario())
@@ -53,3 +53,63 @@ def test_run_agent_flow(client):
     response = client.post("/api/stop")
     assert response.status_code == 200
     assert response.json()["status"] == "stopped"
+
+
+def test_concurrent_runs_and_per_run_stop(client):
+    setup_resp = client.post("/api/optimize", json={"description": "Run twice", "context_files": []})
+    task_id = setup_resp.json()["id"]
+
+    # Two runs of the same task can be active at once
+    first = client.post("/api/run", json={"task_id": task_id}).json()
+    second = client.post("/api/run", json={"task_id": task_id}).json()
+    assert first["run_id"] != second["run_id"]
+
+    status = client.get("/api/status").json()
+    active_ids = {run["run_id"] for run in status["runs"]}
+    assert {first["run_id"], second["run_id"]} <= active_ids
+
+    # Stopping one run leaves the other running
+    response = client.post(f"/api/stop/{first['run_id']}")
+    assert response.status_code == 200
+    assert response.json()["run_ids"] == [first["run_id"]]
+    active_ids = {run["run_id"] for run in client.get("/api/status").json()["runs"]}
+    assert first["run_id"] not in active_ids
+    assert second["run_id"] in active_ids
+
+    assert client.post(f"/api/stop/{first['run_id']}").status_code == 404
+    client.post("/api/stop")
+
+
+def test_run_is_queued_by_priority_when_pool_is_full(client, monkeypatch):
+    from app.core.actor import actor
+    monkeypatch.setattr(actor, "max_concurrent_runs", 0)
+
+    task_id = client.post("/api/optimize", json={"description": "Queue me", "context_files": []}).json()["id"]
+    low = client.post("/api/run", json={"task_id": task_id}).json()
+    high = client.post("/api/run", json={"task_id": task_id, "priority": 5}).json()
+    assert low["status"] == "queued"
+    assert high["status"] == "queued"
+
+    queued = [entry["run_id"] for entry in client.get("/api/queue").json()]
+    assert queued.index(high["run_id"]) < queued.index(low["run_id"])
+
+    # Queued runs can be cancelled before they are dispatched
+    for run in (low, high):
+        response = client.post(f"/api/stop/{run['run_id']}")
+        assert response.json()["status"] == "cancelled"
+    assert low["run_id"] not in [entry["run_id"] for entry in client.get("/api/queue").json()]
+
+
+def test_live_logs_are_pushed_over_websocket(client):
+    task_id = client.post("/api/optimize", json={"description": "Stream logs", "context_files": []}).json()["id"]
+
+    with client.websocket_connect("/api/ws") as websocket:
+        run_id = client.post("/api/run", json={"task_id": task_id}).json()["run_id"]
+        message = websocket.receive_json()
+        while message["type"] != "log":
+            message = websocket.receive_json()
+
+    assert message["data"]["run_id"] == run_id
+    assert message["data"]["id"] > 0
+    assert message["data"]["message"].startswith("[START]")
+    client.post(f"/api/stop/{run_id}")
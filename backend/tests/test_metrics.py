@@ -0,0 +1,42 @@
+import time
+
+from app.core import metrics
+from app.core.metrics import OPTIMIZE_SECONDS, Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_exposition_format(monkeypatch):
+    monkeypatch.setattr(metrics, "registry", MetricsRegistry())
+    requests = Counter("test_requests_total", "Requests", ["path"])
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    depth = Gauge("test_depth", "Depth", ["client"])
+    depth.set_function(lambda: {("1",): 3, ("2",): 0})
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value)
+
+    lines = metrics.registry.render().splitlines()
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{path="/a\\"b"} 3' in lines
+    assert 'test_depth{client="1"} 3' in lines and 'test_depth{client="2"} 0' in lines
+    # Buckets are cumulative and upper-inclusive
+    assert 'test_latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'test_latency_seconds_bucket{le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "test_latency_seconds_sum 2.65" in lines
+    assert "test_latency_seconds_count 4" in lines
+
+def test_metrics_endpoint_reports_hot_paths(client):
+    before = OPTIMIZE_SECONDS.count(result="optimized")
+    client.post("/api/optimize", json={"description": f"metrics {time.time()}", "context_files": []})
+    assert OPTIMIZE_SECONDS.count(result="optimized") == before + 1
+
+    with client.websocket_connect("/api/ws"):
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert f'autoreflex_optimize_seconds_count{{result="optimized"}} {before + 1}' in body
+    assert 'autoreflex_optimization_cache_events_total{event="misses"}' in body
+    assert "autoreflex_ws_clients 1" in body
+    assert "autoreflex_runs_active 0" in body
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+from app.core.optimizer import optimizer
+from app.models.schemas import OptimizedPrompt, TaskRequest
+
+
+def _slow_predict(delay, in_flight, peak):
+    lock = threading.Lock()
+
+    def predict(task):
+        with lock:
+            in_flight.append(task.description)
+            peak.append(len(in_flight))
+        time.sleep(delay)
+        with lock:
+            in_flight.remove(task.description)
+        return OptimizedPrompt(original_task=task.description, optimized_prompt="p", reasoning="r", estimated_tokens=1)
+    return predict
+
+def test_dspy_calls_overlap_up_to_the_limit_without_blocking_the_loop(client, monkeypatch):
+    in_flight, peak = [], []
+    monkeypatch.setattr(optimizer, "dspy_available", True)
+    monkeypatch.setattr(optimizer, "max_concurrency", 2)
+    monkeypatch.setattr(optimizer, "_predict", _slow_predict(0.3, in_flight, peak))
+    optimizer.shutdown()  # Recreate the pool with the patched limit
+
+    async def scenario():
+        requests = [TaskRequest(description=f"overlap {i}") for i in range(4)]
+        tasks = [asyncio.create_task(optimizer._optimize_with_dspy(request)) for request in requests]
+        # The event loop keeps running while the LLM calls are in flight
+        ticks = 0
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks
+
+    started = time.perf_counter()
+    ticks = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+    assert max(peak) == 2
+    assert 0.55 < elapsed < 1.0  # Two waves of two, not four sequential calls
+    assert ticks > 20
+    optimizer.shutdown()
+
+def test_dspy_timeout_answers_504_and_fails_the_task(client, monkeypatch):
+    monkeypatch.setattr(optimizer, "dspy_available", True)
+    monkeypatch.setattr(optimizer, "timeout", 0.1)
+    monkeypatch.setattr(optimizer, "_predict", _slow_predict(0.5, [], []))
+
+    response = client.post("/api/optimize", json={"description": f"slow {time.time()}", "context_files": []})
+    assert response.status_code == 504
+    assert client.get("/api/history").json()[0]["status"] == "failed"
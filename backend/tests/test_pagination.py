@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app.database import Run, Task
+
+
+def test_history_keyset_pages(client, seed):
+    base = datetime(2026, 1, 1)
+    # Two tasks share each timestamp, so the id tie-breaker matters
+    seed([[
+        Task(description=f"task {i}", status="completed" if i % 2 else "pending",
+             created_at=base + timedelta(seconds=i // 2))
+        for i in range(9)
+    ]])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/history", params=params)
+        assert response.status_code == 200
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 9
+
+    completed = client.get("/api/history", params={"status": "completed"}).json()
+    assert [task["status"] for task in completed] == ["completed"] * 4
+    assert "X-Next-Cursor" not in client.get("/api/history").headers
+
+    assert client.get("/api/history", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_runs_listing_filters(client, seed):
+    base = datetime(2026, 1, 1)
+    seed([
+        [Task(id=1, description="a"), Task(id=2, description="b")],
+        [Run(task_id=1 + i % 2, status="completed" if i < 4 else "failed", start_time=base + timedelta(hours=i))
+         for i in range(6)],
+    ])
+
+    runs = client.get("/api/runs").json()
+    assert [run["id"] for run in runs] == [6, 5, 4, 3, 2, 1]
+
+    page = client.get("/api/runs", params={"limit": 2, "task_id": 1})
+    assert [run["id"] for run in page.json()] == [5, 3]
+    rest = client.get("/api/runs", params={"limit": 2, "task_id": 1, "cursor": page.headers["X-Next-Cursor"]})
+    assert [run["id"] for run in rest.json()] == [1]
+    assert "X-Next-Cursor" not in rest.headers
+
+    failed = client.get("/api/runs", params={"status": "failed"}).json()
+    assert [run["id"] for run in failed] == [6, 5]
+
+    # A backfilled run: in a time window, runs page by start time, not by id
+    seed([[Run(id=7, task_id=2, status="completed", start_time=base + timedelta(minutes=90))]])
+    params = {"since": "2026-01-01T01:00:00Z", "until": "2026-01-01T03:00:00Z", "limit": 2}
+    window = client.get("/api/runs", params=params)
+    assert [run["id"] for run in window.json()] == [3, 7]
+    rest = client.get("/api/runs", params={**params, "cursor": window.headers["X-Next-Cursor"]})
+    assert [run["id"] for run in rest.json()] == [2]
+    assert "X-Next-Cursor" not in rest.headers
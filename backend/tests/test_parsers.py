@@ -0,0 +1,84 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from app.core.actor import AgentActor, AgentRun
+from app.core.events import bus
+from app.core.parsers import PARSERS, LineParser, ParserChain, register_parser
+
+
+def test_parser_chain_extracts_level_source_and_event_type():
+    chain = ParserChain.from_names(["stream-json", "prefix"])
+
+    tool_use = {"type": "assistant", "message": {"content": [
+        {"type": "text", "text": "Let me look."},
+        {"type": "tool_use", "name": "Bash", "input": {"command": "ls"}},
+    ]}}
+    assert chain.parse(json.dumps(tool_use), "stdout") == (
+        'Let me look.\nBash {"command":"ls"}', "INFO", "claude", "tool_use")
+    failed_tool = {"type": "user", "message": {"content": [
+        {"type": "tool_result", "content": [{"type": "text", "text": "No such file"}], "is_error": True},
+    ]}}
+    assert chain.parse(json.dumps(failed_tool), "stdout") == ("No such file", "ERROR", "claude", "tool_result")
+    result = {"type": "result", "subtype": "error_max_turns", "is_error": True, "result": ""}
+    assert chain.parse(json.dumps(result), "stdout") == ("error_max_turns", "ERROR", "claude", "result")
+
+    assert chain.parse("[WARNING] disk almost full", "stdout") == ("disk almost full", "WARN", "stdout", None)
+    assert chain.parse("ERROR: build failed", "stderr") == ("build failed", "ERROR", "stderr", None)
+    assert chain.parse("[THINKING] Analyzing context...", "stdout") == (
+        "[THINKING] Analyzing context...", "INFO", "stdout", "thinking")
+    # Unrecognised lines keep the stream's default level
+    assert chain.parse("Note: this is prose", "stdout") == ("Note: this is prose", "INFO", "stdout", None)
+    assert chain.parse("{not json", "stderr") == ("{not json", "WARN", "stderr", None)
+
+class NoParse(LineParser):
+    name = "no-parse"
+
+def test_misregistered_parsers_fail_at_registration():
+    with pytest.raises(TypeError, match="cannot be instantiated"):
+        register_parser("no-parse", NoParse)
+    with pytest.raises(TypeError, match="is not a LineParser"):
+        register_parser("not-a-parser", dict)
+    assert "no-parse" not in PARSERS and "not-a-parser" not in PARSERS
+    with pytest.raises(TypeError, match="cannot be instantiated"):
+        ParserChain.from_names(["tests.test_parsers:NoParse"])
+
+def test_stderr_is_drained_while_stdout_is_read(monkeypatch):
+    # 300 KiB of stderr before any stdout: with only stdout read, the child blocks
+    # on the full stderr pipe and stdout never reaches EOF
+    script = (
+        "import sys\n"
+        "sys.stderr.write(('noise ' * 16 + '\\n') * 3000)\n"
+        "sys.stderr.write('FATAL: out of tokens\\n')\n"
+        "print('[ERROR] build broke', flush=True)\n"
+    )
+
+    async def scenario():
+        actor = AgentActor()
+        actor._last_log_id, actor._reserved_log_id = 0, 10 ** 6  # A block reserved up front: no database here
+        queue = bus.subscribe("logs")
+
+        async def finished(*args):
+            pass
+        monkeypatch.setattr(actor, "_finish_run", finished)
+        monkeypatch.setattr(actor, "_broadcast_status", finished)
+
+        run = AgentRun(1, 1)
+        run.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", script, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            await asyncio.wait_for(actor._monitor_process(run), timeout=10)
+        finally:
+            bus.unsubscribe("logs", queue)
+        entries = [queue.get_nowait() for _ in range(queue.qsize())]
+        return run, entries
+
+    run, entries = asyncio.run(scenario())
+    assert run.status == "completed"
+    assert len(entries) == 3002
+    assert sorted((entry["source"], entry["message"]) for entry in entries if entry["level"] == "ERROR") == [
+        ("stderr", "out of tokens"), ("stdout", "build broke")]
+    assert entries[0]["source"] == "stderr" and entries[0]["level"] == "WARN"
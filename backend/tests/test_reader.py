@@ -0,0 +1,34 @@
+import asyncio
+
+from app.core.reader import OutputLine, read_lines
+
+
+def _read(data, max_line_bytes=8, chunk_size=5, mode="split"):
+    async def scenario():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        return [line async for line in read_lines(stream, max_line_bytes, chunk_size, mode)]
+    return asyncio.run(scenario())
+
+def test_long_lines_are_split_or_truncated():
+    data = b"short\r\n" + b"x" * 20 + b"\nnext\n\nlast"
+    assert _read(data) == [
+        OutputLine("short"),
+        OutputLine("x" * 8), OutputLine("x" * 8, continuation=True), OutputLine("xxxx", continuation=True),
+        OutputLine("next"), OutputLine(""), OutputLine("last"),
+    ]
+    assert _read(data, mode="truncate") == [
+        OutputLine("short"), OutputLine("x" * 8, truncated=True),
+        OutputLine("next"), OutputLine(""), OutputLine("last"),
+    ]
+    # A huge line arriving in one chunk is handled the same way
+    assert _read(b"y" * 100 + b"\nok\n", chunk_size=4096, mode="truncate") == [
+        OutputLine("y" * 8, truncated=True), OutputLine("ok")]
+
+def test_decoding_is_lenient_and_cuts_keep_characters_whole():
+    assert _read(b"bad \xff\xfe\n") == [OutputLine("bad ��")]
+    # "é" is two bytes; a cut at byte 8 would fall inside the fourth one
+    lines = _read("aéééé\n".encode(), chunk_size=3)
+    assert [line.text for line in lines] == ["aééé", "é"]
+    assert "".join(line.text for line in _read("日本語のテキスト\n".encode(), max_line_bytes=7)) == "日本語のテキスト"
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from app.core import export
+from app.core import retention as retention_module
+from app.core.actor import actor
+from app.core.retention import RetentionWorker
+from app.database import Log, LogArchive, LogArchiveChunk, Run, Task
+
+
+def _scalar(db, query):
+    async def fetch():
+        async with db() as session:
+            return (await session.execute(query)).scalar()
+    return asyncio.run(fetch())
+
+def test_retention_caps_archives_and_export_reads_archives(client, db, monkeypatch, seed):
+    monkeypatch.setattr(retention_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr(export, "AsyncSessionLocal", db)
+    now = datetime.now(timezone.utc)
+    seed([
+        [Task(id=1, description="retention")],
+        [
+            Run(id=1, task_id=1, status="completed", end_time=now - timedelta(days=60)),  # too old
+            Run(id=2, task_id=1, status="failed", end_time=now),  # beyond keep_runs
+            Run(id=3, task_id=1, status="completed", end_time=now),  # too many lines
+            Run(id=4, task_id=1, status="running"),  # never touched while running
+        ],
+        [Log(run_id=run_id, message=f"run {run_id} line {i}") for run_id in (1, 2, 4) for i in range(5)],
+        [Log(run_id=3, message=f"run 3 line {i}") for i in range(12)],
+        [Log(run_id=4, message=f"run 4 extra {i}") for i in range(10)],
+    ])
+
+    actor.reset_log_ids()  # Seed the marker's id from this database
+    worker = RetentionWorker()
+    worker.max_age_days, worker.keep_runs, worker.max_lines_per_run, worker.chunk_size = 30, 1, 6, 2
+    result = asyncio.run(worker.run_once())
+    assert result["archived_runs"] == 2 and result["archived_lines"] == 10
+    assert result["capped_runs"] == 1 and result["dropped_lines"] == 7
+
+    remaining = _scalar(db, select(func.group_concat(Log.run_id.distinct())))
+    assert sorted(remaining.split(",")) == ["3", "4"]
+    run3 = [json.loads(line)["message"] for line in client.get("/api/runs/3/logs").text.splitlines()]
+    assert run3[:5] == ["run 3 line 0", "run 3 line 1", "run 3 line 2", "run 3 line 10", "run 3 line 11"]
+    # The marker gets a new id rather than one a dropped line was published with
+    assert run3[5].startswith("[retention] 7 line(s) between log 18 and 26 dropped")
+    assert _scalar(db, select(func.max(Log.id)).where(Log.run_id == 3)) > 37
+    assert _scalar(db, select(func.count(Log.id)).where(Log.run_id == 4)) == 15
+
+    # Archived runs read back through the same export API, ranges included
+    archived = [json.loads(line) for line in client.get("/api/runs/1/logs").text.splitlines()]
+    assert [entry["message"] for entry in archived] == [f"run 1 line {i}" for i in range(5)]
+    assert all(entry["task_id"] == 1 for entry in archived)
+    ranged = client.get("/api/runs/1/logs", params={"after_id": archived[0]["id"], "before_id": archived[3]["id"]})
+    assert [json.loads(line)["id"] for line in ranged.text.splitlines()] == [archived[1]["id"], archived[2]["id"]]
+    assert _scalar(db, select(LogArchive.line_count).where(LogArchive.run_id == 2)) == 5
+
+    # A second pass finds nothing left to do
+    assert asyncio.run(worker.run_once())["archived_runs"] == 0
+
+    # An old run that never logged (cancelled while queued) gets no empty archive
+    seed([[Run(id=5, task_id=1, status="cancelled", end_time=now - timedelta(days=60))]])
+    worker.keep_runs = 0
+    assert asyncio.run(worker.run_once())["archived_runs"] == 0
+    assert _scalar(db, select(func.count(LogArchive.id)).where(LogArchive.run_id == 5)) == 0
+
+def test_archives_are_written_and_read_in_chunks(client, db, monkeypatch, seed):
+    monkeypatch.setattr(retention_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr(export, "AsyncSessionLocal", db)
+    monkeypatch.setattr(retention_module, "ARCHIVE_CHUNK_SIZE", 4096)
+    messages = [os.urandom(256).hex() for _ in range(400)]
+    seed([
+        [Task(id=1, description="chunks")],
+        [Run(id=1, task_id=1, status="completed")],
+        [Log(run_id=1, message=message) for message in messages],
+    ])
+
+    worker = RetentionWorker()
+    worker.chunk_size = 50
+    assert asyncio.run(worker.archive_run(1)) == 400
+    assert _scalar(db, select(func.count(LogArchiveChunk.id)).where(LogArchiveChunk.run_id == 1)) > 1
+
+    exported = [json.loads(line)["message"] for line in client.get("/api/runs/1/logs").text.splitlines()]
+    assert exported == messages
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select
+
+from app.core import actor as actor_module
+from app.core import scheduler as scheduler_module
+from app.core.actor import actor
+from app.core.scheduler import RunScheduler
+from app.database import Run, Task
+
+
+def test_run_cancelled_between_select_and_claim_is_not_started(db, monkeypatch, seed):
+    monkeypatch.setattr(actor_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr(actor, "max_concurrent_runs", 1)
+    scheduler = RunScheduler()
+    seed([[Task(id=1, description="race")], [Run(id=1, task_id=1, prompt="race", status="queued")]])
+
+    async def scenario():
+        # start_task runs this after the scheduler selected the run and before it claims it
+        async def cancel_first():
+            assert await scheduler.cancel(1)
+        monkeypatch.setattr(actor, "_ensure_log_ids", cancel_first)
+
+        dispatched = await scheduler.dispatch_pending()
+        async with db() as session:
+            status = (await session.execute(select(Run.status).where(Run.id == 1))).scalar()
+        return dispatched, status
+
+    dispatched, status = asyncio.run(scenario())
+    assert dispatched == []
+    assert status == "cancelled"
+    assert actor.runs == {} and actor.available_slots == 1
+
+def test_run_stopped_while_spawning_is_terminated(db, monkeypatch, seed):
+    agent = [sys.executable, "-c", "import time; time.sleep(30)"]
+    monkeypatch.setattr("app.core.actor.settings.AUTOREFLEX_AGENT_CMD", agent)
+    seed([[Task(id=1, description="stop early")]])
+    spawn = asyncio.create_subprocess_exec
+    stopped = []
+
+    async def spawn_after_stop(*args, **kwargs):
+        stopped.extend(await actor.stop_task())
+        return await spawn(*args, **kwargs)
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spawn_after_stop)
+
+    async def scenario():
+        started = time.perf_counter()
+        run_id = await actor.start_task("stop early", 1)
+        run = actor.runs[run_id]
+        await run._monitor
+        async with db() as session:
+            status = (await session.execute(select(Run.status).where(Run.id == run_id))).scalar()
+        return run_id, run.process.returncode, status, time.perf_counter() - started
+
+    run_id, returncode, status, elapsed = asyncio.run(scenario())
+    assert stopped == [run_id]
+    assert returncode != 0 and status == "cancelled" and elapsed < 10
+    assert actor.runs == {}
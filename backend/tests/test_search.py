@@ -0,0 +1,42 @@
+from app.core import search
+from app.database import Log, Run, Task
+
+
+def test_log_search_ranks_and_pages(client, db, monkeypatch, seed):
+    monkeypatch.setattr(search, "AsyncSessionLocal", db)
+    seed([
+        [Task(id=1, description="a"), Task(id=2, description="b")],
+        [Run(id=1, task_id=1, status="failed"), Run(id=2, task_id=2, status="completed")],
+        [
+            Log(run_id=1, level="ERROR", message="KeyError: 'id' raised while parsing the config"),
+            Log(run_id=1, level="INFO", message="retrying after connection timeout"),
+            Log(run_id=2, level="ERROR", message="connection timeout"),
+            Log(run_id=2, level="ERROR", message="KeyError: 'id'"),
+            Log(run_id=2, level="INFO", message="all good"),
+        ],
+    ])
+
+    hits = client.get("/api/logs/search", params={"q": "KeyError: 'id'"}).json()
+    assert [(hit["run_id"], hit["task_id"]) for hit in hits] == [(2, 2), (1, 1)]  # shorter line ranks higher
+    assert hits[1]["snippet"].startswith("<mark>KeyError: 'id</mark>")
+
+    errors = client.get("/api/logs/search", params={"q": "timeout", "level": "error"}).json()
+    assert [hit["run_id"] for hit in errors] == [2]
+    task_hits = client.get("/api/logs/search", params={"q": "timeout", "task_id": 1}).json()
+    assert [hit["run_id"] for hit in task_hits] == [1]
+
+    # Log rows written later are indexed by the triggers
+    seed([[Log(run_id=1, level="ERROR", message="connection timeout again")]])
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "timeout", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/logs/search", params=params)
+        seen += [hit["id"] for hit in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 3
+
+    assert len(client.get("/api/logs/search", params={"q": "connection NOT retrying", "raw": True}).json()) == 2
+    assert client.get("/api/logs/search", params={"q": "AND AND", "raw": True}).status_code == 400
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+from app.core.actor import AgentActor, AgentRun
+from app.core.events import bus
+
+SIMULATOR = "app/core/simulator.py"
+
+def test_simulator_load_options():
+    result = subprocess.run(
+        [sys.executable, SIMULATOR, "--lines", "40", "--rate", "0", "--line-bytes", "50", "--format", "mixed",
+         "--stderr-ratio", "0.5", "--long-line-every", "10", "--long-line-bytes", "100000",
+         "--invalid-utf8-every", "7", "--exit-code", "3", "--seed", "1"],
+        capture_output=True, timeout=30,
+    )
+    assert result.returncode == 3
+    lines = result.stdout.splitlines() + result.stderr.splitlines()
+    assert len(lines) == 40 and result.stdout and result.stderr
+    assert sum(len(line) >= 100000 for line in lines) == 4
+    invalid = [line for line in lines if b"\xff\xfe" in line]
+    assert len(invalid) == 5
+    events = [json.loads(line) for line in lines if line.startswith(b"{") and line not in invalid]
+    assert {event["type"] for event in events} == {"assistant", "user"}
+
+def test_simulator_output_through_actor(monkeypatch):
+    monkeypatch.setattr("app.core.actor.settings.LOG_MAX_LINE_BYTES", 4096)
+
+    async def scenario():
+        actor = AgentActor()
+        actor._last_log_id, actor._reserved_log_id = 0, 10 ** 6  # A block reserved up front: no database here
+        queue = bus.subscribe("logs")
+
+        async def finished(*args):
+            pass
+        monkeypatch.setattr(actor, "_finish_run", finished)
+        monkeypatch.setattr(actor, "_broadcast_status", finished)
+
+        run = AgentRun(1, 1)
+        run.process = await asyncio.create_subprocess_exec(
+            sys.executable, SIMULATOR, "--lines", "30", "--rate", "0", "--format", "stream-json",
+            "--long-line-every", "15", "--long-line-bytes", "10000", "--invalid-utf8-every", "10", "--exit-code", "1",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            await asyncio.wait_for(actor._monitor_process(run), timeout=10)
+        finally:
+            bus.unsubscribe("logs", queue)
+        return run, [queue.get_nowait() for _ in range(queue.qsize())]
+
+    run, entries = asyncio.run(scenario())
+    assert run.status == "failed"
+    # Two 10 KB lines arrive as 3 records each: the parsed head and two continuations
+    assert len(entries) == 34
+    assert sum(entry["event_type"] == "continuation" for entry in entries) == 4
+    assert {entry["event_type"] for entry in entries} >= {"text", "tool_use", "tool_result"}
+    assert sum("�" in entry["message"] for entry in entries) == 3
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from app.core import cluster, ingest, observer
+from app.core.actor import actor
+from app.core.events import EventBus
+from app.core.ingest import LogIngestor
+from app.core.observer import LogWatcher
+from app.core.websockets import ConnectionManager, Subscription
+from app.database import Run, Task
+
+
+class FakeWebSocket:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+        self.closed = False
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise ConnectionResetError("gone")
+        await self.gate.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self):
+        self.closed = True
+
+
+def test_slow_client_does_not_block_others_and_drops_oldest():
+    async def scenario():
+        manager = ConnectionManager()
+        fast, slow = FakeWebSocket(), FakeWebSocket()
+        slow.gate.clear()
+        await manager.connect(fast)
+        slow_client = await manager.connect(slow)
+        slow_client.max_queue = 2
+
+        await manager.broadcast({"n": 0})
+        await asyncio.sleep(0.01)
+        for i in range(1, 5):
+            await manager.broadcast({"n": i})
+        await asyncio.sleep(0.01)
+
+        assert [m["n"] for m in fast.sent] == [0, 1, 2, 3, 4]
+        # The slow writer is stuck on message 0; only the newest two stay queued
+        slow.gate.set()
+        await asyncio.sleep(0.01)
+        assert [m["n"] for m in slow.sent] == [0, 3, 4]
+        assert slow_client.dropped == 2
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_and_disconnect_policies():
+    async def scenario():
+        manager = ConnectionManager()
+        coalescing, strict = FakeWebSocket(), FakeWebSocket()
+        coalescing.gate.clear()
+        strict.gate.clear()
+        (await manager.connect(coalescing)).policy = "coalesce"
+        strict_client = await manager.connect(strict)
+        strict_client.policy = "disconnect"
+        strict_client.max_queue = 1
+
+        await manager.broadcast({"n": 0})
+        await asyncio.sleep(0.01)
+        for status in ("starting", "running", "idle"):
+            await manager.broadcast({"status": status}, coalesce_key="status:1")
+        await asyncio.sleep(0.01)
+
+        assert strict.closed
+        assert strict not in manager.active_connections
+
+        coalescing.gate.set()
+        await asyncio.sleep(0.01)
+        assert coalescing.sent == [{"n": 0}, {"status": "idle"}]
+
+    asyncio.run(scenario())
+
+
+def test_dead_sockets_are_removed():
+    async def scenario():
+        manager = ConnectionManager()
+        dead = FakeWebSocket(fail=True)
+        await manager.connect(dead)
+        await manager.broadcast({"n": 1})
+        await asyncio.sleep(0.01)
+        assert manager.active_connections == {}
+
+    asyncio.run(scenario())
+
+
+def test_subscriptions_filter_by_run_task_and_level():
+    async def scenario():
+        manager = ConnectionManager()
+        everything, errors_of_run_1 = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(everything)
+        filtered = await manager.connect(errors_of_run_1)
+        filtered.subscription = Subscription(run_ids={1}, levels={"error"})
+
+        await manager.broadcast({"type": "log", "data": {"run_id": 1, "task_id": 7, "level": "INFO"}})
+        await manager.broadcast({"type": "log", "data": {"run_id": 1, "task_id": 7, "level": "ERROR"}})
+        await manager.broadcast({"type": "log", "data": {"run_id": 2, "task_id": 7, "level": "ERROR"}})
+        await manager.broadcast({"type": "status", "data": "running", "run_id": 1, "task_id": 7})
+        await asyncio.sleep(0.01)
+
+        assert len(everything.sent) == 4
+        assert errors_of_run_1.sent == [
+            {"type": "log", "data": {"run_id": 1, "task_id": 7, "level": "ERROR"}},
+            {"type": "status", "data": "running", "run_id": 1, "task_id": 7},
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_subscribe_message_is_acknowledged(client):
+    with client.websocket_connect("/api/ws") as websocket:
+        websocket.send_text(json.dumps({"action": "subscribe", "run_ids": [3, 1], "levels": ["warn"]}))
+        ack = websocket.receive_json()
+    assert ack == {"type": "subscribed", "data": {"run_ids": [1, 3], "task_ids": [], "levels": ["WARN"]}}
+
+
+def test_live_entries_are_held_during_replay_without_duplicates():
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        client = await manager.connect(socket)
+        client.begin_replay(last_log_id=3)
+
+        # Live entries arriving mid-replay are held back, not sent
+        for log_id in (5, 6):
+            await manager.broadcast({"type": "log", "data": {"id": log_id}})
+        await client.put(json.dumps({"type": "log", "data": {"id": 4}}))
+        await client.put(json.dumps({"type": "log", "data": {"id": 5}}))
+        assert client.finish_replay(cursor=5)
+
+        # Already delivered ids are dropped once the client is live again
+        for log_id in (6, 7):
+            await manager.broadcast({"type": "log", "data": {"id": log_id}})
+        await asyncio.sleep(0.01)
+        assert [m["data"]["id"] for m in socket.sent] == [4, 5, 6, 7]
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_replays_missed_logs_in_pages(client, db, seed, monkeypatch):
+    from app.core import actor as actor_module
+    from app.core.observer import watcher
+    from app.database import Log
+
+    monkeypatch.setattr(actor_module, "AsyncSessionLocal", db)
+    monkeypatch.setattr(observer, "AsyncSessionLocal", db)
+    async def reserve():
+        await actor._ensure_log_ids()
+        return [actor._next_log_id() for _ in range(5)]
+    ids = asyncio.run(reserve())
+    seed([[Log(id=log_id, run_id=0, message=f"missed {log_id}") for log_id in ids]])
+
+    watcher.replay_page_size = 2
+    try:
+        with client.websocket_connect(f"/api/ws?last_log_id={ids[0]}") as websocket:
+            received = []
+            message = websocket.receive_json()
+            while message["type"] != "replay_complete":
+                received.append(message["data"]["id"])
+                message = websocket.receive_json()
+    finally:
+        watcher.replay_page_size = 500
+
+    assert received == sorted(set(received))
+    assert received[:4] == ids[1:]
+    assert message["data"]["last_log_id"] == received[-1]
+
+
+def test_replay_merges_buffered_entries_with_rows_committed_out_of_order(db, monkeypatch, seed):
+    seed([[Task(id=1, description="replay")], [Run(id=1, task_id=1), Run(id=2, task_id=1)]])
+    monkeypatch.setattr(ingest, "AsyncSessionLocal", db)
+    monkeypatch.setattr(observer, "AsyncSessionLocal", db)
+    monkeypatch.setattr(ingest, "bus", EventBus())
+    monkeypatch.setattr(actor, "_last_log_id", 4)
+
+    async def scenario():
+        ingestor = LogIngestor()
+        ingestor.flush_interval = 60
+        await ingestor.start()
+        monkeypatch.setattr(cluster, "log_ingestor", ingestor)
+        for log_id, run_id in ((1, 1), (2, 2), (3, 1), (4, 2)):
+            ingest.bus.publish("logs", {
+                "id": log_id, "run_id": run_id, "task_id": 1, "timestamp": datetime.now(timezone.utc).isoformat(),
+                "level": "INFO", "message": f"line {log_id}", "source": "stdout",
+            })
+        # Run 2 finished and was flushed; run 1 is still buffering
+        assert await ingestor.flush(2) == 2
+
+        replayed = {}
+        for page_size in (500, 1):
+            manager = ConnectionManager()
+            socket = FakeWebSocket()
+            client = await manager.connect(socket)
+            watcher = LogWatcher()
+            watcher.replay_page_size = page_size
+            await watcher.replay(client, 0)
+            await asyncio.sleep(0.01)
+            replayed[page_size] = socket.sent
+        await ingestor.stop()
+        return replayed
+
+    for sent in asyncio.run(scenario()).values():
+        assert [m["data"]["id"] for m in sent if m["type"] == "log"] == [1, 2, 3, 4]
+        assert sent[-1] == {"type": "replay_complete", "data": {"last_log_id": 4}}
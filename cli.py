@@ -79,7 +79,8 @@ def setup():
 @cli.command()
 @click.option('--port', default=8000, help='Backend API port')
 @click.option('--host', default='0.0.0.0', help='Backend API host')
-def start(host, port):
+@click.option('--workers', default=1, help='Backend worker processes (more than 1 disables --reload)')
+def start(host, port, workers):
     """Start the full stack (Backend + Frontend)."""
     check_venv()
 
@@ -101,8 +102,17 @@ def start(host, port):
     try:
         click.echo(f"🚀 Starting Backend (Uvicorn) on http://{host}:{port}...")
         # Use sys.executable to run uvicorn module if direct binary fails, but binary is safer in venv
-        backend_cmd = [VENV_UVICORN, "app.main:app", "--host", host, "--port", str(port), "--reload"]
-        backend_proc = subprocess.Popen(backend_cmd, cwd=BACKEND_DIR)
+        backend_cmd = [VENV_UVICORN, "app.main:app", "--host", host, "--port", str(port)]
+        backend_env = os.environ.copy()
+        if workers > 1:
+            # Workers elect a leader through the lock file and share events over the socket
+            backend_cmd += ["--workers", str(workers)]
+            backend_env["WORKERS"] = str(workers)
+            backend_env.setdefault("CLUSTER_SOCKET_PATH", os.path.join(BACKEND_DIR, "autoreflex-cluster.sock"))
+            backend_env.setdefault("CLUSTER_LOCK_PATH", os.path.join(BACKEND_DIR, "autoreflex-cluster.lock"))
+        else:
+            backend_cmd.append("--reload")
+        backend_proc = subprocess.Popen(backend_cmd, cwd=BACKEND_DIR, env=backend_env)
 
         click.echo("🚀 Starting Frontend (Vite)...")
         frontend_proc = subprocess.Popen(["npm", "run", "dev"], cwd=FRONTEND_DIR)
@@ -151,13 +161,30 @@ def test():
         
     click.echo("✅ All Tests Passed!")
 
+@cli.command(context_settings={"ignore_unknown_options": True})
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+def bench(args):
+    """Run the benchmark suite and compare with the stored baseline.
+
+    Options go to `python -m benchmarks`, e.g. --quick, --scenario ingest, --save-baseline.
+    """
+    check_venv()
+    click.echo("⏱️  Running benchmarks...")
+    ret = subprocess.call([VENV_PYTHON, "-m", "benchmarks", *args], cwd=BACKEND_DIR)
+    if ret != 0:
+        click.echo("❌ Benchmarks failed or regressed against the baseline!")
+        sys.exit(ret)
+    click.echo("✅ Benchmarks complete.")
+
 @cli.command()
-def tui():
+@click.option('--max-log-lines', default=5000, help='Log lines kept in the Live Logs tab (+/- adjust it while running)')
+@click.option('--fps', default=10.0, help='Max log view redraws per second')
+def tui(max_log_lines, fps):
     """Start the Terminal User Interface (Textual)."""
     check_venv()
     click.echo("🖥️  Starting TUI...")
     # Run tui as a module
-    subprocess.call([VENV_PYTHON, "-m", "tui.app"])
+    subprocess.call([VENV_PYTHON, "-m", "tui.app", "--max-log-lines", str(max_log_lines), "--fps", str(fps)])
 
 @cli.group()
 def service():
@@ -248,6 +275,14 @@ def status():
         click.echo("❌ Service is STOPPED or unreachable")
         click.echo(f"   ({e})")
 
+@cli.command()
+def compact():
+    """Archive old run logs now and VACUUM the database (stop the backend first)."""
+    check_venv()
+    click.echo("🗜️  Compacting backend/autoreflex.db...")
+    subprocess.check_call([VENV_PYTHON, "-m", "app.core.retention"], cwd=BACKEND_DIR)
+    click.echo("✅ Compacted.")
+
 @cli.command()
 def clean():
     """Remove build artifacts and temp files."""
@@ -3,6 +3,7 @@ export interface LogEntry {
   level: string;
   message: string;
   source: string;
+  event_type?: string | null;
 }
 
 export interface OptimizedPrompt {
@@ -11,6 +12,7 @@ export interface OptimizedPrompt {
   optimized_prompt: string;
   reasoning: string;
   estimated_tokens: number;
+  cache_hit?: boolean;
 }
 
 export interface TaskHistory {
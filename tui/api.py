@@ -1,54 +1,86 @@
+import asyncio
 import httpx
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 # Configure logging to a file since stdout is used by the TUI
 logging.basicConfig(filename='tui_debug.log', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AutoReflexAPI:
+    """Async client for the backend's /api routes, sharing one pooled connection set."""
+
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url.rstrip("/")
-        self.client = httpx.Client(base_url=self.base_url, timeout=5.0)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(5.0, connect=2.0),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+        # Last ETag and body per path, for conditional GETs
+        self._cache: Dict[str, Tuple[str, Any]] = {}
+
+    async def close(self) -> None:
+        await self.client.aclose()
 
-    def check_health(self) -> bool:
+    async def _get_json(self, path: str, params: Dict[str, Any] | None = None) -> Any:
+        """GET with If-None-Match; a 304 returns the cached body without re-downloading it."""
+        key = str(httpx.URL(path, params=params))
+        cached = self._cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = await self.client.get(path, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._cache[key] = (etag, data)
+        return data
+
+    async def check_health(self) -> bool:
         try:
-            response = self.client.get("/status")
+            response = await self.client.get("/health")
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Health check failed: {e}")
             return False
 
-    def get_status(self) -> Dict[str, Any]:
+    async def get_status(self) -> Dict[str, Any]:
         try:
-            response = self.client.get("/status")
-            response.raise_for_status()
-            return response.json()
+            return await self._get_json("/api/status")
         except Exception as e:
             logger.error(f"Get status failed: {e}")
-            return {"is_running": False, "active_task_id": None}
+            return {"status": "unreachable", "runs": []}
 
-    def get_history(self) -> List[Dict[str, Any]]:
+    async def get_history(self, limit: int = 50) -> List[Dict[str, Any]]:
         try:
-            response = self.client.get("/history")
-            response.raise_for_status()
-            return response.json()
+            return await self._get_json("/api/history", {"limit": limit})
         except Exception as e:
             logger.error(f"Get history failed: {e}")
             return []
 
-    def start_task(self, prompt: str) -> Optional[int]:
+    async def get_dashboard(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Status and history, fetched in parallel."""
+        status, history = await asyncio.gather(self.get_status(), self.get_history())
+        return status, history
+
+    async def start_task(self, prompt: str) -> Optional[int]:
+        """Optimize ``prompt`` into a new task and run it. Returns the run id."""
         try:
-            response = self.client.post("/start", json={"prompt": prompt})
+            response = await self.client.post("/api/optimize", json={"description": prompt})
+            response.raise_for_status()
+            task_id = response.json().get("id")
+            response = await self.client.post("/api/run", json={"task_id": task_id})
             response.raise_for_status()
-            return response.json().get("task_id")
+            return response.json().get("run_id")
         except Exception as e:
             logger.error(f"Start task failed: {e}")
             return None
 
-    def stop_agent(self) -> bool:
+    async def stop_agent(self, run_id: int | None = None) -> bool:
         try:
-            response = self.client.post("/stop")
+            response = await self.client.post("/api/stop" if run_id is None else f"/api/stop/{run_id}")
             return response.status_code == 200
         except Exception as e:
             logger.error(f"Stop agent failed: {e}")
@@ -4,57 +4,166 @@ from textual.widgets import Header, Footer, Static, DataTable, TabbedContent, Ta
 from textual.worker import Worker, WorkerState
 from textual.reactive import reactive
 from textual import work
+from rich.text import Text
+import argparse
 import asyncio
 import websockets
 import json
+from collections import deque
 from datetime import datetime
+from typing import Any, Deque, Dict, List, Tuple
 
 from .api import AutoReflexAPI
 
+LEVEL_STYLES = {"ERROR": "bold red", "WARN": "yellow", "WARNING": "yellow", "DEBUG": "dim"}
+
+def format_log_entry(entry: Dict[str, Any]) -> Text:
+    """One log line from an observer payload (``{"type": "log", "data": {...}}``'s data).
+
+    Built as a Text rather than markup so brackets in agent output print as-is.
+    """
+    timestamp = str(entry.get("timestamp") or "")
+    level = str(entry.get("level") or "INFO").upper()
+    line = Text()
+    line.append(timestamp[11:19] or "--:--:--", style="dim")
+    line.append(f" {level:<5} ", style=LEVEL_STYLES.get(level, "green"))
+    if entry.get("run_id") is not None:
+        line.append(f"#{entry['run_id']} ", style="cyan")
+    if entry.get("event_type"):
+        line.append(f"{entry['event_type']}: ", style="magenta")
+    line.append(str(entry.get("message", "")))
+    return line
+
 class LogWorker(Static):
-    """Hidden widget to manage the websocket connection and stream updates."""
+    """Hidden widget to manage the websocket connection and stream updates.
+
+    Incoming lines are buffered and written to the log view at most ``fps`` times a
+    second, one batch per frame, so bursts of thousands of lines cost a few renders
+    instead of one each. The buffer holds at most ``max_lines``; anything older would
+    be trimmed from the view anyway.
+    """
     
-    def __init__(self, base_url: str = "ws://localhost:8000/ws"):
+    def __init__(self, base_url: str = "ws://localhost:8000/api/ws", max_lines: int = 5000, fps: float = 10.0):
         super().__init__()
         self.base_url = base_url
         self.running = True
+        self.fps = fps
+        # Last log id seen, sent on reconnect so the backend replays the gap
+        self.last_log_id: int | None = None
+        self.pending: Deque[Text] = deque(maxlen=max_lines)
+        self.skipped = 0 # Lines pushed out of a full buffer since the last frame
+
+    def set_max_lines(self, max_lines: int) -> None:
+        self.pending = deque(self.pending, maxlen=max_lines)
+        self.app.query_one("#log-view", RichLog).max_lines = max_lines
+
+    def write(self, line: Text) -> None:
+        if len(self.pending) == self.pending.maxlen:
+            self.skipped += 1
+        self.pending.append(line)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        batch = Text()
+        if self.skipped:
+            batch.append(f"... {self.skipped} lines skipped ...\n", style="dim italic")
+            self.skipped = 0
+        batch.append(Text("\n").join(self.pending))
+        self.pending.clear()
+        self.app.query_one("#log-view", RichLog).write(batch)
+
+    def handle_message(self, data: Dict[str, Any]) -> None:
+        kind = data.get("type")
+        if kind == "log":
+            entry = data.get("data") or {}
+            log_id = entry.get("id")
+            if log_id is not None:
+                self.last_log_id = log_id
+            self.write(format_log_entry(entry))
+        elif kind == "status":
+            status = str(data.get("data", "unknown"))
+            run_status = data.get("run_status")
+            detail = f" (run #{data.get('run_id')} {run_status})" if run_status else ""
+            self.write(Text(f"[STATUS] {status}{detail}", style="blue"))
+
+            # Update the dashboard status label as well
+            is_running = status == "running"
+            status_label = self.app.query_one("#agent-status-value", Label)
+            status_label.update(status.upper())
+            status_label.styles.color = "green" if is_running else "yellow"
+        elif kind == "error":
+            self.write(Text(f"[ERROR] {data.get('data')}", style="red"))
 
     @work(exclusive=True)
     async def run_websocket(self) -> None:
-        log_view = self.app.query_one("#log-view", RichLog)
-        status_label = self.app.query_one("#agent-status-value", Label)
-
         while self.running:
             try:
-                async with websockets.connect(self.base_url) as websocket:
-                    log_view.write("[green]Connected to log stream...[/]")
+                url = self.base_url
+                if self.last_log_id is not None:
+                    url = f"{self.base_url}?last_log_id={self.last_log_id}"
+                async with websockets.connect(url) as websocket:
+                    self.write(Text("Connected to log stream...", style="green"))
                     while self.running:
-                        message = await websocket.recv()
-                        data = json.loads(message)
-                        
-                        # Format based on message type
-                        if data.get("type") == "log":
-                            content = data.get("content", "")
-                            log_view.write(content)
-                        elif data.get("type") == "status":
-                            status = data.get("data", "unknown")
-                            log_view.write(f"[blue][STATUS] {status}[/]")
-                            
-                            # Update the dashboard status label as well
-                            is_running = status == "running"
-                            status_label.update(status.upper())
-                            status_label.styles.color = "green" if is_running else "yellow"
+                        self.handle_message(json.loads(await websocket.recv()))
 
             except Exception as e:
-                log_view.write(f"[red]Connection lost: {e}. Retrying in 3s...[/]")
+                self.write(Text(f"Connection lost: {e}. Retrying in 3s...", style="red"))
                 await asyncio.sleep(3)
 
     def on_mount(self) -> None:
-        self.run_websocket()
+        self.set_interval(1 / self.fps, self.flush)
+        # The log view sits in a tab that is mounted after this widget
+        self.call_after_refresh(self.run_websocket)
 
     def on_unmount(self) -> None:
         self.running = False
 
+class TaskTable(DataTable):
+    """Recent tasks, updated in place: only new, changed and removed rows are touched."""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._shown: Dict[str, Tuple[str, ...]] = {}
+        self._history: List[Dict[str, Any]] | None = None
+
+    def on_mount(self) -> None:
+        self.add_column("ID", key="id")
+        self.add_column("Status", key="status")
+        self.add_column("Prompt", key="prompt")
+        self.add_column("Created At", key="created_at")
+
+    def sync(self, history: List[Dict[str, Any]]) -> None:
+        if history is self._history:
+            return # Same body as last time (the API answered 304)
+        self._history = history
+
+        rows: Dict[str, Tuple[str, ...]] = {}
+        for task in history:
+            description = task.get("description") or task.get("prompt") or ""
+            prompt = description[:50] + "..." if len(description) > 50 else description
+            row_key = str(task.get("id", "N/A"))
+            rows[row_key] = (row_key, task.get("status", "unknown"), prompt, str(task.get("created_at", "")))
+
+        for row_key in self._shown.keys() - rows.keys():
+            self.remove_row(row_key)
+        added = False
+        for row_key, values in rows.items():
+            shown = self._shown.get(row_key)
+            if shown is None:
+                self.add_row(*values, key=row_key)
+                added = True
+            elif shown != values:
+                for column, old, new in zip(self.columns, shown, values):
+                    if old != new:
+                        self.update_cell(row_key, column, new)
+        if added:
+            # New tasks are appended; put the table back in newest-first order
+            self.sort(
+                "created_at", "id", key=lambda row: (row[0], int(row[1]) if row[1].isdigit() else 0), reverse=True
+            )
+        self._shown = rows
+
 class Dashboard(Container):
     def compose(self) -> ComposeResult:
         with Vertical():
@@ -64,7 +173,7 @@ class Dashboard(Container):
                 yield Button("Refresh", id="refresh-btn", variant="primary")
             
             yield Label("Recent Tasks", classes="section-title")
-            yield DataTable(id="tasks-table")
+            yield TaskTable(id="tasks-table")
 
 class AutoReflexTUI(App):
     CSS = """
@@ -98,11 +207,20 @@ class AutoReflexTUI(App):
     }
     """
 
-    BINDINGS = [("q", "quit", "Quit"), ("r", "refresh_data", "Refresh")]
+    BINDINGS = [
+        ("q", "quit", "Quit"),
+        ("r", "refresh_data", "Refresh"),
+        ("+", "resize_log(2)", "More log lines"),
+        ("-", "resize_log(0.5)", "Fewer log lines"),
+    ]
+    REFRESH_INTERVAL = 5.0 # Seconds between dashboard polls
+    MIN_LOG_LINES = 100
 
-    def __init__(self):
+    def __init__(self, max_log_lines: int = 5000, fps: float = 10.0):
         super().__init__()
         self.api = AutoReflexAPI()
+        self.max_log_lines = max_log_lines
+        self.fps = fps
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -110,23 +228,35 @@ class AutoReflexTUI(App):
             with TabPane("Dashboard", id="tab-dashboard"):
                 yield Dashboard()
             with TabPane("Live Logs", id="tab-logs"):
-                yield RichLog(id="log-view", highlight=True, markup=True)
+                # Lines arrive pre-styled; markup/highlighting would re-parse agent output
+                yield RichLog(id="log-view", max_lines=self.max_log_lines)
         
         # Worker is invisible but part of the tree to access app context
-        yield LogWorker()
+        yield LogWorker(max_lines=self.max_log_lines, fps=self.fps)
         yield Footer()
 
-    async def on_mount(self) -> None:
-        table = self.query_one("#tasks-table", DataTable)
-        table.add_columns("ID", "Status", "Prompt", "Created At")
-        
-        # Initial data fetch
-        await self.action_refresh_data()
+    def on_mount(self) -> None:
+        # Initial data fetch, then poll; unchanged responses come back as cheap 304s
+        self.action_refresh_data()
+        self.set_interval(self.REFRESH_INTERVAL, self.action_refresh_data)
+
+    async def on_unmount(self) -> None:
+        await self.api.close()
+
+    def action_refresh_data(self) -> None:
+        self.refresh_data()
+
+    def action_resize_log(self, factor: float) -> None:
+        self.max_log_lines = max(self.MIN_LOG_LINES, int(self.max_log_lines * factor))
+        self.query_one(LogWorker).set_max_lines(self.max_log_lines)
+        self.notify(f"Keeping the last {self.max_log_lines} log lines")
+
+    @work(exclusive=True, group="refresh")
+    async def refresh_data(self) -> None:
+        """Fetch latest data from API without blocking the UI; a newer refresh cancels an older one."""
+        status_data, history = await self.api.get_dashboard()
 
-    async def action_refresh_data(self) -> None:
-        """Fetch latest data from API."""
         # 1. Status
-        status_data = self.api.get_status()
         status_str = status_data.get("status", "unknown")
         is_running = status_str == "running"
         
@@ -135,25 +265,16 @@ class AutoReflexTUI(App):
         status_label.styles.color = "green" if is_running else "yellow"
 
         # 2. History
-        history = self.api.get_history()
-        table = self.query_one("#tasks-table", DataTable)
-        table.clear()
-        
-        for task in history:
-            t_id = task.get("id", "N/A")
-            t_status = task.get("status", "unknown")
-            t_prompt = task.get("description", "")[:50] + "..." # Note: API uses 'description' usually, let's check schema
-            # Fallback if 'prompt' was used in some versions, but TaskRequest has 'description'
-            if not task.get("description") and task.get("prompt"):
-                 t_prompt = task.get("prompt", "")[:50] + "..."
-
-            t_date = task.get("created_at", "")
-            table.add_row(str(t_id), t_status, t_prompt, str(t_date))
+        self.query_one("#tasks-table", TaskTable).sync(history)
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "refresh-btn":
-            self.run_worker(self.action_refresh_data())
+            self.action_refresh_data()
 
 if __name__ == "__main__":
-    app = AutoReflexTUI()
+    parser = argparse.ArgumentParser(description="AutoReflex terminal dashboard")
+    parser.add_argument("--max-log-lines", type=int, default=5000, help="Log lines kept in the Live Logs tab")
+    parser.add_argument("--fps", type=float, default=10.0, help="Max log view redraws per second")
+    args = parser.parse_args()
+    app = AutoReflexTUI(max_log_lines=args.max_log_lines, fps=args.fps)
     app.run()
\ No newline at end of file